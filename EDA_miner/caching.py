@@ -0,0 +1,192 @@
+"""
+This module provides a size-aware cache on top of Redis, used to keep \
+derived results (e.g. plotly traces) around across callbacks, users, \
+and workers.
+
+Functions:
+    - make_key: Create a stable digest out of the given arguments.
+
+Classes:
+    - RedisLRUCache: A namespaced cache with a byte budget that evicts \
+                     the least recently used entries.
+
+Notes to others:
+    Values are dill-pickled, so anything that can be stored with \
+    `redis_conn.set(key, dill.dumps(value))` can be cached here too. \
+    Prefer caching small derived results over whole datasets, and \
+    always include the dataset version (see `utils.get_dataset_version`) \
+    in the key of anything computed from a dataset.
+"""
+
+import hashlib
+import json
+import time
+import dill
+
+
+# Sentinel to tell cache misses apart from cached `None` values
+_missing = object()
+
+
+def make_key(*parts):
+    """
+    Create a stable digest out of the given arguments.
+
+    Args:
+        *parts: Anything JSON-serializable; other objects are converted \
+                to strings.
+
+    Returns:
+        str: A hex digest that is the same across processes and restarts.
+    """
+
+    raw = json.dumps(parts, sort_keys=True, default=str)
+
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class RedisLRUCache:
+    """
+    A namespaced cache with a byte budget that evicts the least recently \
+    used entries. It lives in the same Redis database as the data and the \
+    `flask_caching` caches, but keeps track of the size of every entry so \
+    that large figures cannot grow it without bounds.
+
+    Args:
+        redis_conn (`redis.Redis`): Connection to a Redis database.
+        namespace (str): Prefix for the keys of this cache.
+        max_bytes (int): Total size of the entries after which the least \
+                         recently used ones are evicted.
+        ex (int): Optional expiration of entries, in seconds.
+
+    Further details:
+        Bookkeeping is done with a sorted set (last access time per \
+        entry), a hash (size per entry), and a counter (total size). \
+        Entries that expire on their own are only removed from the \
+        bookkeeping when looked up or evicted.
+    """
+
+    def __init__(self, redis_conn, namespace, max_bytes=64*2**20, ex=None):
+        self.redis_conn = redis_conn
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.ex = ex
+
+        self._index_key = f"cache_{namespace}_index"
+        self._sizes_key = f"cache_{namespace}_sizes"
+        self._total_key = f"cache_{namespace}_total"
+
+    def _entry_key(self, key):
+        return f"cache_{self.namespace}_entry_{key}"
+
+    def _forget(self, entry_key):
+        """
+        Remove an entry from the bookkeeping (not the entry itself).
+        """
+
+        size = self.redis_conn.hget(self._sizes_key, entry_key)
+        if size is None:
+            return
+
+        # Only the worker that actually removed the size decrements
+        # the total, so concurrent calls don't count it twice
+        if self.redis_conn.hdel(self._sizes_key, entry_key):
+            pipe = self.redis_conn.pipeline()
+            pipe.zrem(self._index_key, entry_key)
+            pipe.decrby(self._total_key, int(size))
+            pipe.execute()
+
+    def _evict(self):
+        """
+        Evict the least recently used entries until within budget.
+        """
+
+        total = int(self.redis_conn.get(self._total_key) or 0)
+
+        while total > self.max_bytes:
+            popped = self.redis_conn.zpopmin(self._index_key)
+            if not popped:
+                # Nothing left to evict; the counter drifted
+                self.redis_conn.set(self._total_key, 0)
+                break
+
+            entry_key = popped[0][0]
+            self.redis_conn.delete(entry_key)
+            self._forget(entry_key)
+
+            total = int(self.redis_conn.get(self._total_key) or 0)
+
+    def get(self, key, default=None):
+        """
+        Get a cached value and mark it as recently used.
+
+        Args:
+            key (str): The key of the entry, e.g. from `make_key`.
+            default: What to return on cache misses.
+
+        Returns:
+            The cached value or `default`.
+        """
+
+        entry_key = self._entry_key(key)
+        raw = self.redis_conn.get(entry_key)
+
+        if raw is None:
+            self._forget(entry_key)
+            return default
+
+        self.redis_conn.zadd(self._index_key, {entry_key: time.time()})
+
+        return dill.loads(raw)
+
+    def set(self, key, value):
+        """
+        Cache a value, evicting older entries if needed.
+
+        Args:
+            key (str): The key of the entry, e.g. from `make_key`.
+            value: Anything dill can pickle.
+
+        Returns:
+            bool: Whether the value was cached. Values larger than the \
+                  whole budget are not.
+        """
+
+        raw = dill.dumps(value)
+        if len(raw) > self.max_bytes:
+            return False
+
+        entry_key = self._entry_key(key)
+        self._forget(entry_key)
+
+        pipe = self.redis_conn.pipeline()
+        pipe.set(entry_key, raw, ex=self.ex)
+        pipe.zadd(self._index_key, {entry_key: time.time()})
+        pipe.hset(self._sizes_key, entry_key, len(raw))
+        pipe.incrby(self._total_key, len(raw))
+        pipe.execute()
+
+        self._evict()
+
+        return True
+
+    def get_or_compute(self, key, func, *args, **kwargs):
+        """
+        Get a cached value, or compute it with `func(*args, **kwargs)` \
+        and cache it.
+
+        Args:
+            key (str): The key of the entry, e.g. from `make_key`.
+            func (callable): Computes the value on cache misses.
+
+        Returns:
+            The cached or computed value.
+        """
+
+        value = self.get(key, _missing)
+
+        if value is _missing:
+            value = func(*args, **kwargs)
+            self.set(key, value)
+
+        return value
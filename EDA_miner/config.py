@@ -26,6 +26,9 @@ else:
 # Create a connection to the database
 engine = create_engine(env_config_get("DATABASE_URI"))
 
+# Number of worker processes for CPU-bound work, per server worker
+n_jobs = int(env_config_get("N_JOBS") or os.cpu_count() or 1)
+
 # Secret key for user sessions
 # https://stackoverflow.com/a/42579388/6655150
 SECRET_KEY = os.urandom(16)
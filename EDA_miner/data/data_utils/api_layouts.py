@@ -30,7 +30,7 @@ import dash_bootstrap_components as dbc
 from ..server import redis_conn, cache
 from .schema_heuristics import infer_types
 from .ganalytics_metrics import all_metrics
-from utils import create_table, save_schema
+from utils import create_table, save_dataset, save_schema
 from config import client_config
 from exceptions import UnexpectedResponse
 
@@ -42,7 +42,6 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from collections import defaultdict
 import requests
-import dill
 import pandas as pd
 
 
@@ -103,8 +102,8 @@ class APIConnection:
         types, subtypes = infer_types(sample, is_sample=True)
 
         # Save the data and schema
-        redis_conn.set(f"{self.user_id}_data_{self.api_name}_{key}",
-                       dill.dumps(df))
+        save_dataset(f"{self.user_id}_data_{self.api_name}_{key}", df,
+                     redis_conn)
         save_schema(f"{self.user_id}_schema_{self.api_name}_{key}",
                     types=types, subtypes=subtypes,
                     head=df.head(), redis_conn=redis_conn,
@@ -14,6 +14,7 @@ var_configs = {
     'MAIL_PASSWORD': "************",
     'DATABASE_URI': f"sqlite:///{top_level_dir}/users.db",
     'MODE': "TEST",
+    'N_JOBS': str(os.cpu_count() or 1),
 
     'GOOGLE_CLIENT_ID': "************",
     'GOOGLE_PROJECT_ID': "************",
@@ -0,0 +1,373 @@
+"""
+This module runs long tasks (e.g. model training) in the background, \
+so that the web workers stay responsive.
+
+Global Variables:
+    - queue_key: The Redis list of job ids waiting to be run.
+    - running_key: The Redis sorted set of the running job ids, shared \
+                   by all the dispatchers.
+
+Functions:
+    - submit_job: Queue a function call to be run in the background.
+    - get_job: Get the status and progress of a job.
+    - get_result: Get the return value of a finished job.
+    - cancel_job: Cancel a queued or running job.
+    - report_progress: Report the progress of the current job.
+    - get_pool: Get a process pool sized to the share of the cores of \
+                the current job.
+
+Notes to others:
+    Jobs are kept in Redis: a list of queued job ids, a hash per job \
+    with its status and progress, and the (dill-pickled) task and \
+    result. Every web worker lazily starts a dispatcher thread that \
+    pops jobs off the shared queue and runs each one in its own process, \
+    so jobs can be cancelled by simply terminating the process. A job \
+    is only popped while fewer than `N_JOBS` run across all the \
+    workers (see `_pop_job`); if a worker dies, the slots of its jobs \
+    are freed once their lease runs out. Functions passed to \
+    `submit_job` must be importable (i.e. defined at module level) \
+    and should take plain arguments, such as dataset keys, rather \
+    than the data itself. \
+    Jobs that fan out work should use `get_pool`, not \
+    `utils.get_process_pool`, so that concurrent jobs share the cores \
+    instead of each starting `N_JOBS` processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Process
+from threading import Thread, Lock
+import traceback
+import signal
+import uuid
+import time
+import os
+
+from redis import Redis
+import dill
+
+from config import n_jobs
+
+
+queue_key = "jobs_queue"
+running_key = "jobs_running"
+
+# Dispatchers renew the lease of their running jobs every round;
+# jobs whose lease ran out (e.g. their worker died) free their slot
+job_lease = 30
+
+# Jobs and their results are forgotten after a day
+job_expiry = 24 * 3600
+
+redis_conn = Redis()
+
+# The dispatcher of this process (see `_ensure_dispatcher`)
+_dispatcher = None
+_dispatcher_pid = None
+_dispatcher_lock = Lock()
+
+# The id of the job running in this process, if any, the number of
+# cores it may use, and its pool (see `get_pool`)
+_current_job_id = None
+_job_cores = 1
+_job_pool = None
+
+
+def _job_key(job_id, suffix=""):
+    return f"job_{job_id}{suffix}"
+
+
+def submit_job(func, *args, user_id=None, **kwargs):
+    """
+    Queue a function call to be run in the background.
+
+    Args:
+        func (callable): A module-level function.
+        *args, **kwargs: Passed on to `func`.
+        user_id (str): The user that submitted the job, if any.
+
+    Returns:
+        str: The id of the job.
+    """
+
+    job_id = uuid.uuid4().hex
+
+    pipe = redis_conn.pipeline()
+    pipe.set(_job_key(job_id, "_task"), dill.dumps((func, args, kwargs)),
+             ex=job_expiry)
+    pipe.hset(_job_key(job_id), mapping={"status": "queued", "progress": 0,
+                                         "message": "", "user": user_id or "",
+                                         "submitted": time.time()})
+    pipe.expire(_job_key(job_id), job_expiry)
+    pipe.rpush(queue_key, job_id)
+    pipe.execute()
+
+    _ensure_dispatcher()
+
+    return job_id
+
+
+def get_job(job_id):
+    """
+    Get the status and progress of a job.
+
+    Args:
+        job_id (str): The id of the job.
+
+    Returns:
+        dict: With status (one of: queued, running, done, failed, \
+              cancelled), progress (a fraction), and a message. \
+              None if there is no such job.
+    """
+
+    # Queued jobs would be stranded if the worker that
+    # submitted them was restarted, so make sure they run
+    _ensure_dispatcher()
+
+    job = redis_conn.hgetall(_job_key(job_id))
+    if not job:
+        return None
+
+    job = {key.decode(): value.decode() for key, value in job.items()}
+    job["progress"] = float(job["progress"])
+
+    return job
+
+
+def get_result(job_id):
+    """
+    Get the return value of a finished job.
+
+    Args:
+        job_id (str): The id of the job.
+
+    Returns:
+        What the function of the job returned, or None.
+    """
+
+    result = redis_conn.get(_job_key(job_id, "_result"))
+
+    return dill.loads(result) if result is not None else None
+
+
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job. Queued jobs are skipped, running \
+    ones are terminated by their dispatcher.
+
+    Args:
+        job_id (str): The id of the job.
+
+    Returns:
+        bool: Whether the job was still queued or running.
+    """
+
+    status = redis_conn.hget(_job_key(job_id), "status")
+    if status not in [b"queued", b"running"]:
+        return False
+
+    pipe = redis_conn.pipeline()
+    pipe.hset(_job_key(job_id), "cancel", 1)
+    if status == b"queued":
+        # It will be skipped when popped off the queue
+        pipe.hset(_job_key(job_id), "status", "cancelled")
+    pipe.execute()
+
+    return True
+
+
+def report_progress(progress, message=""):
+    """
+    Report the progress of the current job. It does nothing when not \
+    called from within a job, so functions can call it unconditionally.
+
+    Args:
+        progress (float): Fraction of the work done, from 0 to 1.
+        message (str): What is being done.
+    """
+
+    if _current_job_id is None:
+        return
+
+    redis_conn.hset(_job_key(_current_job_id),
+                    mapping={"progress": progress, "message": message})
+
+
+def get_pool():
+    """
+    Get a process pool sized to the share of the cores of the current \
+    job (see `_dispatch`). Pass it as the `pool` of e.g. \
+    `evaluation.cross_validate`.
+
+    Returns:
+        `concurrent.futures.ProcessPoolExecutor`: The pool, or None if \
+        the job has a single core or this is not a job, to run the work \
+        sequentially.
+    """
+
+    global _job_pool
+
+    if _current_job_id is None or _job_cores <= 1:
+        return None
+
+    if _job_pool is None:
+        _job_pool = ProcessPoolExecutor(max_workers=_job_cores)
+
+    return _job_pool
+
+
+def _run_job(job_id, cores=1):
+    """
+    Run a job; this is the target of the job's process.
+    """
+
+    global _current_job_id, _job_cores
+    _current_job_id = job_id
+    _job_cores = cores
+
+    # A process group of its own, so that cancelling the job also
+    # terminates the processes of its pool
+    os.setpgrp()
+
+    func, args, kwargs = dill.loads(redis_conn.get(_job_key(job_id, "_task")))
+
+    redis_conn.hset(_job_key(job_id), "status", "running")
+
+    try:
+        result = func(*args, **kwargs)
+
+    except Exception:
+        redis_conn.hset(_job_key(job_id), mapping={
+            "status": "failed", "message": traceback.format_exc(limit=3)
+        })
+        return
+
+    finally:
+        if _job_pool is not None:
+            _job_pool.shutdown()
+
+    pipe = redis_conn.pipeline()
+    pipe.set(_job_key(job_id, "_result"), dill.dumps(result), ex=job_expiry)
+    pipe.hset(_job_key(job_id), mapping={"status": "done", "progress": 1})
+    pipe.execute()
+
+
+# Atomically, so that dispatchers can't take the same slot
+_pop_job_script = redis_conn.register_script("""
+    redis.call("ZREMRANGEBYSCORE", KEYS[2], "-inf", ARGV[1])
+    if redis.call("ZCARD", KEYS[2]) >= tonumber(ARGV[2]) then
+        return nil
+    end
+
+    local job_id = redis.call("LPOP", KEYS[1])
+    if not job_id then
+        return nil
+    end
+
+    redis.call("ZADD", KEYS[2], ARGV[1] + ARGV[3], job_id)
+    return {job_id, redis.call("ZCARD", KEYS[2])}
+""")
+
+
+def _pop_job(limit=None):
+    """
+    Pop the next job off the queue, if fewer than `limit` jobs are \
+    running across all the dispatchers, and count it as running.
+
+    Args:
+        limit (int): The most jobs to run at a time. Defaults to `n_jobs`.
+
+    Returns:
+        str, int: The id of the job and the number of running jobs, \
+                  itself included, or None if there are no free slots \
+                  or no queued jobs.
+    """
+
+    popped = _pop_job_script(keys=[queue_key, running_key],
+                             args=[time.time(), limit or n_jobs, job_lease])
+    if popped is None:
+        return None
+
+    job_id, n_running = popped
+    return job_id.decode(), n_running
+
+
+def _dispatch():
+    """
+    Pop jobs off the queue and run them, at most `n_jobs` at a time \
+    across all the dispatchers. Every job gets an equal share of the \
+    cores (`n_jobs` divided by the number of running jobs, itself \
+    included) for its pool. Also terminate the cancelled ones.
+    """
+
+    running = {}
+    while True:
+
+        # Keep the slots of the running jobs
+        if running:
+            lease = time.time() + job_lease
+            redis_conn.zadd(running_key, {job_id: lease for job_id in running})
+
+        for job_id, process in list(running.items()):
+            cancelled = redis_conn.hget(_job_key(job_id), "cancel")
+
+            if cancelled and process.is_alive():
+                try:
+                    os.killpg(process.pid, signal.SIGTERM)
+                    process.join()
+                except ProcessLookupError:
+                    # It hasn't made its process group yet; next round
+                    pass
+
+            if not process.is_alive():
+                process.join()
+                del running[job_id]
+                redis_conn.zrem(running_key, job_id)
+
+                status = redis_conn.hget(_job_key(job_id), "status")
+                if status not in [b"queued", b"running"]:
+                    continue
+
+                if cancelled:
+                    redis_conn.hset(_job_key(job_id), "status", "cancelled")
+                else:
+                    # Killed or crashed without a chance to report it
+                    redis_conn.hset(_job_key(job_id), mapping={
+                        "status": "failed",
+                        "message": f"Exit code {process.exitcode}"
+                    })
+
+        popped = _pop_job()
+        if popped is None:
+            time.sleep(0.5)
+            continue
+
+        job_id, n_running = popped
+        if redis_conn.hget(_job_key(job_id), "cancel"):
+            pipe = redis_conn.pipeline()
+            pipe.zrem(running_key, job_id)
+            pipe.hset(_job_key(job_id), "status", "cancelled")
+            pipe.execute()
+            continue
+
+        # Not a daemon, so that jobs may use process pools themselves
+        cores = max(n_jobs // n_running, 1)
+        process = Process(target=_run_job, args=(job_id, cores),
+                          daemon=False)
+        process.start()
+        running[job_id] = process
+
+
+def _ensure_dispatcher():
+    """
+    Start the dispatcher of this process if it isn't running. Each web \
+    worker gets its own, since threads don't survive forking.
+    """
+
+    global _dispatcher, _dispatcher_pid
+
+    with _dispatcher_lock:
+        if (_dispatcher is None or _dispatcher_pid != os.getpid()
+                or not _dispatcher.is_alive()):
+            _dispatcher = Thread(target=_dispatch, daemon=True)
+            _dispatcher.start()
+            _dispatcher_pid = os.getpid()
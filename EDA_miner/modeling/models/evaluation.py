@@ -0,0 +1,263 @@
+"""
+This module collects functions for evaluating models on data they \
+were not fitted on.
+
+Functions:
+    - estimator_digest: Create a digest of an estimator and its parameters.
+    - make_splits: Create the train / test indices of k-fold or holdout \
+                   validation.
+    - default_metrics: Get the metrics reported for a type of problem.
+    - encode_target: Drop the rows without a target and encode the \
+                     classes.
+    - cross_validate: Fit and score an estimator on every split, in \
+                      parallel.
+    - summarize: Get the mean and standard deviation of every metric.
+    - without_nested_jobs: Call a function without letting it start \
+                           more processes (e.g. for `FeatureUnion`).
+
+Notes to others:
+    The results of `cross_validate` are plain data (and optionally the \
+    estimator refitted on all the data), so they can be cached. Key \
+    them with `estimator_digest` and the versions of the datasets used \
+    (see `utils.get_dataset_version`).
+"""
+
+from concurrent.futures import as_completed
+import time
+
+from joblib import parallel_backend
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score, r2_score
+from sklearn.metrics import mean_squared_error, mean_absolute_error
+from sklearn.model_selection import KFold, StratifiedKFold, ShuffleSplit
+from sklearn.model_selection import StratifiedShuffleSplit
+import pandas as pd
+import numpy as np
+
+from caching import make_key
+
+
+def estimator_digest(estimator):
+    """
+    Create a digest of an estimator and its parameters. Nested \
+    estimators are included through their own parameters.
+
+    Args:
+        estimator (sklearn-like estimator): e.g. a pipeline.
+
+    Returns:
+        str: The same digest for equal estimators, across processes.
+    """
+
+    params = {name: (type(value).__name__ if hasattr(value, "get_params")
+                     else value)
+              for name, value in estimator.get_params(deep=True).items()}
+
+    return make_key(type(estimator).__name__, params)
+
+
+def make_splits(y, method="kfold", n_splits=5, test_size=0.25,
+                stratify=False, random_state=0):
+    """
+    Create the train / test indices of k-fold or holdout validation.
+
+    Args:
+        y (`pd.Series` or `np.array`): The target.
+        method (str): One of: kfold, holdout.
+        n_splits (int): Number of folds, for kfold.
+        test_size (float): Fraction of samples to test on, for holdout.
+        stratify (bool): Keep the classes of `y` balanced across splits. \
+                         Ignored if some class is too rare.
+        random_state (int): Seed for shuffling the samples.
+
+    Returns:
+        list(tuple(np.array)): The train and test indices of every split.
+    """
+
+    if stratify and np.unique(y, return_counts=True)[1].min() < n_splits:
+        stratify = False
+
+    if method == "kfold":
+        splitter = (StratifiedKFold if stratify else KFold)(
+            n_splits=n_splits, shuffle=True, random_state=random_state)
+
+    elif method == "holdout":
+        splitter = (StratifiedShuffleSplit if stratify else ShuffleSplit)(
+            n_splits=1, test_size=test_size, random_state=random_state)
+
+    else:
+        raise ValueError(f"Unknown validation method: {method}")
+
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def default_metrics(problem_type):
+    """
+    Get the metrics reported for a type of problem.
+
+    Args:
+        problem_type (str): One of: regression, classification.
+
+    Returns:
+        dict: Functions of (y_true, y_pred) by metric name.
+    """
+
+    if problem_type == "regression":
+        return {"R2": r2_score,
+                "MSE": mean_squared_error,
+                "MAE": mean_absolute_error}
+
+    elif problem_type == "classification":
+        return {"Accuracy": accuracy_score,
+                "F1 (macro)": lambda y_true, y_pred: f1_score(
+                    y_true, y_pred, average="macro")}
+
+    return {}
+
+
+def encode_target(X, y):
+    """
+    Drop the rows without a target and encode the classes, so that the \
+    codes index the classes (e.g. when serving the model). Otherwise \
+    `pd.factorize` makes the missing targets a class of their own (-1).
+
+    Args:
+        X (`pd.DataFrame`): The predictors.
+        y (`pd.Series`): The target.
+
+    Returns:
+        `pd.DataFrame`, np.array, list: The predictors of the rows with \
+                                        a target, the class codes, and \
+                                        the classes.
+    """
+
+    known = y.notna().values
+    codes, classes = pd.factorize(y[known])
+
+    return X[known], codes, list(classes)
+
+
+def without_nested_jobs(func, *args):
+    """
+    Call a function without letting it start more processes, e.g. for \
+    the branches of a `FeatureUnion`. Use it for tasks of a process \
+    pool, which already keeps all the cores busy.
+
+    Args:
+        func (callable): The function.
+        *args: Passed on to `func`.
+
+    Returns:
+        What `func` returns.
+    """
+
+    with parallel_backend("sequential"):
+        return func(*args)
+
+
+def _take(data, indices):
+    return data.iloc[indices] if hasattr(data, "iloc") else data[indices]
+
+
+def _fit_fold(estimator, X, y, train, test, problem_type):
+    """
+    Fit a clone of the estimator on the train indices and score it on \
+    the test indices.
+
+    Returns:
+        dict, np.array: The metrics and timings, and the predictions.
+    """
+
+    estimator = clone(estimator)
+
+    start = time.time()
+    estimator.fit(_take(X, train), _take(y, train))
+    fit_time = time.time() - start
+
+    start = time.time()
+    y_test = _take(y, test)
+    predictions = estimator.predict(_take(X, test))
+    scores = {name: metric(y_test, predictions) for name, metric
+              in default_metrics(problem_type).items()}
+    score_time = time.time() - start
+
+    return dict(n_train=len(train), n_test=len(test), fit_time=fit_time,
+                score_time=score_time, **scores), predictions
+
+
+def _refit(estimator, X, y):
+    return clone(estimator).fit(X, y)
+
+
+def cross_validate(estimator, X, y, problem_type, method="kfold",
+                   n_splits=5, pool=None, refit=False):
+    """
+    Fit and score an estimator on every split, in parallel.
+
+    Args:
+        estimator (sklearn-like estimator): e.g. a pipeline.
+        X (`pd.DataFrame`): The predictors.
+        y (`pd.Series` or `np.array`): The target.
+        problem_type (str): One of: regression, classification.
+        method (str): One of: kfold, holdout (see `make_splits`).
+        n_splits (int): Number of folds, for kfold.
+        pool (`concurrent.futures.Executor`): Where to fit the folds. \
+                                              None to fit them in order.
+        refit (bool): Also fit the estimator on all the data, e.g. for \
+                      exporting it.
+
+    Returns:
+        dict: With "folds", a `pd.DataFrame` with the metrics and \
+              timings of every split; "predictions", the out-of-fold \
+              predictions of every sample (NaN for samples that were \
+              never tested on); and "estimator", the refitted \
+              estimator or None.
+    """
+
+    splits = make_splits(y, method, n_splits,
+                         stratify=(problem_type == "classification"))
+
+    if pool is None:
+        results = [_fit_fold(estimator, X, y, train, test, problem_type)
+                   for train, test in splits]
+        refitted = _refit(estimator, X, y) if refit else None
+
+    else:
+        futures = {pool.submit(without_nested_jobs, _fit_fold, estimator,
+                               X, y, train, test, problem_type): i
+                   for i, (train, test) in enumerate(splits)}
+        refitted = (pool.submit(without_nested_jobs, _refit, estimator, X, y)
+                    if refit else None)
+
+        results = [None] * len(splits)
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+        refitted = refitted.result() if refit else None
+
+    predictions = np.full(len(y), np.nan)
+    for (_, test), (_, fold_predictions) in zip(splits, results):
+        predictions[test] = fold_predictions
+
+    folds = pd.DataFrame([scores for scores, _ in results])
+    folds.index.name = "fold"
+
+    return {"folds": folds, "predictions": predictions,
+            "estimator": refitted}
+
+
+def summarize(folds):
+    """
+    Get the mean and standard deviation of every metric.
+
+    Args:
+        folds (`pd.DataFrame`): As returned by `cross_validate`.
+
+    Returns:
+        `pd.DataFrame`: One row per metric, with columns mean and std.
+    """
+
+    metrics = folds.drop(columns=["n_train", "n_test", "fit_time",
+                                  "score_time"])
+
+    return pd.DataFrame({"mean": metrics.mean(), "std": metrics.std(ddof=0)})
@@ -0,0 +1,267 @@
+"""
+This module fits and evaluates every model of a ModelBuilder graph in \
+one run, without turning it into one pipeline per model.
+
+Functions:
+    - graph_dag: Convert a ModelBuilder graph to a networkx DiGraph.
+    - topological_levels: Group the nodes of a DAG so that every node \
+                          comes after all of its ancestors.
+    - execute_graph: Cross-validate every model (terminal node) of a \
+                     graph, fitting every other node once per fold.
+
+Notes to others:
+    `pipeline_creator.create_pipelines` duplicates the ancestors that \
+    models share, so fitting its pipelines one by one refits them. \
+    Here nodes are fitted level by level: all the nodes of a level, for \
+    all folds, are independent and run in parallel. The inputs of a \
+    node are the outputs of its parents, stacked side by side (like a \
+    `FeatureUnion`) if there are more than one.
+"""
+
+from concurrent.futures import as_completed
+import time
+
+from sklearn.base import ClassifierMixin, RegressorMixin, clone
+from scipy import sparse
+import networkx as nx
+import pandas as pd
+import numpy as np
+
+from .evaluation import make_splits, default_metrics, without_nested_jobs
+
+
+def graph_dag(graph):
+    """
+    Convert a ModelBuilder graph to a networkx DiGraph.
+
+    Args:
+        graph (`graph_structures.Graph`): The graph.
+
+    Returns:
+        `nx.DiGraph`: With the `graph_structures.Node` of every node id \
+                      as its "node" attribute.
+    """
+
+    dag = nx.DiGraph()
+
+    for node in graph.graph.node_collection.nodes:
+        dag.add_node(node.id, node=node)
+
+    for edge in graph.graph.edge_collection.edges:
+        dag.add_edge(edge.src_node.id, edge.dest_node.id)
+
+    return dag
+
+
+def topological_levels(dag):
+    """
+    Group the nodes of a DAG so that every node comes after all of its \
+    ancestors: sources are in the first level, and every other node is \
+    one level after its deepest parent.
+
+    Args:
+        dag (`nx.DiGraph`): A directed acyclic graph.
+
+    Returns:
+        list(list): The node ids of every level.
+    """
+
+    depth = {}
+    for node in nx.topological_sort(dag):
+        depth[node] = max((depth[parent] + 1
+                           for parent in dag.predecessors(node)), default=0)
+
+    levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for node, level in depth.items():
+        levels[level].append(node)
+
+    return levels
+
+
+def _problem_type(estimator):
+    if isinstance(estimator, ClassifierMixin):
+        return "classification"
+    elif isinstance(estimator, RegressorMixin):
+        return "regression"
+    return "clustering"
+
+
+def _take(data, indices):
+    return data.iloc[indices] if hasattr(data, "iloc") else data[indices]
+
+
+def _stack(outputs):
+    """
+    Stack the outputs of the parents side by side, like `FeatureUnion`.
+    """
+
+    if len(outputs) == 1:
+        return outputs[0]
+
+    if any(sparse.issparse(output) for output in outputs):
+        return sparse.hstack(outputs).tocsr()
+
+    return np.hstack([np.asarray(output).reshape(len(output), -1)
+                      for output in outputs])
+
+
+def _fit_transform(estimator, X_train, X_test, y_train):
+    start = time.time()
+    train = estimator.fit_transform(X_train, y_train)
+    test = estimator.transform(X_test)
+
+    return train, test, time.time() - start
+
+
+def _fit_predict(estimator, X_train, X_test, y_train, y_test, problem_type):
+    start = time.time()
+    estimator.fit(X_train, y_train)
+    fit_time = time.time() - start
+
+    start = time.time()
+    predictions = estimator.predict(X_test)
+    scores = {name: metric(y_test, predictions) for name, metric
+              in default_metrics(problem_type).items()}
+
+    return dict(n_train=len(y_train), n_test=len(y_test), fit_time=fit_time,
+                score_time=time.time() - start, **scores), predictions
+
+
+def execute_graph(graph, X, y, method="kfold", n_splits=5, pool=None,
+                  progress=None):
+    """
+    Cross-validate every model (terminal node) of a graph, fitting \
+    every other node once per fold.
+
+    Args:
+        graph (`graph_structures.Graph`): The graph.
+        X (`pd.DataFrame`): The data given to the input nodes.
+        y (`pd.Series`): The target. Classifiers get it factorized.
+        method (str): One of: kfold, holdout (see `make_splits`).
+        n_splits (int): Number of folds, for kfold.
+        pool (`concurrent.futures.Executor`): Where to fit the nodes. \
+                                              None to fit them in order.
+        progress (callable): Called with the fraction of the levels done.
+
+    Returns:
+        dict: The results of every model by node id, with "problem_type", \
+              "error" (None, or why it couldn't be fitted) and, like \
+              `evaluation.cross_validate`, "folds" and "predictions".
+    """
+
+    dag = graph_dag(graph)
+    models = [node_id for node_id, node in dag.nodes(data="node")
+              if node.parent == "models"]
+
+    # Only the nodes that lead to a model need to be fitted
+    needed = set(models).union(*(nx.ancestors(dag, model)
+                                 for model in models))
+    dag = dag.subgraph(needed)
+
+    estimators = {node_id: node.model_class(**node.params)
+                  for node_id, node in dag.nodes(data="node")}
+    problem_types = {model: _problem_type(estimators[model])
+                     for model in models}
+
+    codes = pd.factorize(y)[0]
+    targets = {"classification": codes, "regression": np.asarray(y),
+               "clustering": np.asarray(y)}
+
+    splits = make_splits(codes, method, n_splits, stratify=(
+        "classification" in problem_types.values()))
+
+    results = {model: {"problem_type": problem_types[model], "error": None,
+                       "folds": [], "predictions": np.full(len(y), np.nan)}
+               for model in models}
+
+    # The train / test outputs of every node for every fold, dropped
+    # once all of the node's children have been fitted
+    outputs = {}
+    errors = {}
+    remaining = {node_id: dag.out_degree(node_id) for node_id in dag}
+
+    levels = topological_levels(dag)
+    for done, level in enumerate(levels):
+        tasks = {}
+        for node_id in level:
+            parents = list(dag.predecessors(node_id))
+
+            failed = [errors[parent] for parent in parents
+                      if parent in errors]
+            failed += [f"{node_id}: models can't be the inputs of other "
+                       "nodes" for parent in parents
+                       if parent in problem_types]
+            if failed:
+                errors[node_id] = failed[0]
+                continue
+
+            for fold, (train, test) in enumerate(splits):
+                if parents:
+                    X_train = _stack([outputs[parent, fold][0]
+                                      for parent in parents])
+                    X_test = _stack([outputs[parent, fold][1]
+                                     for parent in parents])
+                else:
+                    X_train, X_test = _take(X, train), _take(X, test)
+
+                # Every fold fits its own copy, also in a thread pool
+                if node_id in problem_types:
+                    target = targets[problem_types[node_id]]
+                    args = (_fit_predict, clone(estimators[node_id]), X_train,
+                            X_test, target[train], target[test],
+                            problem_types[node_id])
+                else:
+                    args = (_fit_transform, clone(estimators[node_id]),
+                            X_train, X_test, _take(y, train))
+
+                tasks[node_id, fold] = args
+
+        if pool is None:
+            finished = []
+            for task, (func, *args) in tasks.items():
+                try:
+                    finished.append((task, func(*args), None))
+                except Exception as exc:
+                    finished.append((task, None, exc))
+        else:
+            futures = {pool.submit(without_nested_jobs, *args): task
+                       for task, args in tasks.items()}
+            finished = []
+            for future in as_completed(futures):
+                try:
+                    finished.append((futures[future], future.result(), None))
+                except Exception as exc:
+                    finished.append((futures[future], None, exc))
+
+        for (node_id, fold), result, exc in finished:
+            if exc is not None:
+                errors[node_id] = (f"{node_id}: "
+                                   f"{type(exc).__name__}: {exc}")
+            elif node_id in problem_types:
+                scores, predictions = result
+                results[node_id]["folds"].append((fold, scores))
+                results[node_id]["predictions"][splits[fold][1]] = \
+                    predictions
+            else:
+                outputs[node_id, fold] = result
+
+        for node_id in level:
+            for parent in dag.predecessors(node_id):
+                remaining[parent] -= 1
+                if remaining[parent] == 0:
+                    for fold in range(len(splits)):
+                        outputs.pop((parent, fold), None)
+
+        if progress is not None:
+            progress((done + 1) / len(levels))
+
+    for model, result in results.items():
+        result["error"] = errors.get(model)
+
+        folds = pd.DataFrame([scores for _, scores
+                              in sorted(result["folds"], key=lambda fold:
+                                        fold[0])])
+        folds.index.name = "fold"
+        result["folds"] = folds
+
+    return results
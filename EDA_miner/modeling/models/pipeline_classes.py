@@ -12,7 +12,13 @@ Notes to others:
 """
 
 import numpy as np
+import pandas as pd
 from textblob import TextBlob
+from redis import Redis
+from redis.exceptions import RedisError
+from joblib import effective_n_jobs
+
+import hashlib
 
 from sklearn.base import BaseEstimator, ClassifierMixin, TransformerMixin
 from sklearn.base import RegressorMixin, ClusterMixin
@@ -34,6 +40,17 @@ from sklearn.tree import DecisionTreeRegressor, DecisionTreeClassifier
 from sklearn.tree import ExtraTreeRegressor, ExtraTreeClassifier
 from xgboost import XGBClassifier
 
+from .. import jobs
+
+
+# Sentiment polarities of texts seen so far, keyed by text digest and
+# shared by all users and workers. The hash expires a day after it was
+# last written to, and is started over once it holds too many texts
+redis_conn = Redis()
+polarities_key = "sentiment_polarities"
+polarities_expiry = 24 * 3600
+max_polarities = 10**6
+
 
 """
 ======== Custom classes ========
@@ -86,15 +103,83 @@ class CustomClassifier(BaseEstimator, ClassifierMixin):
         return np.ones(X.shape[0])
 
 
+def _polarities(texts):
+    return [TextBlob(text).polarity for text in texts]
+
+
 # TODO: do an actual implementation
 class SentimentAnalyzer(BaseEstimator, RegressorMixin):
+    """
+    Score the sentiment polarity of texts with TextBlob. Every distinct \
+    text is scored once: polarities are cached in Redis by text digest, \
+    and new texts are scored in parallel chunks if there are many and \
+    this is a background job (see `jobs.get_pool`).
+    """
+
     modifiable_params = {}
 
+    # Fewer new texts than this are scored in this process
+    min_parallel = 2000
+    chunk_size = 500
+
+    def fit(self, X, y=None):
+        return self
+
+    def _score(self, texts):
+        # Tasks of a pool (see `evaluation.without_nested_jobs`) score
+        # in their own process, as the pool keeps all the cores busy
+        if len(texts) < self.min_parallel or effective_n_jobs(-1) == 1:
+            return _polarities(texts)
+
+        pool = jobs.get_pool()
+        if pool is None:
+            return _polarities(texts)
+
+        chunks = [texts[i:i+self.chunk_size]
+                  for i in range(0, len(texts), self.chunk_size)]
+
+        return [polarity for chunk in pool.map(_polarities, chunks)
+                for polarity in chunk]
+
     def predict(self, X):
-        if isinstance(X, np.ndarray):
-            return np.array([TextBlob(x[0]).polarity for x in X])
-        else:
-            return np.array([TextBlob(x).polarity for x in X])
+        # Score the first column, e.g. the data of an input node
+        if isinstance(X, pd.DataFrame):
+            X = X.iloc[:, 0]
+        elif np.ndim(X) > 1:
+            X = np.asarray(X)[:, 0]
+
+        labels, texts = pd.factorize(pd.Series(X).astype(str))
+        digests = [hashlib.sha1(text.encode()).hexdigest() for text in texts]
+
+        try:
+            cached = redis_conn.hmget(polarities_key, digests) \
+                if digests else []
+        except RedisError:
+            # Still works without the cache, only slower
+            cached = [None] * len(digests)
+
+        missing = [i for i, polarity in enumerate(cached) if polarity is None]
+        scored = self._score([texts[i] for i in missing])
+
+        polarities = np.array([float(polarity) if polarity is not None
+                               else np.nan for polarity in cached])
+        polarities[missing] = scored
+
+        if missing:
+            try:
+                if redis_conn.hlen(polarities_key) > max_polarities:
+                    redis_conn.delete(polarities_key)
+
+                pipe = redis_conn.pipeline()
+                pipe.hset(polarities_key,
+                          mapping={digests[i]: polarity
+                                   for i, polarity in zip(missing, scored)})
+                pipe.expire(polarities_key, polarities_expiry)
+                pipe.execute()
+            except RedisError:
+                pass
+
+        return polarities[labels]
 
 
 """
@@ -10,6 +10,8 @@ Functions:
                           of `create_pipelines`.
     - find_input_node: Find the input node of a pipeline containing \
                        a `FeatureMaker`.
+    - set_n_jobs: Set the number of processes of every step of a \
+                  pipeline that has one.
 
 Notes to others:
     Feel free to add or modify stuff here, but be cautious. You probably \
@@ -20,42 +22,64 @@ Notes to others:
 import networkx as nx
 from sklearn.pipeline import Pipeline, FeatureUnion
 
+from config import n_jobs as default_n_jobs
 
-def _traverse_graph(curr_node, G, mapper):
-    parents = list(G.predecessors(curr_node))
+
+def _traverse_graph(curr_node, G, mapper, n_jobs=1):
+    parents = [name for name in G.predecessors(curr_node) if name in mapper]
 
     if len(parents) == 0:
         return mapper[curr_node]
+
+    elif len(parents) == 1:
+        # A chain: extend the parent's pipeline instead of wrapping it in
+        # a union of one, which would only copy the data
+        upstream = _traverse_graph(parents[0], G, mapper, n_jobs)
+        if isinstance(upstream, Pipeline):
+            steps = list(upstream.steps)
+        else:
+            steps = [(parents[0], upstream)]
+
+        return Pipeline(steps + [(curr_node, mapper[curr_node])])
+
     else:
-        # TODO: Maybe skip the FeatureUnion if `len(parents)==1` ?
+        # Split the workers among the branches, so that nested unions
+        # don't start more processes than the budget
+        branch_jobs = max(n_jobs // len(parents), 1)
+
         return Pipeline([
             ("union", FeatureUnion([
-                (f"{name}", _traverse_graph(name, G, mapper))
+                (f"{name}", _traverse_graph(name, G, mapper, branch_jobs))
                 for name in parents
-                if name in mapper
-            ])),
+            ], n_jobs=min(n_jobs, len(parents)))),
             (curr_node, mapper[curr_node])
         ])
 
 
-def create_pipelines(graph):
+def create_pipelines(graph, n_jobs=None):
     """
     Create pipelines from cytoscape elements and a dict that maps a node \
     type to relevant parameters.
 
     Args:
-        data (list(dict)): Cytoscape elements.
-        node_options (dict): Parameters to be passed at the classes as \
-                             they are instantiated for the pipeline(s).
+        graph (`graph_structures._Graph`): The ModelBuilder graph.
+        n_jobs (int): Number of processes the branches of a node with \
+                      multiple parents are transformed with. Defaults \
+                      to `N_JOBS`.
 
     Returns:
         list, list: The pipelines and the terminal nodes.
 
     Notes on implementation:
         This uses networkx for easier traversal. Feel free to implement \
-        your own travel if you want to.
+        your own travel if you want to. Chains of nodes become a single \
+        flat `Pipeline`; only nodes with multiple parents get a \
+        `FeatureUnion`, whose branches run in parallel.
     """
 
+    if n_jobs is None:
+        n_jobs = default_n_jobs
+
     G = nx.DiGraph()
     terminal_nodes = []
 
@@ -79,7 +103,7 @@ def create_pipelines(graph):
 
     pipelines = []
     for terminal_node in terminal_nodes:
-        pipelines.append(_traverse_graph(terminal_node, G, mapper))
+        pipelines.append(_traverse_graph(terminal_node, G, mapper, n_jobs))
 
     return pipelines, terminal_nodes
 
@@ -119,3 +143,25 @@ def find_pipeline_node(GOAL):
                 return ret
 
     return _find_pipeline_input
+
+
+def set_n_jobs(pipeline, n_jobs=1):
+    """
+    Set the number of processes of every step of a pipeline that has \
+    one (e.g. the `FeatureUnion`s of `create_pipelines`, random \
+    forests). The budget of the worker that trained a pipeline means \
+    nothing to whoever loads it, so reset it before storing pipelines.
+
+    Args:
+        pipeline (sklearn-like estimator): e.g. as created by \
+                                           `create_pipelines`.
+        n_jobs (int): The number of processes.
+
+    Returns:
+        The same pipeline.
+    """
+
+    params = {name: n_jobs for name in pipeline.get_params(deep=True)
+              if name == "n_jobs" or name.endswith("__n_jobs")}
+
+    return pipeline.set_params(**params)
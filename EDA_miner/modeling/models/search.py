@@ -0,0 +1,215 @@
+"""
+This module collects functions for searching the hyperparameters of \
+pipelines.
+
+Functions:
+    - param_grid: Collect the `modifiable_params` of every step of a \
+                  pipeline, named as `set_params` expects them.
+    - sample_candidates: Enumerate or randomly sample a grid.
+    - successive_halving: Evaluate candidates with cross-validation on \
+                          growing subsets of the data, keeping the best \
+                          ones every round.
+
+Notes to others:
+    Candidates are evaluated in parallel, one task per candidate, so \
+    a round takes about (number of candidates / number of cores) times \
+    the time of one cross-validation. Candidates that fail (e.g. more \
+    PCA components than features) are scored NaN and dropped. They are \
+    cross-validated with `evaluation.cross_validate`, so the scores are \
+    the same metrics, on the same kind of splits, as those of training.
+"""
+
+from concurrent.futures import as_completed
+import time
+
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from sklearn.pipeline import Pipeline, FeatureUnion
+import pandas as pd
+import numpy as np
+
+from .evaluation import cross_validate, default_metrics, summarize
+from .evaluation import without_nested_jobs
+
+
+def param_grid(pipeline):
+    """
+    Collect the `modifiable_params` of every step of a pipeline, named \
+    as `set_params` expects them (e.g. "union__pca_001__n_components"). \
+    Parameters with only one possible value, or that the estimator \
+    doesn't actually accept, are skipped.
+
+    Args:
+        pipeline (sklearn-like estimator): A pipeline as created by \
+                                           `pipeline_creator`, or a \
+                                           single estimator.
+
+    Returns:
+        dict: Lists of possible values by parameter name.
+    """
+
+    steps = {"": pipeline}
+    for name, value in pipeline.get_params(deep=True).items():
+        if hasattr(value, "get_params"):
+            steps[f"{name}__"] = value
+
+    grid = {}
+    for prefix, step in steps.items():
+        if isinstance(step, (Pipeline, FeatureUnion)):
+            continue
+
+        accepted = step.get_params(deep=False)
+        for param, values in getattr(step, "modifiable_params", {}).items():
+            if param in accepted and len(values) > 1:
+                grid[f"{prefix}{param}"] = list(values)
+
+    return grid
+
+
+def sample_candidates(grid, n_candidates=None, random_state=0):
+    """
+    Enumerate or randomly sample a grid.
+
+    Args:
+        grid (dict): As returned by `param_grid`.
+        n_candidates (int): Maximum number of candidates. If the grid is \
+                            larger, this many are sampled at random. \
+                            None to enumerate the whole grid.
+        random_state (int): Seed for sampling.
+
+    Returns:
+        list(dict): The candidate parameters.
+    """
+
+    candidates = ParameterGrid(grid)
+
+    if n_candidates is None or len(candidates) <= n_candidates:
+        return list(candidates)
+
+    return list(ParameterSampler(grid, n_candidates,
+                                 random_state=random_state))
+
+
+def _evaluate(estimator, params, X, y, problem_type, n_splits, metric):
+    """
+    Cross-validate an estimator with the given parameters.
+
+    Returns:
+        tuple: Mean and standard deviation of the metric, fitting time \
+               and the error message, if any.
+    """
+
+    start = time.time()
+    try:
+        estimator = clone(estimator).set_params(**params)
+        folds = cross_validate(estimator, X, y, problem_type,
+                               n_splits=n_splits)["folds"]
+        summary = summarize(folds).loc[metric]
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        return np.nan, np.nan, time.time() - start, error
+
+    return summary["mean"], summary["std"], time.time() - start, ""
+
+
+def successive_halving(estimator, X, y, candidates, problem_type, pool=None,
+                       n_splits=3, factor=3, min_samples=None, metric=None,
+                       random_state=0, progress=None):
+    """
+    Evaluate candidates with cross-validation on growing subsets of the \
+    data, keeping the best 1/`factor` of them every round. The last \
+    round uses all the data.
+
+    Args:
+        estimator (sklearn-like estimator): The pipeline to search.
+        X (`pd.DataFrame`): The predictors.
+        y (`pd.Series` or `np.array`): The target.
+        candidates (list(dict)): As returned by `sample_candidates`.
+        problem_type (str): One of: regression, classification.
+        pool (`concurrent.futures.Executor`): Where to evaluate the \
+                                              candidates. None to \
+                                              evaluate them in order.
+        n_splits (int): Number of cross-validation folds.
+        factor (int): How many times fewer candidates (and more \
+                      samples) every round has.
+        min_samples (int): Number of samples of the first round. \
+                           Defaults to the size the rounds need to \
+                           end up using all the data.
+        metric (str): The metric to rank by, one of \
+                      `evaluation.default_metrics` where higher is \
+                      better. Defaults to the first one (R2 or Accuracy).
+        random_state (int): Seed for shuffling the samples.
+        progress (callable): Called with the fraction of evaluations done.
+
+    Returns:
+        `pd.DataFrame`: The leaderboard, one row per candidate with its \
+                        parameters, the round it reached, the samples \
+                        and scores of that round and the error, if any. \
+                        Sorted best first.
+    """
+
+    if metric is None:
+        metric = next(iter(default_metrics(problem_type)))
+
+    n_samples = len(X)
+    n_rounds = 1 + int(np.floor(np.log(max(len(candidates), 1))
+                                / np.log(factor)))
+    if min_samples is None:
+        min_samples = n_samples // factor**(n_rounds - 1)
+    min_samples = max(min_samples, 2 * n_splits)
+
+    # Subsets are prefixes of one shuffled order, so later rounds
+    # see every sample of the earlier ones
+    order = np.random.RandomState(random_state).permutation(n_samples)
+    X = X.iloc[order] if hasattr(X, "iloc") else X[order]
+    y = y.iloc[order] if hasattr(y, "iloc") else np.asarray(y)[order]
+
+    results = [{"params": params, "round": 0, "n_samples": 0,
+                "score": np.nan, "score_std": np.nan, "fit_time": 0.,
+                "error": ""} for params in candidates]
+
+    total = sum(int(np.ceil(len(candidates) / factor**i))
+                for i in range(n_rounds))
+    done = 0
+
+    alive = list(range(len(candidates)))
+    for round_ in range(n_rounds):
+        size = (n_samples if round_ == n_rounds - 1
+                else min(min_samples * factor**round_, n_samples))
+        args = (X[:size], y[:size], problem_type, n_splits, metric)
+
+        if pool is None:
+            evaluations = ((i, _evaluate(estimator, candidates[i], *args))
+                           for i in alive)
+        else:
+            futures = {pool.submit(without_nested_jobs, _evaluate,
+                                   estimator, candidates[i], *args): i
+                       for i in alive}
+            evaluations = ((futures[future], future.result())
+                           for future in as_completed(futures))
+
+        for i, (score, score_std, fit_time, error) in evaluations:
+            results[i].update({"round": round_ + 1, "n_samples": size,
+                               "score": score, "score_std": score_std,
+                               "error": error})
+            results[i]["fit_time"] += fit_time
+
+            done += 1
+            if progress is not None:
+                progress(done / total)
+
+        # Keep the best ones; failed candidates go last
+        alive = sorted((i for i in alive
+                        if not np.isnan(results[i]["score"])),
+                       key=lambda i: results[i]["score"], reverse=True)
+        alive = alive[:int(np.ceil(len(alive) / factor))]
+
+        if not alive:
+            break
+
+    leaderboard = pd.DataFrame(results)
+    leaderboard["failed"] = leaderboard["score"].isna()
+
+    return leaderboard.sort_values(["failed", "round", "score"],
+                                   ascending=[True, False, False]) \
+        .drop(columns="failed").reset_index(drop=True)
@@ -0,0 +1,177 @@
+"""
+This module caches the fitted steps of pipelines, so that pipelines \
+sharing a prefix (e.g. the same input, scaler and PCA in front of \
+different models) fit it only once.
+
+Functions:
+    - data_digest: Create a digest of the contents of a dataset.
+    - set_step_cache: Use (or stop using) a step cache in a pipeline \
+                      and every pipeline nested in it.
+
+Classes:
+    - StepCache: A Redis-backed replacement of `joblib.Memory` for the \
+                 `memory` parameter of `sklearn.pipeline.Pipeline`.
+
+Notes to others:
+    Entries are content-addressed: a fitted step is keyed by its class \
+    and parameters and by a digest of the data it was fitted on, which \
+    covers the dataset version, the columns, the rows (e.g. of a \
+    cross-validation fold) and every upstream step that transformed \
+    them. Pipelines are only given a cache while being fitted; remove \
+    it (see `set_step_cache`) before storing them.
+"""
+
+import hashlib
+
+from sklearn.pipeline import Pipeline
+from redis import Redis
+from scipy import sparse
+import pandas as pd
+import numpy as np
+import dill
+
+from caching import RedisLRUCache, make_key
+from .evaluation import estimator_digest
+
+
+def data_digest(data):
+    """
+    Create a digest of the contents of a dataset.
+
+    Args:
+        data: A `pd.DataFrame`, `pd.Series`, numpy array, scipy sparse \
+              matrix or None. Anything else is pickled.
+
+    Returns:
+        str: The same digest for equal data, across processes.
+    """
+
+    digest = hashlib.sha1()
+
+    if data is None:
+        digest.update(b"None")
+
+    elif isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(repr(data.shape).encode())
+        if isinstance(data, pd.DataFrame):
+            digest.update(repr(list(data.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(data).values.tobytes())
+
+    elif sparse.issparse(data):
+        data = data.tocsr()
+        digest.update(repr((data.shape, data.dtype.str)).encode())
+        for array in [data.data, data.indices, data.indptr]:
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+    elif isinstance(data, np.ndarray) and data.dtype != object:
+        digest.update(repr((data.shape, data.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(data).tobytes())
+
+    elif isinstance(data, np.ndarray):
+        # e.g. texts; hash them like pandas does
+        digest.update(repr(data.shape).encode())
+        digest.update(pd.util.hash_array(data.ravel()).tobytes())
+
+    else:
+        digest.update(dill.dumps(data))
+
+    return digest.hexdigest()
+
+
+class StepCache:
+    """
+    A Redis-backed replacement of `joblib.Memory` for the `memory` \
+    parameter of `sklearn.pipeline.Pipeline`, shared by all users and \
+    workers. Pipelines call `cache` with the function that fits and \
+    transforms a step; the wrapped function looks up the fitted step \
+    and its output before fitting.
+
+    Args:
+        cache (`caching.RedisLRUCache`): Where to store the fitted steps.
+
+    Further details:
+        Pipelines are cloned and sent to other processes (e.g. while \
+        cross-validating), so copies share the cache and pickling only \
+        keeps the connection parameters.
+    """
+
+    # Arguments of sklearn's `_fit_transform_one` that only control logging
+    _logging_args = {"message_clsname", "message"}
+
+    def __init__(self, cache):
+        self.step_cache = cache
+
+    def cache(self, func, ignore=None):
+        """
+        Wrap a function of (transformer, X, y, ...) so that its results \
+        are looked up in the cache first.
+
+        Args:
+            func (callable): e.g. sklearn's `_fit_transform_one`.
+            ignore (list(str)): Keyword arguments that don't change the \
+                                result.
+
+        Returns:
+            callable: The wrapped function.
+        """
+
+        ignored = self._logging_args.union(ignore or [])
+
+        def cached(transformer, X, y=None, *args, **kwargs):
+            key = make_key(func.__name__, estimator_digest(transformer),
+                           data_digest(X), data_digest(y), args,
+                           {name: value for name, value in kwargs.items()
+                            if name not in ignored})
+
+            return self.step_cache.get_or_compute(key, func, transformer,
+                                                  X, y, *args, **kwargs)
+
+        return cached
+
+    def __repr__(self):
+        # Part of the parameters of pipelines, so it must be stable
+        return f"StepCache({self.step_cache.namespace})"
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        cache = self.step_cache
+        connection = cache.redis_conn.connection_pool.connection_kwargs
+
+        return {"connection": {name: connection[name] for name
+                               in ["host", "port", "db", "password"]
+                               if name in connection},
+                "namespace": cache.namespace,
+                "max_bytes": cache.max_bytes, "ex": cache.ex}
+
+    def __setstate__(self, state):
+        self.step_cache = RedisLRUCache(
+            Redis(**state["connection"]), state["namespace"],
+            max_bytes=state["max_bytes"], ex=state["ex"])
+
+
+def set_step_cache(pipeline, step_cache):
+    """
+    Use (or stop using) a step cache in a pipeline and every pipeline \
+    nested in it.
+
+    Args:
+        pipeline (sklearn-like estimator): e.g. as created by \
+                                           `pipeline_creator`.
+        step_cache (`StepCache`): The cache, or None to stop using it.
+
+    Returns:
+        The same pipeline.
+    """
+
+    estimators = [pipeline] + [
+        value for value in pipeline.get_params(deep=True).values()
+        if isinstance(value, Pipeline)
+    ]
+
+    for estimator in estimators:
+        if isinstance(estimator, Pipeline):
+            estimator.memory = step_cache
+
+    return pipeline
@@ -0,0 +1,223 @@
+"""
+This module trains models out-of-core: the data are read in chunks of \
+rows and models that support it are fitted incrementally, so datasets \
+larger than the memory of a worker can be used.
+
+Classes:
+    - ClippedMinMaxScaler: Min-max scaling that keeps new values in the \
+                           range too.
+
+Functions:
+    - supports_partial_fit: Whether an estimator can be fitted in chunks.
+    - incremental_preprocessing: Get the scaler to put in front of an \
+                                 estimator trained in chunks.
+    - holdout_mask: Choose the rows of a chunk that are held out for \
+                    testing.
+    - stream_fit: Fit a scaler and an estimator in chunks and score them \
+                  on held out rows.
+
+Notes to others:
+    `read_chunks` (see `stream_fit`) is called once per pass over the \
+    data, e.g. with `utils.iter_dataset_chunks`. Rows are held out by a \
+    hash of their index, so they are the same whatever the order in \
+    which the chunks are read.
+"""
+
+import time
+
+from sklearn.linear_model import SGDRegressor, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from sklearn.pipeline import Pipeline
+import pandas as pd
+import numpy as np
+
+from .evaluation import default_metrics
+
+
+class ClippedMinMaxScaler(MinMaxScaler):
+    """
+    Min-max scaling that keeps new values in the range too: values \
+    beyond those seen while fitting (e.g. in rows that are predicted \
+    later) are clipped to the edges of `feature_range`.
+    """
+
+    def transform(self, X):
+        return np.clip(super().transform(X), *self.feature_range)
+
+
+def supports_partial_fit(estimator):
+    """
+    Whether an estimator can be fitted in chunks.
+
+    Args:
+        estimator (sklearn-like estimator or class): e.g. `SGDRegressor`.
+
+    Returns:
+        bool: Whether it has a `partial_fit` method.
+    """
+
+    return hasattr(estimator, "partial_fit")
+
+
+def incremental_preprocessing(estimator):
+    """
+    Get the scaler to put in front of an estimator trained in chunks. \
+    SGD needs standardized features, and `MultinomialNB` non-negative \
+    ones (see `ClippedMinMaxScaler`); the other naive Bayes models get \
+    the raw features.
+
+    Args:
+        estimator (sklearn-like estimator): The estimator.
+
+    Returns:
+        A new scaler with `partial_fit`, or None.
+    """
+
+    if isinstance(estimator, (SGDRegressor, SGDClassifier)):
+        return StandardScaler()
+
+    elif isinstance(estimator, MultinomialNB):
+        return ClippedMinMaxScaler()
+
+    return None
+
+
+def holdout_mask(chunk, test_size=0.2):
+    """
+    Choose the rows of a chunk that are held out for testing, by a \
+    hash of their index.
+
+    Args:
+        chunk (`pd.DataFrame`): The chunk.
+        test_size (float): Fraction of rows to hold out.
+
+    Returns:
+        np.array: True for the held out rows.
+    """
+
+    hashes = pd.util.hash_pandas_object(chunk.index, index=False).values
+
+    return (hashes % 1000) < test_size * 1000
+
+
+def _rows(chunk, xvars, yvar):
+    # Incremental models can't handle missing values
+    chunk = chunk.dropna(subset=list(xvars) + ([yvar] if yvar else []))
+
+    return chunk[xvars].values, (chunk[yvar].values if yvar else None), chunk
+
+
+def stream_fit(estimator, read_chunks, xvars, yvar, problem_type,
+               n_epochs=1, test_size=0.2, random_state=0, progress=None):
+    """
+    Fit a scaler (see `incremental_preprocessing`) and an estimator in \
+    chunks and score them on held out rows (see `holdout_mask`). The \
+    data are read `n_epochs + 2` times: to fit the scaler and find the \
+    classes, once per epoch, and to score the model.
+
+    Args:
+        estimator (sklearn-like estimator): With `partial_fit`.
+        read_chunks (callable): Takes a `random_state` (None for the \
+                                stored order) and returns an iterable \
+                                of `pd.DataFrame` chunks.
+        xvars (list(str)): predictor variables.
+        yvar (str): target variable. None for clustering.
+        problem_type (str): One of: regression, classification, clustering.
+        n_epochs (int): Number of passes over the data for fitting.
+        test_size (float): Fraction of rows to hold out.
+        random_state (int): Seed for shuffling the chunks every epoch.
+        progress (callable): Called with the fraction of passes done.
+
+    Returns:
+        dict: Like `evaluation.cross_validate`, with "folds" (the \
+              holdout as a single fold), "predictions" (of the held \
+              out rows only) and "estimator" (the fitted scaler and \
+              estimator as a `Pipeline`). Also "y_true", the target of \
+              the held out rows, and "classes", for classification.
+    """
+
+    scaler = incremental_preprocessing(estimator)
+    n_passes = n_epochs + 2
+    start = time.time()
+
+    # Fit the scaler and find the classes, which `partial_fit` needs
+    # from the first call on
+    classes = set()
+    n_train = 0
+    for chunk in read_chunks(None):
+        X, y, chunk = _rows(chunk, xvars, yvar)
+        train = ~holdout_mask(chunk, test_size)
+        n_train += train.sum()
+
+        if scaler is not None and train.any():
+            scaler.partial_fit(X[train])
+        if problem_type == "classification":
+            classes.update(y)
+
+    if progress is not None:
+        progress(1 / n_passes)
+
+    fit_kwargs = {}
+    if problem_type == "classification":
+        classes = np.array(sorted(classes))
+        fit_kwargs["classes"] = classes
+
+    for epoch in range(n_epochs):
+        for chunk in read_chunks(random_state + epoch):
+            X, y, chunk = _rows(chunk, xvars, yvar)
+            train = ~holdout_mask(chunk, test_size)
+            if not train.any():
+                continue
+
+            X = X[train] if scaler is None else scaler.transform(X[train])
+            if y is None:
+                estimator.partial_fit(X)
+            else:
+                estimator.partial_fit(X, y[train], **fit_kwargs)
+
+        if progress is not None:
+            progress((epoch + 2) / n_passes)
+
+    fit_time = time.time() - start
+    start = time.time()
+
+    y_true, predictions = [], []
+    for chunk in read_chunks(None):
+        X, y, chunk = _rows(chunk, xvars, yvar)
+        test = holdout_mask(chunk, test_size)
+        if not test.any():
+            continue
+
+        X = X[test] if scaler is None else scaler.transform(X[test])
+        predictions.append(estimator.predict(X))
+        if y is not None:
+            y_true.append(y[test])
+
+    predictions = np.concatenate(predictions) if predictions else np.array([])
+    if yvar is None:
+        y_true = None
+    else:
+        y_true = np.concatenate(y_true) if y_true else np.array([])
+
+    # An empty holdout (e.g. test_size=0) can't be scored
+    if len(predictions):
+        scores = {name: metric(y_true, predictions) for name, metric
+                  in default_metrics(problem_type).items()}
+    else:
+        scores = {name: np.nan for name in default_metrics(problem_type)}
+    folds = pd.DataFrame([dict(n_train=n_train, n_test=len(predictions),
+                               fit_time=fit_time,
+                               score_time=time.time() - start, **scores)])
+    folds.index.name = "fold"
+
+    if progress is not None:
+        progress(1)
+
+    steps = [("model", estimator)]
+    if scaler is not None:
+        steps.insert(0, ("scaler", scaler))
+
+    return {"folds": folds, "predictions": predictions,
+            "estimator": Pipeline(steps), "y_true": y_true,
+            "classes": classes if problem_type == "classification" else None}
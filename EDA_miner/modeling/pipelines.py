@@ -3,12 +3,27 @@ This module defines the interface for fitting (pre)defined pipelines.
 
 Functions:
     - Pipeline_Options: Generate the layout of the dashboard.
+    - load_training_data: Load the pipeline and the data to fit it on.
+    - train_pipeline: Cross-validate and fit the pipeline and create \
+                      the report. It runs as a background job.
+    - train_graph: Cross-validate every model of the graph of the \
+                   pipeline in one run. It runs as a background job.
+    - search_pipeline: Search the hyperparameters of the pipeline and \
+                       create a leaderboard. It runs as a background job.
 
 Dash callbacks:
     - render_variable_choices_pipeline: Create a menu of dcc components \
                                         for the user to choose fitting \
                                         options.
-    - fit_pipeline_model: Fits any pipelines defined.
+    - fit_model: Submit a job that fits any pipelines defined, or all \
+                 the models of their graph.
+    - poll_training_job: Show the progress of the training job and \
+                         its results when it's done.
+    - cancel_training_job: Cancel the training job.
+    - search_hyperparameters: Submit a job that searches the \
+                              hyperparameters of the pipeline.
+    - poll_search_job: Show the progress of the search job and the \
+                       leaderboard when it's done.
 
 Notes to others:
     You should probably not write code here, UNLESS reworking the interface.
@@ -19,24 +34,30 @@ from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.exceptions import PreventUpdate
+import dash
 
 import dash_bootstrap_components as dbc
 
-from .server import app, redis_conn
+from .server import app, redis_conn, evaluation_cache, step_cache
+from . import jobs, reports
 from utils import create_dropdown, get_data_schema
-from .models import pipeline_classes
-from visualization.graphs.graphs2d import scatterplot
-import layouts
+from utils import get_dataset_version
+from caching import make_key
+from .models import pipeline_classes, search, evaluation, graph_executor
+from .models.step_cache import set_step_cache
+from .models.pipeline_creator import set_n_jobs
 
 import pandas as pd
-import numpy as np
+import hashlib
 import dill
 from flask_login import current_user
-from sklearn.metrics import confusion_matrix
-import plotly.graph_objs as go
 from sklearn.base import ClusterMixin, ClassifierMixin, RegressorMixin
 
 
+# Larger grids are sampled down to this many candidates
+max_search_candidates = 50
+
+
 def Pipeline_Options(options):
     """
     Generate the layout of the dashboard.
@@ -70,6 +91,24 @@ def Pipeline_Options(options):
             html.Div(id="hidden_results_visualizations_pipeline",
                      style={"display": "none"}),
 
+            # Training runs in the background; poll for its status
+            dcc.Store(id="training_job_pipeline"),
+            dcc.Interval(id="training_job_poll_pipeline", interval=1000,
+                         disabled=True),
+            html.Div([
+                html.Span(id="training_status_pipeline"),
+                html.Button("Cancel training",
+                            id="cancel_training_pipeline"),
+                html.Span(id="training_cancel_status_pipeline"),
+            ]),
+
+            # Hyperparameter search, also in the background
+            dcc.Store(id="search_job_pipeline"),
+            dcc.Interval(id="search_job_poll_pipeline", interval=1000,
+                         disabled=True),
+            html.Span(id="search_status_pipeline"),
+            html.Div(id="search_leaderboard_pipeline"),
+
             # A modal for exporting the model
             dbc.Modal([
                 dbc.ModalHeader("Trained model export report."),
@@ -199,33 +238,45 @@ def render_variable_choices_pipeline(pipeline_choice):
         html.Div([
             html.H6("Export trained model..."),
             html.Button("Export!", id="export_model_button"),
+        ]),
+
+        html.Div([
+            html.H6("...evaluate every model of its graph at once"),
+            html.Button("Train all models", id="train_graph_button"),
+        ]),
+
+        html.Div([
+            html.H6("...or find its best parameters"),
+            html.Button("Search hyperparameters",
+                        id="search_pipeline_button"),
         ])
     ])
 
 
-@app.callback(
-    [Output("hidden_results_metrics_pipeline", "children"),
-     Output("hidden_results_visualizations_pipeline", "children"),
-     Output("export_model_as_name", "is_disabled")],
-    [Input("xvars_pipeline", "value"),
-     Input("yvars_pipeline", "value")],
-    [State('pipeline_choice', "value")])
-def fit_model(xvars, yvars, pipeline_choice):
+@app.callback(Output("training_job_pipeline", "data"),
+              [Input("xvars_pipeline", "value"),
+               Input("yvars_pipeline", "value"),
+               Input("train_graph_button", "n_clicks")],
+              [State('pipeline_choice', "value"),
+               State("training_job_pipeline", "data")])
+def fit_model(xvars, yvars, n_clicks, pipeline_choice, previous_job):
     """
-    Take user choices and, if all are present, fit the appropriate model. \
-    The results of fitting are given to hidden divs. When the user uses \
-    the tab menu then the appropriate menu is rendered.
+    Take user choices and, if all are present, submit a job that fits \
+    the appropriate model (see `train_pipeline`), or all the models of \
+    its graph if the button was clicked (see `train_graph`). The job \
+    of the previous choices, if still running, is cancelled. The \
+    results of fitting are given to hidden divs when the job is done. \
+    When the user uses the tab menu then the appropriate menu is rendered.
 
     Args:
         xvars (list(str)): predictor variables.
         yvars (str): target variable.
-        algo_choice (str): The choice of algorithm type.
-        dataset_choice (str): Name of the dataset.
-        problem_type (str): The type of learning problem.
+        n_clicks (int): Number of clicks of the "train all" button.
+        pipeline_choice (str): The pipeline to fit.
+        previous_job (str): The id of the previous training job.
 
     Returns:
-        list, dict: Dash element(s) with the results of model fitting,
-                    and parameters for plotting a graph.
+        str: The id of the training job.
     """
 
     # Make sure all variables have a value before fitting
@@ -234,18 +285,214 @@ def fit_model(xvars, yvars, pipeline_choice):
 
     user_id = current_user.username
 
-    pipeline = dill.loads(redis_conn.get(pipeline_choice))
     name = pipeline_choice.split("_")[2]
     model = dill.loads(redis_conn.get(f"{user_id}_graph_{name}"))
 
     output_node_id = "_".join(pipeline_choice.split("_")[-2:])
     output_node = model.graph.node_collection[output_node_id]
 
+    triggered = [t["prop_id"] for t in dash.callback_context.triggered]
+
+    if "train_graph_button.n_clicks" in triggered:
+        # The models of the graph share the data, so they all need a target
+        if yvars is None:
+            raise PreventUpdate()
+
+        if previous_job is not None:
+            jobs.cancel_job(previous_job)
+
+        return jobs.submit_job(train_graph, user_id, xvars, yvars,
+                               pipeline_choice, user_id=user_id)
+
     if not isinstance(output_node.model_class(), ClusterMixin):
         # Test if yvars was provided
         if yvars is None:
             raise PreventUpdate()
 
+    # e.g. picking more X variables makes the previous results useless
+    if previous_job is not None:
+        jobs.cancel_job(previous_job)
+
+    return jobs.submit_job(train_pipeline, user_id, xvars, yvars,
+                           pipeline_choice, user_id=user_id)
+
+
+@app.callback(
+    [Output("hidden_results_metrics_pipeline", "children"),
+     Output("hidden_results_visualizations_pipeline", "children"),
+     Output("export_model_as_name", "is_disabled"),
+     Output("training_status_pipeline", "children"),
+     Output("training_job_poll_pipeline", "disabled")],
+    [Input("training_job_poll_pipeline", "n_intervals"),
+     Input("training_job_pipeline", "data")])
+def poll_training_job(n_intervals, job_id):
+    """
+    Show the progress of the training job and its results when it's \
+    done. Polling stops when the job is no longer queued or running.
+
+    Args:
+        n_intervals (int): Number of times the job was polled.
+        job_id (str): The id of the training job.
+
+    Returns:
+        list, dict, bool, str, bool: The results of model fitting (if \
+                                     done), whether exporting is \
+                                     disabled, the status, and whether \
+                                     to stop polling.
+    """
+
+    if job_id is None:
+        raise PreventUpdate()
+
+    unchanged = [dash.no_update] * 3
+
+    job = jobs.get_job(job_id)
+    if job is None:
+        return unchanged + ["Training job expired.", True]
+
+    if job["status"] in ["queued", "running"]:
+        status = (f"Training ({job['status']}): {100*job['progress']:.0f}% "
+                  f"{job['message']}")
+        return unchanged + [status, False]
+
+    if job["status"] == "done":
+        metrics, figure = jobs.get_result(job_id)
+        return [metrics, figure, False, "Training done.", True]
+
+    if job["status"] == "failed":
+        return unchanged + [html.Pre(f"Training failed:\n{job['message']}"),
+                            True]
+
+    return unchanged + ["Training cancelled.", True]
+
+
+@app.callback(Output("training_cancel_status_pipeline", "children"),
+              [Input("cancel_training_pipeline", "n_clicks")],
+              [State("training_job_pipeline", "data")])
+def cancel_training_job(n_clicks, job_id):
+    """
+    Cancel the training job.
+
+    Args:
+        n_clicks (int): Number of button clicks.
+        job_id (str): The id of the training job.
+
+    Returns:
+        str: Whether the job is being cancelled.
+    """
+
+    if not n_clicks or job_id is None:
+        raise PreventUpdate()
+
+    if jobs.cancel_job(job_id):
+        return " Cancelling..."
+
+    return " Nothing to cancel."
+
+
+@app.callback(Output("search_job_pipeline", "data"),
+              [Input("search_pipeline_button", "n_clicks")],
+              [State("xvars_pipeline", "value"),
+               State("yvars_pipeline", "value"),
+               State('pipeline_choice', "value"),
+               State("search_job_pipeline", "data")])
+def search_hyperparameters(n_clicks, xvars, yvars, pipeline_choice,
+                           previous_job):
+    """
+    Submit a job that searches the hyperparameters of the pipeline \
+    (see `search_pipeline`), cancelling the previous search if it is \
+    still running. Only supervised pipelines can be searched.
+
+    Args:
+        n_clicks (int): Number of button clicks.
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        pipeline_choice (str): The pipeline to search.
+        previous_job (str): The id of the previous search job.
+
+    Returns:
+        str: The id of the search job.
+    """
+
+    if not n_clicks or any(x is None for x in [xvars, yvars,
+                                               pipeline_choice]):
+        raise PreventUpdate()
+
+    if previous_job is not None:
+        jobs.cancel_job(previous_job)
+
+    user_id = current_user.username
+
+    return jobs.submit_job(search_pipeline, user_id, xvars, yvars,
+                           pipeline_choice, user_id=user_id)
+
+
+@app.callback(
+    [Output("search_leaderboard_pipeline", "children"),
+     Output("search_status_pipeline", "children"),
+     Output("search_job_poll_pipeline", "disabled")],
+    [Input("search_job_poll_pipeline", "n_intervals"),
+     Input("search_job_pipeline", "data")])
+def poll_search_job(n_intervals, job_id):
+    """
+    Show the progress of the search job and the leaderboard when it's \
+    done. Polling stops when the job is no longer queued or running.
+
+    Args:
+        n_intervals (int): Number of times the job was polled.
+        job_id (str): The id of the search job.
+
+    Returns:
+        list, str, bool: The leaderboard (if done), the status, and \
+                         whether to stop polling.
+    """
+
+    if job_id is None:
+        raise PreventUpdate()
+
+    job = jobs.get_job(job_id)
+    if job is None:
+        return dash.no_update, "Search job expired.", True
+
+    if job["status"] in ["queued", "running"]:
+        status = (f"Searching ({job['status']}): {100*job['progress']:.0f}% "
+                  f"{job['message']}")
+        return dash.no_update, status, False
+
+    if job["status"] == "done":
+        return jobs.get_result(job_id), "Search done.", True
+
+    if job["status"] == "failed":
+        return (dash.no_update,
+                html.Pre(f"Search failed:\n{job['message']}"), True)
+
+    return dash.no_update, "Search cancelled.", True
+
+
+def load_training_data(user_id, xvars, yvars, pipeline_choice):
+    """
+    Load the pipeline and the data to fit it on.
+
+    Args:
+        user_id (str): The user that trains the pipeline.
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        pipeline_choice (str): The pipeline to fit.
+
+    Returns:
+        tuple: The pipeline, its output node, the predictors X, the \
+               target Y, the names of the X and Y columns in the \
+               data (i.e. without the input node ids), and the \
+               versions of the input datasets.
+    """
+
+    pipeline = dill.loads(redis_conn.get(pipeline_choice))
+    name = pipeline_choice.split("_")[2]
+    model = dill.loads(redis_conn.get(f"{user_id}_graph_{name}"))
+
+    output_node_id = "_".join(pipeline_choice.split("_")[-2:])
+    output_node = model.graph.node_collection[output_node_id]
+
     # Initialize the clean version of yvars.
     # The clean versions are used for pandas indexing.
     # The original versions MIGHT be used during the
@@ -253,8 +500,10 @@ def fit_model(xvars, yvars, pipeline_choice):
     clean_yvars = yvars
 
     datasets = []
+    versions = []
     for input_node in model.input_nodes:
         dataset = input_node.params["dataset"]
+        versions.append(get_dataset_version(dataset, redis_conn))
         columns = list(get_data_schema(dataset, redis_conn)["types"].keys())
         columns.extend(columns)
 
@@ -290,88 +539,231 @@ def fit_model(xvars, yvars, pipeline_choice):
     # This might also need fixing as Y might exist in only one dataset
     Y = datasets[0][clean_yvars]
 
+    return pipeline, output_node, X, Y, clean_xvars, clean_yvars, versions
+
+
+def train_pipeline(user_id, xvars, yvars, pipeline_choice):
+    """
+    Fit the pipeline and create the report. Supervised pipelines are \
+    cross-validated (see `evaluation.cross_validate`) and the results, \
+    including the pipeline fitted on all the data, are cached. It runs \
+    as a background job (see `jobs`), so it takes plain arguments and \
+    reports its progress. The fitted pipeline is saved for an hour.
+
+    Args:
+        user_id (str): The user that trains the pipeline.
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        pipeline_choice (str): The pipeline to fit.
+
+    Returns:
+        list, dict: Dash element(s) with the results of model fitting,
+                    and parameters for plotting a graph.
+    """
+
+    jobs.report_progress(0.05, "Loading the data")
+
+    pipeline, output_node, X, Y, clean_xvars, clean_yvars, versions = \
+        load_training_data(user_id, xvars, yvars, pipeline_choice)
+    name = pipeline_choice.split("_")[2]
+    classes = None
+
     # If we have a classification problem...
     if isinstance(output_node.model_class(), ClassifierMixin):
-        Y = pd.factorize(Y)[0]
+        problem_type = "classification"
+        X, Y, classes = evaluation.encode_target(X, Y)
+
+    elif isinstance(output_node.model_class(), RegressorMixin):
+        problem_type = "regression"
+
+    else:
+        problem_type = None
 
-    pipeline.fit(X, Y)
+    # Reuse the steps fitted for other pipelines with the same prefix
+    set_step_cache(pipeline, step_cache)
+
+    if problem_type is not None:
+        # Cross-validate, and fit on all the data for exporting
+        jobs.report_progress(0.2, "Cross-validating the pipeline")
+        key = make_key("evaluation", evaluation.estimator_digest(pipeline),
+                       versions, xvars, yvars, problem_type)
+        results = evaluation_cache.get_or_compute(
+            key, evaluation.cross_validate, pipeline, X, Y, problem_type,
+            pool=jobs.get_pool(), refit=True)
+
+        pipeline = results["estimator"]
+        predictions = results["predictions"]
+        metrics = reports.metrics_report(problem_type, results,
+                                         y_true=Y, classes=classes)
+
+    else:
+        jobs.report_progress(0.2, "Fitting the pipeline")
+        predictions = pipeline.fit(X, Y).predict(X)
+        metrics = reports.metrics_report("clustering", labels=predictions)
 
     # Save the fitted model for 1 hour. If the users want, they can save it
-    # in the next step.
-    redis_conn.set(f"{user_id}_trainedModel_{name}",
-                   dill.dumps(pipeline),
-                   ex=3600)
+    # in the next step. The version and the columns (in the order the
+    # model expects them) are needed for serving it (see `serving`).
+    set_step_cache(pipeline, None)
+    set_n_jobs(pipeline, 1)
+    data = dill.dumps(pipeline)
+    redis_conn.set(f"{user_id}_trainedModel_{name}", data, ex=3600)
+    redis_conn.set(f"{user_id}_trainedModelVersion_{name}",
+                   hashlib.sha1(data).hexdigest(), ex=3600)
     redis_conn.set(f"{user_id}_trainedModelParams_{name}",
                    dill.dumps({"xvars": xvars,
-                               "yvars": yvars}),
+                               "yvars": yvars,
+                               "columns": list(X.columns),
+                               "classes": classes}),
                    ex=3600)
 
-    predictions = pipeline.predict(X)
-    score = pipeline.score(X, Y)
+    figure = reports.predictions_figure(X[clean_xvars], predictions,
+                                        clean_yvars)
 
-    # TODO: EVERYTHING below here is the same as in single_model.
-    #       Consider refactoring.
-    metrics = []
-    if isinstance(output_node.model_class(), RegressorMixin):
-        metrics.append(html.H4(f"Mean Squared Error: {score:.3f}"))
+    return metrics, figure
 
-    elif isinstance(output_node.model_class(), ClassifierMixin):
-        metrics.append(html.H4(f"Accuracy: {100*score:.3f} %"))
-        metrics.append(html.H4("Confusion matrix:"))
 
-        classes = datasets[0][clean_yvars].unique()
+def train_graph(user_id, xvars, yvars, pipeline_choice):
+    """
+    Cross-validate every model of the graph of the pipeline in one run, \
+    fitting the steps they share only once (see \
+    `graph_executor.execute_graph`), and create a report for each. The \
+    results are cached. It runs as a background job (see `jobs`).
 
-        confusion = confusion_matrix(Y, predictions)
-        metrics.append(html.Table([
-            html.Thead([html.Th(" ")] + [html.Th(cls) for cls in classes]),
+    Args:
+        user_id (str): The user that trains the graph.
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        pipeline_choice (str): One of the pipelines of the graph. Its \
+                               predictions are plotted.
 
-            html.Tbody([
-               html.Tr([html.Td(html.B(cls))]+[
-                   html.Td(item) for item in row
-               ]) for (cls, row) in zip(classes, confusion)
-            ])
-        ]))
+    Returns:
+        list, dict: Dash element(s) with the results of model fitting,
+                    and parameters for plotting a graph.
+    """
+
+    jobs.report_progress(0.05, "Loading the data")
+
+    _, _, X, Y, clean_xvars, clean_yvars, versions = \
+        load_training_data(user_id, xvars, yvars, pipeline_choice)
+    name = pipeline_choice.split("_")[2]
+    model = dill.loads(redis_conn.get(f"{user_id}_graph_{name}"))
+    codes, classes = pd.factorize(Y)
+
+    def progress(fraction):
+        jobs.report_progress(0.1 + 0.9 * fraction, "Fitting the graph")
+
+    nodes = model.graph.node_collection
+    structure = ([(node.id, node.node_type, node.params)
+                  for node in nodes.nodes],
+                 [(edge.src_node.id, edge.dest_node.id)
+                  for edge in model.graph.edge_collection.edges])
+    key = make_key("graph_evaluation", structure, versions, xvars, yvars)
+    results = evaluation_cache.get_or_compute(
+        key, graph_executor.execute_graph, model, X, Y,
+        pool=jobs.get_pool(), progress=progress)
 
+    metrics = []
+    for node_id, result in results.items():
+        metrics.append(html.H3(f"{nodes[node_id].label} ({node_id})"))
+
+        if result["error"] is not None:
+            metrics.append(html.Pre(result["error"]))
+            continue
+
+        metrics.extend(reports.metrics_report(
+            result["problem_type"], result, y_true=codes, classes=classes,
+            labels=result["predictions"]))
+
+    output_node_id = "_".join(pipeline_choice.split("_")[-2:])
+    result = results.get(output_node_id)
+    if result is None or result["error"] is not None:
+        figure = {}
     else:
-        metrics.append("Not implemented")
-
-    # TODO: Visualize the (in)correctly grouped points.
-    # If we have >=2 variables, visualize the classification
-    if len(xvars) >= 3:
-
-        trace1 = go.Scatter3d(x=X[clean_xvars[0]],
-                              y=X[clean_xvars[1]],
-                              z=X[clean_xvars[2]],
-                              showlegend=False,
-                              mode='markers',
-                              marker={
-                                  'color': predictions.astype(np.float),
-                                  'line': dict(color='black', width=1)
-                              })
-
-        figure = {
-            'data': [trace1],
-            'layout': layouts.default_2d(clean_xvars[0], clean_yvars)
-        }
-
-    elif len(xvars) == 2:
-        traces = scatterplot(X[clean_xvars[0]], X[clean_xvars[1]],
-                             marker={'color': predictions.astype(np.float)})
-
-        figure = {
-            'data': [traces],
-            'layout': go.Layout(
-                xaxis={'title': clean_xvars[0]},
-                yaxis={'title': clean_xvars[1]},
-                legend={'x': 0, 'y': 1},
-                hovermode='closest'
-            )
-        }
+        figure = reports.predictions_figure(X[clean_xvars],
+                                            result["predictions"],
+                                            clean_yvars)
+
+    return metrics, figure
+
+
+def search_pipeline(user_id, xvars, yvars, pipeline_choice,
+                    n_candidates=max_search_candidates):
+    """
+    Search the hyperparameters of the pipeline and create a \
+    leaderboard. The grid is made of the `modifiable_params` of every \
+    node, and candidates are cross-validated in parallel with \
+    successive halving (see `models.search`). It runs as a background \
+    job (see `jobs`).
+
+    Args:
+        user_id (str): The user that searches the pipeline.
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        pipeline_choice (str): The pipeline to search.
+        n_candidates (int): Larger grids are sampled down to this many.
+
+    Returns:
+        list: Dash element(s) with the leaderboard.
+    """
 
+    jobs.report_progress(0.05, "Loading the data")
+
+    pipeline, output_node, X, Y, _, _, _ = \
+        load_training_data(user_id, xvars, yvars, pipeline_choice)
+
+    if isinstance(output_node.model_class(), ClassifierMixin):
+        problem_type = "classification"
+        X, Y, _ = evaluation.encode_target(X, Y)
     else:
-        figure = {}
+        problem_type = "regression"
+
+    # Candidates that differ only in later steps share the earlier ones
+    set_step_cache(pipeline, step_cache)
 
-    return metrics, figure, False
+    grid = search.param_grid(pipeline)
+    if not grid:
+        return [html.H4("The pipeline has no parameters to search.")]
+
+    candidates = search.sample_candidates(grid, n_candidates)
+
+    def progress(fraction):
+        jobs.report_progress(0.1 + 0.9 * fraction,
+                             f"Cross-validating {len(candidates)} candidates")
+
+    metric = next(iter(evaluation.default_metrics(problem_type)))
+    leaderboard = search.successive_halving(pipeline, X, Y, candidates,
+                                            problem_type,
+                                            pool=jobs.get_pool(),
+                                            metric=metric,
+                                            progress=progress)
+
+    # e.g. "union__pca_001__n_components" -> "pca_001__n_components"
+    def short_name(param):
+        return "__".join(param.split("__")[-2:])
+
+    return [
+        html.H4(f"Leaderboard ({len(grid)} parameters, "
+                f"{len(candidates)} candidates):"),
+        html.Table([
+            html.Thead([html.Th(col) for col in [
+                "#", "Parameters", metric, "Samples", "Fit time (s)",
+                "Error"]]),
+
+            html.Tbody([
+                html.Tr([
+                    html.Td(rank + 1),
+                    html.Td(", ".join(f"{short_name(param)}={value}"
+                                      for param, value
+                                      in row["params"].items())),
+                    html.Td(f"{row['score']:.3f} ± {row['score_std']:.3f}"),
+                    html.Td(row["n_samples"]),
+                    html.Td(f"{row['fit_time']:.1f}"),
+                    html.Td(row["error"]),
+                ]) for rank, row in enumerate(leaderboard.to_dict("records"))
+            ])
+        ])
+    ]
 
 
 @app.callback([Output("export_model_modal", "is_open"),
@@ -388,7 +780,7 @@ def export_model_as(n_clicks, pipeline_choice):
     # Check how many models the user has saved. If they are at
     # their limit, then don't save this model.
     total_permanent_models = 0
-    for key in redis_conn.keys(f"{user_id}_trainedModel*"):
+    for key in redis_conn.keys(f"{user_id}_trainedModel_*"):
         if redis_conn.ttl(key) == -1:
             total_permanent_models += 1
 
@@ -396,7 +788,8 @@ def export_model_as(n_clicks, pipeline_choice):
         return True, html.Div("Delete an existing model before saving "
                               "a new one, or contact the admin for favors.")
 
-    # Permanently save the model.
-    redis_conn.persist(f"{user_id}_trainedModel_{name}")
+    # Permanently save the model, along with what serving it needs
+    for kind in ["trainedModel", "trainedModelParams", "trainedModelVersion"]:
+        redis_conn.persist(f"{user_id}_{kind}_{name}")
 
     return True, html.Div(f"Saved model {name} successfully")
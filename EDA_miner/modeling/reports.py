@@ -0,0 +1,210 @@
+"""
+This module creates the fitting reports of the "Single model" and \
+"Pipelines trainer" tabs. Everything is derived from the predictions \
+of the model, which are computed once (usually out-of-fold, see \
+`models.evaluation`), so creating a report never runs the model again.
+
+Functions:
+    - cv_report: Create the report of cross-validation.
+    - confusion_report: Create the confusion matrix of a classifier.
+    - clusters_report: Create the table of cluster sizes.
+    - metrics_report: Create the text report for a type of problem.
+    - predictions_figure: Plot the data colored by the predictions.
+
+Notes to others:
+    Add new metrics to `models.evaluation.default_metrics`, so that \
+    they are computed per fold and show up in `cv_report`.
+"""
+
+import dash_html_components as html
+import plotly.graph_objs as go
+import pandas as pd
+import numpy as np
+
+from sklearn.metrics import confusion_matrix
+
+from .models import evaluation
+from visualization.graphs.graphs2d import scatterplot
+import layouts
+
+
+def cv_report(folds):
+    """
+    Create the report of cross-validation: the mean and standard \
+    deviation of every metric, and the metrics and timings of every fold.
+
+    Args:
+        folds (`pd.DataFrame`): As returned by \
+                                `evaluation.cross_validate`.
+
+    Returns:
+        list: Dash elements.
+    """
+
+    summary = evaluation.summarize(folds)
+
+    return [
+        html.H4(f"Cross-validation ({len(folds)} folds):"),
+        html.Table([
+            html.Tbody([
+                html.Tr([html.Td(html.B(metric)),
+                         html.Td(f"{row['mean']:.3f} ± {row['std']:.3f}")])
+                for metric, row in summary.iterrows()
+            ])
+        ]),
+
+        html.H6("Per fold:"),
+        html.Table([
+            html.Thead([html.Th(col) for col in ["Fold", *folds.columns]]),
+
+            html.Tbody([
+                html.Tr([html.Td(fold + 1)] + [
+                    html.Td(f"{value:.3f}" if isinstance(value, float)
+                            else value)
+                    for value in row
+                ]) for fold, row in zip(folds.index,
+                                        folds.itertuples(index=False))
+            ])
+        ]),
+    ]
+
+
+def confusion_report(y_true, predictions, classes):
+    """
+    Create the confusion matrix of a classifier.
+
+    Args:
+        y_true (np.array): The class codes (see `pd.factorize`).
+        predictions (np.array): The predicted class codes. NaN for \
+                                samples that weren't predicted.
+        classes (iterable): The class of every code.
+
+    Returns:
+        list: Dash elements.
+    """
+
+    predicted = ~np.isnan(predictions)
+    confusion = confusion_matrix(np.asarray(y_true)[predicted],
+                                 predictions[predicted].astype(int),
+                                 labels=np.arange(len(classes)))
+
+    return [
+        html.H4("Confusion matrix (out-of-fold):"),
+        html.Table([
+            html.Thead([html.Th(" ")] + [html.Th(cls) for cls in classes]),
+
+            html.Tbody([
+               html.Tr([html.Td(html.B(cls))]+[
+                   html.Td(item) for item in row
+               ]) for (cls, row) in zip(classes, confusion)
+            ])
+        ]),
+    ]
+
+
+def clusters_report(labels):
+    """
+    Create the table of cluster sizes.
+
+    Args:
+        labels (np.array): The cluster of every sample.
+
+    Returns:
+        list: Dash elements.
+    """
+
+    sizes = pd.Series(labels).value_counts()
+
+    return [
+        html.H4(f"Clusters ({len(sizes)}):"),
+        html.Table([
+            html.Thead([html.Th("Cluster"), html.Th("Samples")]),
+
+            html.Tbody([
+                html.Tr([html.Td(cluster), html.Td(size)])
+                for cluster, size in sizes.items()
+            ])
+        ]),
+    ]
+
+
+def metrics_report(problem_type, results=None, y_true=None, classes=None,
+                   labels=None):
+    """
+    Create the text report for a type of problem.
+
+    Args:
+        problem_type (str): One of: regression, classification, clustering.
+        results (dict): As returned by `evaluation.cross_validate`, \
+                        for supervised problems.
+        y_true (np.array): The class codes, for classification.
+        classes (iterable): The class of every code, for classification.
+        labels (np.array): The cluster of every sample, for clustering.
+
+    Returns:
+        list: Dash elements.
+    """
+
+    if problem_type == "regression":
+        return cv_report(results["folds"])
+
+    elif problem_type == "classification":
+        return (cv_report(results["folds"])
+                + confusion_report(y_true, results["predictions"], classes))
+
+    elif labels is not None:
+        return clusters_report(labels)
+
+    return ["Not implemented"]
+
+
+def predictions_figure(X, predictions, yvar=None):
+    """
+    Plot the data colored by the predictions: the first three (or two) \
+    columns in 3D (or 2D).
+
+    Args:
+        X (`pd.DataFrame`): The predictors.
+        predictions (np.array): The prediction for every row of `X`.
+        yvar (str): The target variable, if any.
+
+    Returns:
+        dict: A plotly figure, or empty if `X` has less than 2 columns.
+    """
+
+    # TODO: Visualize the (in)correctly grouped points.
+    colors = np.asarray(predictions, dtype=float)
+    columns = list(X.columns)
+
+    if len(columns) >= 3:
+
+        trace = go.Scatter3d(x=X[columns[0]],
+                             y=X[columns[1]],
+                             z=X[columns[2]],
+                             showlegend=False,
+                             mode='markers',
+                             marker={
+                                 'color': colors,
+                                 'line': dict(color='black', width=1)
+                             })
+
+        return {
+            'data': [trace],
+            'layout': layouts.default_2d(columns[0], yvar)
+        }
+
+    elif len(columns) == 2:
+        trace = scatterplot(X[columns[0]], X[columns[1]],
+                            marker={'color': colors})
+
+        return {
+            'data': [trace],
+            'layout': go.Layout(
+                xaxis={'title': columns[0]},
+                yaxis={'title': columns[1]},
+                legend={'x': 0, 'y': 1},
+                hovermode='closest'
+            )
+        }
+
+    return {}
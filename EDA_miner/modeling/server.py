@@ -6,14 +6,30 @@ Global Variables:
     - app: The Dash server, imported everywhere that a dash callback \
            needs to be defined.
     - r: The connection to Redis.
+    - evaluation_cache: Size-bounded cache for cross-validation results.
+    - step_cache: Cache for the fitted steps of pipelines, to be used \
+                  as their `memory`.
 """
 
 from dash import Dash
 from redis import Redis
 
+from caching import RedisLRUCache
+from .models.step_cache import StepCache
+
 
 redis_conn = Redis()
 
+# Keyed by model parameters and dataset versions, so re-opening a
+# report doesn't refit anything
+evaluation_cache = RedisLRUCache(redis_conn, "evaluations",
+                                 max_bytes=256*2**20)
+
+# Pipelines that share a prefix (e.g. the variants of a search) fit it
+# only once
+step_cache = StepCache(RedisLRUCache(redis_conn, "fitted_steps",
+                                     max_bytes=512*2**20))
+
 app = Dash(__name__, requests_pathname_prefix="/modeling/",
            assets_external_path="http://127.0.0.1:8000/static/")
 
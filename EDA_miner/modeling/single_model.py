@@ -5,12 +5,22 @@ clustering. It also reports fitting metrics and a graph.
 
 Functions:
     - single_model_options: Generate the layout of the dashboard.
+    - train_single_model: Cross-validate the model and create the \
+                          report. It runs as a background job.
+    - train_single_model_streaming: Train the model out-of-core and \
+                                    create the report. It runs as a \
+                                    background job.
 
 Dash callbacks:
     - render_choices: Create a menu for fitting options, depending of \
                       the problem type.
-    - fit_model: Take user choices and, if all are present, fit the \
-                 appropriate model.
+    - toggle_streaming: Allow training in chunks only for algorithms \
+                        that support it.
+    - fit_model: Take user choices and, if all are present, submit a \
+                 job that fits the appropriate model.
+    - poll_training_job: Show the progress of the training job and \
+                         its results when it's done.
+    - cancel_training_job: Cancel the training job.
     - render_report: Get the results (graph and text metrics) and show them.
 
 Notes to others:
@@ -22,19 +32,22 @@ from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.exceptions import PreventUpdate
+import dash
 
-from .server import app, redis_conn
+from .server import app, redis_conn, evaluation_cache
 from .models.graph_structures import ml_options, node_options
-import layouts
+from .models import evaluation, streaming
+from . import jobs, reports
 from utils import create_dropdown, get_data_schema
-from visualization.graphs.graphs2d import scatterplot
+from utils import get_dataset_version
+from utils import iter_dataset_chunks
+from caching import make_key
 
-import plotly.graph_objs as go
-import numpy as np
 import pandas as pd
+import numpy as np
 import dill
 
-from sklearn.metrics import confusion_matrix
+from flask_login import current_user
 
 
 def single_model_options(options):
@@ -65,6 +78,16 @@ def single_model_options(options):
             html.Div(id="hidden_results_visualizations",
                      style={"display": "none"}),
 
+            # Training runs in the background; poll for its status
+            dcc.Store(id="training_job"),
+            dcc.Interval(id="training_job_poll", interval=1000,
+                         disabled=True),
+            html.Div([
+                html.Span(id="training_status"),
+                html.Button("Cancel training", id="cancel_training"),
+                html.Span(id="training_cancel_status"),
+            ]),
+
             # The fitting results (target of the tab menu)
             html.Div(id="fitting_report")
         ], id="training_results_div"),
@@ -174,22 +197,161 @@ def render_choices(problem_type, dataset_choice):
                                  options=var_options,
                                  multi=False, id="yvars",
                                  disabled=disabled_y)),
+
+        # For datasets that don't fit in memory
+        dcc.Checklist(id="streaming", value=[]),
     ])
 
 
+@app.callback(Output("streaming", "options"),
+              [Input("algo_choice", "value")])
+def toggle_streaming(algo_choice):
+    """
+    Allow training in chunks (out-of-core) only for algorithms that \
+    support it (see `streaming.supports_partial_fit`).
+
+    Args:
+        algo_choice (str): The choice of algorithm type.
+
+    Returns:
+        list(dict): The options of the checklist.
+    """
+
+    supported = (algo_choice is not None and streaming.supports_partial_fit(
+        node_options[algo_choice]["model_class"]))
+
+    return [{"label": "Train in chunks (out-of-core)",
+             "value": "streaming", "disabled": not supported}]
+
+
+@app.callback(Output("training_job", "data"),
+              [Input("xvars", "value"),
+               Input("yvars", "value"),
+               Input('algo_choice', "value"),
+               Input("streaming", "value")],
+              [State("dataset_choice", "value"),
+               State("problem_type", "value"),
+               State("training_job", "data")])
+def fit_model(xvars, yvars, algo_choice, streaming_mode, dataset_choice,
+              problem_type, previous_job):
+    """
+    Take user choices and, if all are present, submit a job that fits \
+    the appropriate model (see `train_single_model`). The job of the \
+    previous choices, if still running, is cancelled. The results of \
+    fitting are given to hidden divs when the job is done. When the \
+    user uses the tab menu then the appropriate menu is rendered.
+
+    Args:
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        algo_choice (str): The choice of algorithm type.
+        streaming_mode (list(str)): Contains "streaming" for training \
+                                    in chunks.
+        dataset_choice (str): Name of the dataset.
+        problem_type (str): The type of learning problem.
+        previous_job (str): The id of the previous training job.
+
+    Returns:
+        str: The id of the training job.
+    """
+
+    # Make sure all variables have a value before fitting
+    if any(x is None for x in [xvars, yvars, dataset_choice,
+                               algo_choice]):
+        raise PreventUpdate()
+
+    train = train_single_model
+    if (streaming_mode and "streaming" in streaming_mode and
+            streaming.supports_partial_fit(
+                node_options[algo_choice]["model_class"])):
+        train = train_single_model_streaming
+
+    # e.g. picking more X variables makes the previous results useless
+    if previous_job is not None:
+        jobs.cancel_job(previous_job)
+
+    return jobs.submit_job(train, xvars, yvars, algo_choice,
+                           dataset_choice, problem_type,
+                           user_id=current_user.username)
+
+
 @app.callback(
     [Output("hidden_results_metrics", "children"),
-     Output("hidden_results_visualizations", "children")],
-    [Input("xvars", "value"),
-     Input("yvars", "value"),
-     Input('algo_choice', "value")],
-    [State("dataset_choice", "value"),
-     State("problem_type", "value")])
-def fit_model(xvars, yvars, algo_choice, dataset_choice, problem_type):
+     Output("hidden_results_visualizations", "children"),
+     Output("training_status", "children"),
+     Output("training_job_poll", "disabled")],
+    [Input("training_job_poll", "n_intervals"),
+     Input("training_job", "data")])
+def poll_training_job(n_intervals, job_id):
+    """
+    Show the progress of the training job and its results when it's \
+    done. Polling stops when the job is no longer queued or running.
+
+    Args:
+        n_intervals (int): Number of times the job was polled.
+        job_id (str): The id of the training job.
+
+    Returns:
+        list, dict, str, bool: The results of model fitting (if done), \
+                               the status, and whether to stop polling.
+    """
+
+    if job_id is None:
+        raise PreventUpdate()
+
+    job = jobs.get_job(job_id)
+    if job is None:
+        return dash.no_update, dash.no_update, "Training job expired.", True
+
+    if job["status"] in ["queued", "running"]:
+        status = (f"Training ({job['status']}): {100*job['progress']:.0f}% "
+                  f"{job['message']}")
+        return dash.no_update, dash.no_update, status, False
+
+    if job["status"] == "done":
+        metrics, figure = jobs.get_result(job_id)
+        return metrics, figure, "Training done.", True
+
+    if job["status"] == "failed":
+        return (dash.no_update, dash.no_update,
+                html.Pre(f"Training failed:\n{job['message']}"), True)
+
+    return dash.no_update, dash.no_update, "Training cancelled.", True
+
+
+@app.callback(Output("training_cancel_status", "children"),
+              [Input("cancel_training", "n_clicks")],
+              [State("training_job", "data")])
+def cancel_training_job(n_clicks, job_id):
     """
-    Take user choices and, if all are present, fit the appropriate model. \
-    The results of fitting are given to hidden divs. When the user uses \
-    the tab menu then the appropriate menu is rendered.
+    Cancel the training job.
+
+    Args:
+        n_clicks (int): Number of button clicks.
+        job_id (str): The id of the training job.
+
+    Returns:
+        str: Whether the job is being cancelled.
+    """
+
+    if not n_clicks or job_id is None:
+        raise PreventUpdate()
+
+    if jobs.cancel_job(job_id):
+        return " Cancelling..."
+
+    return " Nothing to cancel."
+
+
+def train_single_model(xvars, yvars, algo_choice, dataset_choice,
+                       problem_type):
+    """
+    Cross-validate the model and create the report. Supervised models \
+    are scored on the folds they weren't fitted on (see \
+    `evaluation.cross_validate`), and the results are cached so that \
+    training the same model on the same data again doesn't refit. \
+    It runs as a background job (see `jobs`), so it takes plain \
+    arguments and reports its progress.
 
     Args:
         xvars (list(str)): predictor variables.
@@ -203,12 +365,11 @@ def fit_model(xvars, yvars, algo_choice, dataset_choice, problem_type):
                     and parameters for plotting a graph.
     """
 
-    df = dill.loads(redis_conn.get(dataset_choice))
+    jobs.report_progress(0.05, "Loading the data")
 
-    # Make sure all variables have a value before fitting
-    if any(x is None for x in [xvars, yvars, df, dataset_choice,
-                               algo_choice]):
-        raise PreventUpdate()
+    df = dill.loads(redis_conn.get(dataset_choice))
+    version = get_dataset_version(dataset_choice, redis_conn)
+    X = df[xvars]
 
     # The inverse mapping of ml_options, use it to get the sklearn model
     model = node_options[algo_choice]["model_class"]()
@@ -216,69 +377,92 @@ def fit_model(xvars, yvars, algo_choice, dataset_choice, problem_type):
     # TODO: This probably needs a better/cleaner implementation and/or
     #       might need to be used in other parts as well.
     y = pd.factorize(df[yvars])
-    model.fit(df[xvars], y[0])
 
-    predictions = model.predict(df[xvars])
-    score = model.score(df[xvars], y[0])
+    if problem_type in ["regression", "classification"]:
+        target = y[0] if problem_type == "classification" else df[yvars]
+
+        jobs.report_progress(0.2, "Cross-validating the model")
+        key = make_key("evaluation", evaluation.estimator_digest(model),
+                       version, xvars, yvars, problem_type)
+        results = evaluation_cache.get_or_compute(
+            key, evaluation.cross_validate, model, X, target,
+            problem_type, pool=jobs.get_pool())
 
-    metrics = []
-    if problem_type == "regression":
-        metrics.append(html.H4(f"Mean Squared Error: {score:.3f}"))
+        predictions = results["predictions"]
+        metrics = reports.metrics_report(problem_type, results,
+                                         y_true=y[0], classes=y[1])
 
-    elif problem_type == "classification":
-        metrics.append(html.H4(f"Accuracy: {100*score:.3f} %"))
-        metrics.append(html.H4("Confusion matrix:"))
+    else:
+        jobs.report_progress(0.2, "Fitting the model")
+        if hasattr(model, "fit_predict"):
+            predictions = model.fit_predict(X)
+        else:
+            predictions = model.fit(X, y[0]).predict(X)
+        metrics = reports.metrics_report(problem_type, labels=predictions)
 
-        classes = df[yvars].unique()
+    figure = reports.predictions_figure(X, predictions, yvars)
 
-        confusion = confusion_matrix(y[0], predictions)
-        metrics.append(html.Table([
-            html.Thead([html.Th(cls) for cls in classes]),
+    return metrics, figure
 
-            html.Tbody([
-               html.Tr([html.Td(item) for item in row])
-               for row in confusion
-            ])
-        ]))
 
-    else:
-        metrics.append("Not implemented")
-
-    labels = model.predict(df[xvars])
-    # TODO: Visualize the (in)correctly grouped points.
-    # If we have >=2 variables, visualize the classification
-    if len(xvars) >= 3:
-
-        trace1 = go.Scatter3d(x=df[xvars[0]],
-                              y=df[xvars[1]],
-                              z=df[xvars[2]],
-                              showlegend=False,
-                              mode='markers',
-                              marker={
-                                  'color': labels.astype(np.float),
-                                  'line': dict(color='black', width=1)
-                              })
-
-        figure = {
-            'data': [trace1],
-            'layout': layouts.default_2d(xvars[0], yvars[0])
-        }
-
-    elif len(xvars) == 2:
-        traces = scatterplot(df[xvars[0]], df[xvars[1]],
-                             marker={'color': labels.astype(np.float)})
-
-        figure = {
-            'data': [traces],
-            'layout': go.Layout(
-                xaxis={'title': xvars[0]},
-                yaxis={'title': yvars[0]},
-                legend={'x': 0, 'y': 1},
-                hovermode='closest'
-            )
-        }
+def train_single_model_streaming(xvars, yvars, algo_choice, dataset_choice,
+                                 problem_type):
+    """
+    Train the model out-of-core and create the report: the dataset is \
+    read in chunks (see `utils.iter_dataset_chunks`) and the model is \
+    fitted with `partial_fit` and scored on held out rows (see \
+    `streaming.stream_fit`), so the whole dataset is never loaded. \
+    It runs as a background job (see `jobs`).
+
+    Args:
+        xvars (list(str)): predictor variables.
+        yvars (str): target variable.
+        algo_choice (str): The choice of algorithm type.
+        dataset_choice (str): Name of the dataset.
+        problem_type (str): The type of learning problem.
+
+    Returns:
+        list, dict: Dash element(s) with the results of model fitting,
+                    and parameters for plotting a graph.
+    """
+
+    model = node_options[algo_choice]["model_class"]()
+    yvar = yvars if problem_type != "clustering" else None
+    columns = list(xvars) + ([yvar] if yvar else [])
+
+    def read_chunks(random_state):
+        return iter_dataset_chunks(dataset_choice, redis_conn, columns,
+                                   random_state=random_state)
+
+    def progress(fraction):
+        jobs.report_progress(0.9 * fraction, "Training in chunks")
+
+    results = streaming.stream_fit(model, read_chunks, xvars, yvar,
+                                   problem_type, progress=progress)
+
+    if problem_type == "classification":
+        classes = results["classes"]
+        results["predictions"] = np.searchsorted(
+            classes, results["predictions"]).astype(float)
+        metrics = reports.metrics_report(
+            problem_type, results, classes=classes,
+            y_true=np.searchsorted(classes, results["y_true"]))
+
+    elif problem_type == "regression":
+        metrics = reports.metrics_report(problem_type, results)
 
     else:
-        figure = {}
+        metrics = reports.metrics_report(problem_type,
+                                         labels=results["predictions"])
+
+    # Plot the held out rows of the first chunk only
+    jobs.report_progress(0.95, "Plotting")
+    chunk = next(iter_dataset_chunks(dataset_choice, redis_conn, columns))
+    chunk = chunk.dropna()
+    chunk = chunk[streaming.holdout_mask(chunk)]
+    predictions = results["estimator"].predict(chunk[xvars].values)
+    if problem_type == "classification":
+        predictions = np.searchsorted(results["classes"], predictions)
+    figure = reports.predictions_figure(chunk[xvars], predictions, yvars)
 
     return metrics, figure
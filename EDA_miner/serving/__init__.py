@@ -0,0 +1,7 @@
+"""
+Developer notes:
+    This package serves predictions of the models that users trained \
+    and exported in the "Pipelines trainer" tab, over HTTP. Requests \
+    are authenticated with the API token users receive when they \
+    activate their account.
+"""
@@ -0,0 +1,16 @@
+"""
+This module creates the Flask app that serves predictions, mounted at \
+"/serve" (see `wsgi.py`).
+
+Global Variables:
+    - app: The Flask app, with the `routes.serve` blueprint.
+"""
+
+from flask import Flask
+
+from .routes import serve
+
+
+app = Flask(__name__)
+
+app.register_blueprint(serve)
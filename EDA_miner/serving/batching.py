@@ -0,0 +1,161 @@
+"""
+This module coalesces concurrent prediction requests for the same model \
+into micro-batches, so that the model is called once per batch instead \
+of once per request.
+
+Classes:
+    - MicroBatcher: Collect the rows of concurrent requests for up to a \
+                    short time window, predict them with one call and \
+                    give every request its own predictions back.
+
+Notes to others:
+    Most of the time of predicting a few rows with a sklearn pipeline \
+    is spent on per-call overhead (validation, every step's Python \
+    code), so one call with the rows of many requests is almost as fast \
+    as a call with one request's rows. Batching only helps when the \
+    worker handles requests concurrently, e.g. with the threaded \
+    workers of gunicorn (`--threads`).
+"""
+
+import threading
+
+import pandas as pd
+
+
+class _Batch:
+    """
+    The rows of the requests that joined a batch, and their results.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.n_rows = 0
+        self.results = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Collect the rows of concurrent requests for the same model for up \
+    to `max_wait` seconds (or until there are `max_batch_size` rows), \
+    predict them with one call and give every request its own \
+    predictions back.
+
+    Args:
+        max_batch_size (int): Number of rows after which a batch is \
+                              predicted without waiting any longer.
+        max_wait (float): Seconds that the first request of a batch \
+                          waits for others to join it.
+
+    Further details:
+        There is no background thread: the first request of a batch \
+        waits for the others, predicts the batch and wakes them up. If \
+        predicting the batch fails, the requests are predicted one by \
+        one, so that bad rows only fail their own request. Requests \
+        whose rows have other dtypes are predicted in separate calls.
+    """
+
+    def __init__(self, max_batch_size=256, max_wait=0.005):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        # The batch that requests can still join, by key
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def predict(self, key, model, rows):
+        """
+        Predict rows, together with those of concurrent requests with \
+        the same key.
+
+        Args:
+            key (hashable): Requests with the same key are batched, so \
+                            it must identify the model and its version.
+            model (sklearn-like estimator): The model.
+            rows (`pd.DataFrame`): The rows, with the columns the model \
+                                   expects.
+
+        Returns:
+            np.array: The predictions for `rows`.
+
+        Raises:
+            Whatever `model.predict(rows)` raises.
+        """
+
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+
+            part = len(batch.parts)
+            batch.parts.append(rows)
+            batch.n_rows += len(rows)
+
+            if batch.n_rows >= self.max_batch_size:
+                del self._open[key]
+                batch.full.set()
+
+        if not leader:
+            batch.done.wait()
+
+        else:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+
+            try:
+                batch.results = self._predict(model, batch.parts)
+            finally:
+                batch.done.set()
+
+        error, predictions = batch.results[part]
+        if error is not None:
+            raise error
+
+        return predictions
+
+    @staticmethod
+    def _predict(model, parts):
+        """
+        Predict the parts with one call per group of parts with the \
+        same columns and dtypes, or each on its own if that fails. \
+        Parts with other dtypes aren't batched together, as `pd.concat` \
+        would upcast them (e.g. ints to floats, or to objects).
+
+        Returns:
+            list(tuple): The exception (or None) and the predictions of \
+                         every part.
+        """
+
+        groups = {}
+        for i, rows in enumerate(parts):
+            signature = (tuple(rows.columns), tuple(rows.dtypes))
+            groups.setdefault(signature, []).append(i)
+
+        results = [None] * len(parts)
+        for indices in groups.values():
+            if len(indices) > 1:
+                try:
+                    predictions = model.predict(pd.concat(
+                        [parts[i] for i in indices], ignore_index=True))
+                except Exception:
+                    pass
+                else:
+                    start = 0
+                    for i in indices:
+                        end = start + len(parts[i])
+                        results[i] = (None, predictions[start:end])
+                        start = end
+
+                    continue
+
+            for i in indices:
+                try:
+                    results[i] = (None, model.predict(parts[i]))
+                except Exception as exc:
+                    results[i] = (exc, None)
+
+        return results
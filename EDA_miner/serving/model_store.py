@@ -0,0 +1,139 @@
+"""
+This module keeps the trained models that are being served in the \
+memory of the worker, so that serving a prediction doesn't unpickle \
+the model.
+
+Functions:
+    - get_model_version: Get an identifier that changes whenever the \
+                         trained model is overwritten.
+
+Classes:
+    - ModelStore: A per-worker, size-bounded LRU of trained models that \
+                  reloads models overwritten in Redis.
+
+Notes to others:
+    Trained models are stored by `modeling.pipelines.train_pipeline` \
+    under `{user_id}_trainedModel_{name}`, with their parameters (the \
+    columns they expect etc) under `{user_id}_trainedModelParams_{name}` \
+    and their version under `{user_id}_trainedModelVersion_{name}`.
+"""
+
+from collections import OrderedDict
+import threading
+import hashlib
+
+import dill
+
+
+def get_model_version(user_id, name, redis_conn):
+    """
+    Get an identifier that changes whenever the trained model is \
+    overwritten.
+
+    Args:
+        user_id (str): The owner of the model.
+        name (str): The name of the model.
+        redis_conn (`redis.Redis`): Connection to a Redis database.
+
+    Returns:
+        str: A digest of the stored model, or None if there is no model.
+    """
+
+    model_key = f"{user_id}_trainedModel_{name}"
+    version_key = f"{user_id}_trainedModelVersion_{name}"
+    version = redis_conn.get(version_key)
+
+    if version is None:
+        # Models trained before versions were stored
+        model = redis_conn.get(model_key)
+        if model is None:
+            return None
+
+        # Expire along with the model
+        ttl = redis_conn.ttl(model_key)
+        version = hashlib.sha1(model).hexdigest()
+        redis_conn.set(version_key, version, ex=ttl if ttl > 0 else None)
+
+        return version
+
+    return version.decode()
+
+
+class ModelStore:
+    """
+    A per-worker, size-bounded LRU of trained models. Every lookup \
+    checks the version of the model in Redis (one small read), so \
+    models that were retrained or deleted are never served stale.
+
+    Args:
+        redis_conn (`redis.Redis`): Connection to a Redis database.
+        max_bytes (int): Total (pickled) size of the models after which \
+                         the least recently used ones are dropped.
+
+    Further details:
+        The store is shared by the threads of a worker, so it's guarded \
+        by a lock. Models are unpickled outside of the lock.
+    """
+
+    def __init__(self, redis_conn, max_bytes=256*2**20):
+        self.redis_conn = redis_conn
+        self.max_bytes = max_bytes
+
+        self._models = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, name):
+        """
+        Get a trained model and its parameters, loading them from Redis \
+        if they aren't in memory or are outdated.
+
+        Args:
+            user_id (str): The owner of the model.
+            name (str): The name of the model.
+
+        Returns:
+            tuple: The model and its parameters (dict), or None if \
+                   there is no such model.
+        """
+
+        key = (user_id, name)
+        version = get_model_version(user_id, name, self.redis_conn)
+
+        with self._lock:
+            if version is None:
+                self._drop(key)
+                return None
+
+            if key in self._models and self._models[key][0] == version:
+                self._models.move_to_end(key)
+                return self._models[key][1:3]
+
+        pipe = self.redis_conn.pipeline()
+        pipe.get(f"{user_id}_trainedModel_{name}")
+        pipe.get(f"{user_id}_trainedModelParams_{name}")
+        data, params = pipe.execute()
+
+        if data is None:
+            return None
+
+        model = dill.loads(data)
+        params = dill.loads(params) if params is not None else {}
+
+        with self._lock:
+            self._drop(key)
+            self._models[key] = (version, model, params, len(data))
+            self._total += len(data)
+
+            # Keep at least the model that was just loaded
+            while self._total > self.max_bytes and len(self._models) > 1:
+                self._drop(next(iter(self._models)))
+
+        return model, params
+
+    def _drop(self, key):
+        if key in self._models:
+            self._total -= self._models.pop(key)[3]
+
+    def __len__(self):
+        return len(self._models)
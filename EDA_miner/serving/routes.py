@@ -0,0 +1,227 @@
+"""
+This module defines the endpoints for serving predictions of trained \
+models.
+
+Functions:
+    - authenticate: Find the user of the API token of the request.
+    - parse_batch: Read the rows to predict from the body of a request.
+    - list_models: List the trained models of the user (GET /models/).
+    - predict: Predict a batch of rows with a trained model \
+               (POST /models/<name>/predict/).
+
+Global Variables:
+    - serve: The blueprint with the endpoints.
+    - redis_conn: The connection to Redis.
+    - model_store: The trained models kept in the memory of this worker.
+    - batcher: Coalesces concurrent predictions for the same model.
+
+Notes to others:
+    Clients send their API token as `Authorization: Bearer <token>` \
+    (or as the `api_token` query parameter). The rows can be JSON (a \
+    list of records, or a dict of columns), CSV, or an Arrow stream, \
+    chosen by the `Content-Type` of the request. Arrow needs `pyarrow`, \
+    which is optional: without it Arrow requests get a 415.
+"""
+
+from functools import wraps
+import json
+import io
+
+from flask import Blueprint, request, jsonify, g
+from redis import Redis
+import pandas as pd
+import numpy as np
+import dill
+
+from models import User
+from .model_store import ModelStore
+from .batching import MicroBatcher
+
+
+serve = Blueprint("serve", __name__)
+
+redis_conn = Redis()
+
+model_store = ModelStore(redis_conn)
+
+batcher = MicroBatcher(max_batch_size=256, max_wait=0.005)
+
+# Content types of Arrow streams
+arrow_types = ["application/vnd.apache.arrow.stream",
+               "application/vnd.apache.arrow.file",
+               "application/octet-stream"]
+
+
+def _error(message, status):
+    return jsonify({"error": message}), status
+
+
+def authenticate(view):
+    """
+    Find the user of the API token of the request, and make it \
+    available to the view as `g.user`. Only users that have verified \
+    their email have a token.
+
+    Args:
+        view (callable): A view of the blueprint.
+
+    Returns:
+        callable: The view, responding with 401 to unknown tokens.
+    """
+
+    @wraps(view)
+    def authenticated_view(*args, **kwargs):
+
+        token = request.args.get("api_token")
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            token = header[len("Bearer "):].strip()
+
+        if not token:
+            return _error("Missing API token.", 401)
+
+        user = User.query.filter_by(api_token=token).first()
+        if user is None or not user.verified_email:
+            return _error("Invalid API token.", 401)
+
+        g.user = user
+
+        return view(*args, **kwargs)
+
+    return authenticated_view
+
+
+def _read_arrow(body, file_format=False):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Unsupported content type: Arrow needs pyarrow, "
+                         "which is not installed")
+
+    reader = pa.ipc.open_file if file_format else pa.ipc.open_stream
+
+    return reader(pa.py_buffer(body)).read_pandas()
+
+
+def parse_batch(content_type, body):
+    """
+    Read the rows to predict from the body of a request.
+
+    Args:
+        content_type (str): The mimetype of the request, one of: \
+                            application/json, text/csv or one of \
+                            `arrow_types`.
+        body (bytes): The body of the request.
+
+    Returns:
+        `pd.DataFrame`: The rows.
+
+    Raises:
+        ValueError: If the content type is not supported (e.g. Arrow \
+                    without `pyarrow`). Other exceptions if the body \
+                    can't be read.
+    """
+
+    if content_type == "application/json":
+        rows = json.loads(body)
+
+        # A single record
+        if isinstance(rows, dict) and not any(isinstance(value, list)
+                                              for value in rows.values()):
+            rows = [rows]
+
+        return pd.DataFrame(rows)
+
+    elif content_type == "text/csv":
+        return pd.read_csv(io.BytesIO(body))
+
+    elif content_type == "application/vnd.apache.arrow.file":
+        return _read_arrow(body, file_format=True)
+
+    elif content_type in arrow_types:
+        return _read_arrow(body)
+
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+@serve.route("/models/", methods=["GET"])
+@authenticate
+def list_models():
+    """
+    List the trained models of the user, with the columns they expect.
+
+    Returns:
+        JSON: A list of {"name", "columns", "target", "persistent"}.
+    """
+
+    user_id = g.user.username
+    prefix = f"{user_id}_trainedModel_"
+
+    models = []
+    for key in sorted(redis_conn.keys(f"{prefix}*")):
+        name = key.decode()[len(prefix):]
+        params = redis_conn.get(f"{user_id}_trainedModelParams_{name}")
+        params = dill.loads(params) if params else {}
+
+        models.append({"name": name,
+                       "columns": params.get("columns",
+                                             params.get("xvars")),
+                       "target": params.get("yvars"),
+                       "persistent": redis_conn.ttl(key) == -1})
+
+    return jsonify(models)
+
+
+@serve.route("/models/<string:name>/predict/", methods=["POST"])
+@authenticate
+def predict(name):
+    """
+    Predict a batch of rows with a trained model. The columns the \
+    model was trained on are selected (in the order it expects them); \
+    other columns are ignored. Concurrent requests for the same model \
+    are predicted together (see `batching.MicroBatcher`).
+
+    Args:
+        name (str): The name of the model.
+
+    Returns:
+        JSON: {"model": name, "predictions": list}, or {"error": str}.
+    """
+
+    found = model_store.get(g.user.username, name)
+    if found is None:
+        return _error(f"No trained model named {name}.", 404)
+    model, params = found
+
+    try:
+        rows = parse_batch(request.mimetype, request.get_data())
+    except Exception as exc:
+        status = 415 if str(exc).startswith("Unsupported") else 400
+        return _error(f"Couldn't read the rows: {exc}", status)
+
+    columns = params.get("columns", params.get("xvars"))
+    if columns is not None:
+        missing = [col for col in columns if col not in rows.columns]
+        if missing:
+            return _error(f"Missing columns: {missing}", 400)
+        rows = rows[columns]
+
+    try:
+        # The store returns the same object until the model is retrained
+        predictions = batcher.predict((g.user.username, name, id(model)),
+                                      model, rows)
+    except Exception as exc:
+        return _error(f"Prediction failed: {type(exc).__name__}: {exc}", 400)
+
+    # Classifiers were trained on the class codes (see `pd.factorize`)
+    classes = params.get("classes")
+    if classes is not None:
+        predictions = np.asarray(classes)[np.asarray(predictions, int)]
+
+    # NaN and infinity aren't valid JSON
+    predictions = pd.Series(predictions)
+    if predictions.dtype.kind == "f":
+        predictions = predictions.where(np.isfinite(predictions))
+    predictions = predictions.astype(object).where(predictions.notna(), None)
+
+    return jsonify({"model": name, "predictions": predictions.tolist()})
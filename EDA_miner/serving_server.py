@@ -0,0 +1,8 @@
+"""
+Dummy script, supposed to run the standalone serving app.
+"""
+
+from serving.app import app
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -12,14 +12,22 @@ Functions:
     - get_dataset_options: Get datasets available to user as options for \
                            `dcc.Dropdown`.
     - get_data_schema: Get a dict with the specified dataset's schema.
+    - get_dataset_version: Get an identifier that changes whenever the \
+                           dataset is overwritten.
+    - get_process_pool: Get the process pool of the current worker.
     - hard_cast_to_float: Convert to float or return 0.
     - interactive_menu: Create the necessary elements for the sidemenus \
                         to become interactive.
+    - iter_dataset_chunks: Read a dataset in chunks of rows, without \
+                           loading all of it.
+    - save_dataset: Store a dataset in Redis along with its version \
+                    (and, if it's large, in chunks of rows).
     - save_schema: Save the schema including a preview for the data.
     - parse_contents: Decode uploaded files and store them in Redis.
     - redis_startup: Connect to a Redis server & handle startup.
 
 Global variables:
+    - chunk_rows: Number of rows per chunk of stored datasets.
     - redis_conn: A Redis connection that is used throughout the app.
     - mapping: A dict that maps tags to sklearn models meant for \
                creating dropdowns and used in `apps.analyze` modules.
@@ -39,17 +47,20 @@ import visdcc
 
 from data.data_utils.schema_heuristics import infer_types
 from models import User, DataSchemas, db
+from config import n_jobs
 from users_mgt import show_apps
 
 from flask_login import current_user
 from itertools import chain
 from functools import wraps
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import dill
 import feather
 import base64
+import hashlib
 import json
 import io
 import redis
@@ -97,13 +108,22 @@ def cleanup(redis_conn):
     Further details:
         Flush every key stored in the Redis database. If there \
         are users that have logged in and uploaded data, store \
-        those on disk.
+        those on disk. Keys are saved with `DUMP`, as not all of \
+        them are strings (e.g. the lists of dataset chunks and the \
+        indexes of `caching.RedisLRUCache`), along with their \
+        remaining time to live.
     """
 
     # Get all keys and their data in a dict and save the dict
     # as a pickle
-    redis_data = {k.decode(): redis_conn.get(k)
-                  for k in redis_conn.keys('*')}
+    redis_data = {}
+    for k in redis_conn.keys('*'):
+        with redis_conn.pipeline() as pipe:
+            dumped, ttl = pipe.dump(k).pttl(k).execute()
+
+        # Unless it expired in the meantime
+        if dumped is not None:
+            redis_data[k.decode()] = (dumped, max(ttl, 0))
 
     with open("redisData.pkl", "wb") as f:
         dill.dump(redis_data, f)
@@ -277,6 +297,66 @@ def get_data_schema(dataset_key, redis_conn):
     return None
 
 
+def get_dataset_version(dataset_key, redis_conn):
+    """
+    Get an identifier that changes whenever the dataset is overwritten. \
+    Use it as part of the keys of anything computed from the dataset.
+
+    Args:
+        dataset_key (str): the key used by the Redis server \
+                           to store the data.
+        redis_conn (`redis.Redis`): Connection to a Redis database.
+
+    Returns:
+        str: A digest of the stored data, or None if there is no data.
+    """
+
+    version_key = dataset_key.replace("_data_", "_version_")
+    version = redis_conn.get(version_key)
+
+    if version is None:
+        # Data that were not stored with `save_dataset` (e.g. restored
+        # from the previous usage) don't have a version yet
+        data = redis_conn.get(dataset_key)
+        if data is None:
+            return None
+
+        version = hashlib.sha1(data).hexdigest()
+        redis_conn.set(version_key, version)
+
+        return version
+
+    return version.decode()
+
+
+# One pool per worker process, created on first use (see below)
+_process_pool = None
+_process_pool_pid = None
+
+
+def get_process_pool():
+    """
+    Get the process pool of the current worker, for fanning out CPU-bound \
+    work (e.g. one task per time series). Its size is set by `N_JOBS`.
+
+    Returns:
+        `concurrent.futures.ProcessPoolExecutor`: The pool.
+
+    Notes on implementation:
+        The pool is created lazily and per process id, since the web \
+        server may fork its workers after this module is imported and \
+        a pool can't be shared with a forked child.
+    """
+
+    global _process_pool, _process_pool_pid
+
+    if _process_pool is None or _process_pool_pid != os.getpid():
+        _process_pool = ProcessPoolExecutor(max_workers=n_jobs)
+        _process_pool_pid = os.getpid()
+
+    return _process_pool
+
+
 def get_variable_options(dataset_key, redis_conn):
     """
     Get available variables / columns as options for `dcc.Dropdown`.
@@ -365,6 +445,113 @@ def interactive_menu(output_elem_id):
     ]
 
 
+# Datasets with more rows than this are also stored in chunks
+chunk_rows = 50000
+
+
+def save_dataset(key, df, redis_conn, redis_kwargs={}):
+    """
+    Store a dataset in Redis along with its version. Datasets with more \
+    than `chunk_rows` rows are also stored as a list of chunks of rows, \
+    for reading them without loading all of it (see \
+    `iter_dataset_chunks`).
+
+    Args:
+        key (str): The Redis key where to save the data.
+        df (`pd.DataFrame`): The data.
+        redis_conn (`redis.Redis`): The connection to the desired database.
+        redis_kwargs (dict): Passed to `redis_conn.set` (e.g. expiration).
+
+    Returns:
+        bool: Whether Redis successfully stored the key.
+
+    Further details:
+        Large datasets take twice their size in Redis: the rest of the \
+        app loads the whole frame from `key`, and only streaming reads \
+        the chunks. The data, the version and the chunks are written in \
+        one transaction, with the same expiration, so they are replaced \
+        and expire together.
+    """
+
+    data = dill.dumps(df)
+    chunks_key = key.replace("_data_", "_chunks_")
+
+    pipe = redis_conn.pipeline()
+
+    # The version is a digest of the contents, so identical data
+    # (e.g. the example datasets across restarts) share cached results
+    pipe.set(key.replace("_data_", "_version_"),
+             hashlib.sha1(data).hexdigest(), **redis_kwargs)
+
+    # Replace the chunks of the previous data, if any
+    pipe.delete(chunks_key)
+
+    if len(df) > chunk_rows:
+        for start in range(0, len(df), chunk_rows):
+            pipe.rpush(chunks_key,
+                       dill.dumps(df.iloc[start:start + chunk_rows]))
+
+        if redis_kwargs.get("ex") is not None:
+            pipe.expire(chunks_key, redis_kwargs["ex"])
+
+    pipe.set(key, data, **redis_kwargs)
+
+    return pipe.execute()[-1]
+
+
+def iter_dataset_chunks(dataset_key, redis_conn, columns=None,
+                        random_state=None):
+    """
+    Read a dataset in chunks of rows, without loading all of it. \
+    Only one chunk is in memory at a time.
+
+    Args:
+        dataset_key (str): the key used by the Redis server \
+                           to store the data.
+        redis_conn (`redis.Redis`): Connection to a Redis database.
+        columns (list(str)): The columns to keep. None for all of them.
+        random_state (int): Seed for reading the chunks, and the rows \
+                            of every chunk, in random order. None for \
+                            the stored order.
+
+    Yields:
+        `pd.DataFrame`: The chunks, with the index of the full dataset.
+
+    Further details:
+        Datasets stored without chunks (small ones, or ones not stored \
+        with `save_dataset`) are loaded whole and split into chunks of \
+        `chunk_rows` rows.
+    """
+
+    chunks_key = dataset_key.replace("_data_", "_chunks_")
+    n_chunks = redis_conn.llen(chunks_key)
+
+    if n_chunks:
+        def read(i):
+            return dill.loads(redis_conn.lindex(chunks_key, int(i)))
+
+    else:
+        df = dill.loads(redis_conn.get(dataset_key))
+        n_chunks = int(np.ceil(len(df) / chunk_rows))
+
+        def read(i):
+            return df.iloc[i * chunk_rows:(i + 1) * chunk_rows]
+
+    order = np.arange(n_chunks)
+    if random_state is not None:
+        rng = np.random.RandomState(random_state)
+        order = rng.permutation(n_chunks)
+
+    for i in order:
+        chunk = read(i)
+        if columns is not None:
+            chunk = chunk[columns]
+        if random_state is not None:
+            chunk = chunk.iloc[rng.permutation(len(chunk))]
+
+        yield chunk
+
+
 def save_schema(key, types, subtypes, head, redis_conn, user_id,
                 schema_status, redis_kwargs={}):
     """
@@ -466,7 +653,7 @@ def parse_contents(contents, filename, date, user_id, redis_conn):
     # Store to redis.
     # IMPORTANT: Follow this key naming schema:
     # {user_id}_{data|connection|schema|has_connected}_{source}_{name}
-    redis_conn.set(f"{user_id}_data_userdata_{name}", dill.dumps(df))
+    save_dataset(f"{user_id}_data_userdata_{name}", df, redis_conn)
 
     # Take a sample and infer the schema from that
     sample = df.sample(n=50, replace=True).dropna()
@@ -505,11 +692,11 @@ def redis_startup():
         with open("redisData.pkl", "rb") as f:
             redis_data = dill.load(f)
 
-        # The pickle is a dictionary with key-value pairs taken
+        # The pickle is a dictionary with the dumped keys taken
         # out of Redis, some of those are api handles (connection
         # objects from python libraries)
-        for k, v in redis_data.items():
-            redis_conn.set(k, v)
+        for k, (dumped, ttl) in redis_data.items():
+            redis_conn.restore(k, ttl, dumped, replace=True)
 
     # Load some example data for all users
     grandparent_dir = os.path.dirname(os.path.dirname(__file__))
@@ -519,8 +706,7 @@ def redis_startup():
             name = file[:-4]
 
             df = pd.read_csv(os.path.join(data_dir, file))
-            redis_conn.set(f"example_data_{name}",
-                           dill.dumps(df))
+            save_dataset(f"example_data_{name}", df, redis_conn)
 
             # Get a sample from this dataframe, infer types, and save them
             sample = df.sample(50, replace=True)
@@ -89,7 +89,7 @@ def tab_subpages(tab):
         return Network_Options(options)
 
     elif tab == "textviz":
-        return TextViz_Options()
+        return TextViz_Options(options)
 
     elif tab == "dashboard":
         return Dashboard_Options, html.H4(tab)
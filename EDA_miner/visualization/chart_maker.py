@@ -8,6 +8,12 @@ Global Variables:
 Functions:
     - Exploration_Options: Generate the layout of the dashboard.
     - make_trace: Create a plotly trace (plot element).
+    - trace_spec: Normalize the choices for a trace, keeping only the \
+                  variables its graph type uses.
+    - cached_traces: Get the traces for a spec from the cache, or create \
+                     and cache them.
+    - layout_traces: Get the traces of every trace menu, loading the \
+                     dataset only for those that are not cached.
     - make_trace_menu: Helper function to create modals and trace menus.
 
 Dash callbacks:
@@ -35,12 +41,15 @@ import dash_html_components as html
 
 import dash_bootstrap_components as dbc
 
-from .server import app, redis_conn
-from utils import create_dropdown, get_variable_options
+from .server import app, redis_conn, trace_cache
+from utils import create_dropdown, get_variable_options, get_dataset_version
+from caching import make_key
 from .graphs.graphs2d import graph2d_configs
 from .graphs.utils import create_button
+from .graphs.aggregation import category_counts, category_aggregate
 
 import dill
+from pandas.api.types import is_numeric_dtype
 from flask_login import current_user
 
 
@@ -48,6 +57,9 @@ Sidebar = []
 
 max_traces = 7
 
+# Pie slices / bars over categories, the rest are merged into "Other"
+max_categories = 25
+
 
 def make_trace_menu(n):
     """
@@ -136,6 +148,11 @@ def Exploration_Options(options):
         # The main content
         html.Div(dcc.Graph(id="graph"), className="main-content-graph"),
 
+        # The (key, spec) of the traces of every trace menu, so the
+        # figure can be rebuilt from the cache instead of sent back by
+        # the browser. It lives in the page, so every tab has its own.
+        dcc.Store(id="trace_layout"),
+
         # The tab menu
         html.Div([
 
@@ -173,11 +190,13 @@ def Exploration_Options(options):
 @app.callback(Output("export_throwaway_div", "children"),
               [Input("export_graph", "n_clicks")],
               [State("export_graph_name", "value"),
-               State("graph", "figure")])
-def export_graph(n_clicks, name, figure):
-    if not (name and figure):
+               State("dataset_choice", "value"),
+               State("trace_layout", "data")])
+def export_graph(n_clicks, name, dataset_choice, layout):
+    if not (name and layout):
         raise PreventUpdate()
 
+    figure = {"data": layout_traces(layout, dataset_choice), "layout": {}}
     redis_conn.set(f"{current_user.username}_figure_{name}", dill.dumps(figure))
 
     return [f"Graph {name} exported successfully"]
@@ -321,7 +340,8 @@ def dummy_add_trace(add_trace, remove_trace, n_children):
         raise PreventUpdate()
 
 
-@app.callback(Output("graph", "figure"),
+@app.callback([Output("graph", "figure"),
+               Output("trace_layout", "data")],
               [Input("hidden_div", "children")]+[
                Input(f"graph_choice_{n}", "value")
                for n in range(1, max_traces+1)]+[
@@ -334,7 +354,9 @@ def dummy_add_trace(add_trace, remove_trace, n_children):
                   Input("dataset_choice", "value")])
 def plot(*params):
     """
-    Plot the graph according to user choices.
+    Plot the graph according to user choices. Traces are cached by \
+    dataset version and spec, so only the traces of the menu that \
+    changed are computed; the rest are taken from the cache.
 
     Args:
         *params (list): Number of traces, the choices of graph types, the \
@@ -342,7 +364,7 @@ def plot(*params):
                         and the dataset choice.
 
     Returns:
-        dict: The figure to be plotted.
+        dict, list: The figure to be plotted, and its trace layout.
     """
 
     *params, dataset_choice = params
@@ -356,12 +378,11 @@ def plot(*params):
     )
 
     if dataset_choice is None:
-        return {}
+        return {}, []
 
-    # Get the dataset here and pass it to the make_trace
-    df = dill.loads(redis_conn.get(dataset_choice))
+    version = get_dataset_version(dataset_choice, redis_conn)
 
-    traces = []
+    layout = []
     # This will iterate only for as many n_children
     for i, graph_type, x_var, y_var, z_var in zip(list(range(n_children)),
                                                   graph_types,
@@ -382,13 +403,87 @@ def plot(*params):
             # Instead, prevent the update
             raise PreventUpdate()
 
-        new_traces = make_trace(graph_type, x_var, y_var, zvar=z_var, df=df)
-        traces.extend(new_traces)
+        spec = trace_spec(graph_type, x_var, y_var, z_var)
+        layout.append((make_key("graph2d", version, *spec), spec))
 
     return {
-        "data": traces,
+        "data": layout_traces(layout, dataset_choice),
         "layout": {}
-    }
+    }, layout
+
+
+def trace_spec(graph_choice, xvar, yvar, zvar=None):
+    """
+    Normalize the choices for a trace, keeping only the variables its \
+    graph type uses (e.g. a leftover Z choice doesn't make a new trace).
+
+    Args:
+        graph_choice (str): The type of graph to create.
+        xvar (str): `x-axis` of the graph.
+        yvar (str): `y-axis`.
+        zvar (str): `z-axis`, if applicable.
+
+    Returns:
+        tuple: The arguments for `make_trace`.
+    """
+
+    (graph_name, needs_yvar, allows_multi,
+     needs_zvar, func) = graph2d_configs[graph_choice]
+
+    return (graph_choice, xvar,
+            yvar if needs_yvar else None,
+            zvar if needs_zvar else None)
+
+
+def cached_traces(key, spec, load_dataset):
+    """
+    Get the traces for a spec from the cache, or create and cache them. \
+    Keys should not include the user or dataset name, only the version \
+    (a digest of the data), so users viewing the same data share traces.
+
+    Args:
+        key (str): The cache key, made out of the dataset version \
+                   and the spec.
+        spec (tuple): The output of `trace_spec`.
+        load_dataset (callable): Returns the `pd.DataFrame`; only called \
+                                 on cache misses.
+
+    Returns:
+        list(dict): Plotly traces, as dicts.
+    """
+
+    traces = trace_cache.get(key)
+    if traces is None:
+        traces = [trace.to_plotly_json()
+                  for trace in make_trace(*spec, df=load_dataset())]
+        trace_cache.set(key, traces)
+
+    return traces
+
+
+def layout_traces(layout, dataset_choice):
+    """
+    Get the traces of every trace menu, loading the dataset only for \
+    those that are not cached, and then only once for all of them.
+
+    Args:
+        layout (list): The (key, spec) of every trace menu, as made by \
+                       `plot`.
+        dataset_choice (str): The Redis key of the dataset.
+
+    Returns:
+        list(dict): Plotly traces, as dicts.
+    """
+
+    loaded = {}
+
+    def load_dataset():
+        if "df" not in loaded:
+            loaded["df"] = dill.loads(redis_conn.get(dataset_choice))
+        return loaded["df"]
+
+    return [trace for key, spec in layout
+            for trace in cached_traces(key, tuple(spec), load_dataset)]
 
 
 def make_trace(graph_choice, xvar, yvar, zvar=None, df=None):
@@ -411,9 +506,23 @@ def make_trace(graph_choice, xvar, yvar, zvar=None, df=None):
     traces = []
     # Graph choices
     if graph_choice in ['line_chart', 'heatmap', 'filledarea', 'errorbar',
-                        'density2d', 'barchart', 'scatterplot']:
+                        'scatterplot']:
         traces.append(plot_func(df[xvar], df[yvar], name=yvar))
 
+    elif graph_choice == 'barchart':
+        x, y = df[xvar], df[yvar]
+
+        # One bar per (top) category instead of one per row
+        if not is_numeric_dtype(x):
+            y = category_aggregate(x, y, how="sum", k=max_categories)
+            x = y.index
+
+        traces.append(plot_func(x, y, name=yvar))
+
+    elif graph_choice == 'density2d':
+        # This one is a combination of two traces
+        traces.extend(plot_func(df[xvar], df[yvar], name=yvar))
+
     elif graph_choice == 'histogram':
         traces.append(plot_func(df[xvar]))
 
@@ -422,9 +531,8 @@ def make_trace(graph_choice, xvar, yvar, zvar=None, df=None):
         traces.append(plot_func(df[xvar], df[yvar], size=size, name=yvar))
 
     elif graph_choice == 'pie':
-        labels = df[xvar].unique()
-        vals = df.groupby(xvar).count().iloc[:, 0]
-        traces.append(plot_func(x=labels, y=vals))
+        counts = category_counts(df[xvar], k=max_categories)
+        traces.append(plot_func(x=counts.index, y=counts.values))
 
     elif graph_choice == 'scatterplot3d':
         traces.append(plot_func(df[xvar], df[yvar], z=df[zvar]))
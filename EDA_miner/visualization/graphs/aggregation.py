@@ -0,0 +1,89 @@
+"""
+This module collects aggregations of categorical data, shared by the \
+graphs that summarize a variable per category (pie and bar charts, maps).
+
+Functions:
+    - category_counts: Count the occurrences of every category.
+    - category_aggregate: Aggregate a variable per category.
+
+Notes to others:
+    Both functions do a single pass over the data and return a \
+    `pd.Series` indexed by category, so labels and values can never \
+    be misaligned. Use `k` to cap the number of categories (e.g. pie \
+    slices); the rest are merged into a single "other" category.
+"""
+
+import pandas as pd
+
+
+def _with_other(top, other_value, other_label):
+    """
+    Append the "other" bucket, making sure its label doesn't clash \
+    with an existing category.
+    """
+
+    label = other_label
+    while label in top.index:
+        label = f"{label} (rest)"
+
+    return pd.concat([top, pd.Series([other_value], index=[label])])
+
+
+def category_counts(series, k=None, other_label="Other"):
+    """
+    Count the occurrences of every category.
+
+    Args:
+        series (`pd.Series`): The categorical data.
+        k (int): Keep only the `k` most frequent categories and merge \
+                 the rest. If None, keep all of them.
+        other_label (str): The label of the merged categories.
+
+    Returns:
+        `pd.Series`: Counts indexed by category, most frequent first.
+    """
+
+    counts = series.value_counts()
+
+    if k is None or len(counts) <= k:
+        return counts
+
+    return _with_other(counts.iloc[:k], counts.iloc[k:].sum(), other_label)
+
+
+def category_aggregate(keys, values, how="sum", k=None, other_label="Other"):
+    """
+    Aggregate a variable per category.
+
+    Args:
+        keys (`pd.Series`): The categories.
+        values (`pd.Series`): The variable to aggregate. Unless counting, \
+                              it is converted to numbers and anything \
+                              that can't be converted is ignored.
+        how (str): One of: count, sum, mean, max, min.
+        k (int): Keep only the `k` top categories (by value for counts \
+                 and sums, by frequency otherwise) and merge the rest. \
+                 If None, keep all of them.
+        other_label (str): The label of the merged categories.
+
+    Returns:
+        `pd.Series`: The aggregates indexed by category.
+    """
+
+    if how != "count":
+        values = pd.to_numeric(values, errors="coerce")
+
+    aggregated = values.groupby(keys).agg(how)
+
+    if k is None or len(aggregated) <= k:
+        return aggregated
+
+    if how in ["count", "sum"]:
+        order = aggregated.sort_values(ascending=False).index
+    else:
+        order = keys.value_counts().index
+
+    top = order[:k]
+    rest = values[keys.notna() & ~keys.isin(top)]
+
+    return _with_other(aggregated.loc[top], rest.agg(how), other_label)
@@ -6,6 +6,10 @@ Functions:
     - baseline_graph: Create a baseline graph: a lineplot for the \
                       timeseries and its baseline, and a barchart.
     - baseline: Calculate the baseline for a time series.
+    - baselines: Calculate the baselines for many time series at once.
+    - as_numbers: Convert columns to numbers for plotting.
+    - update_baseline: Calculate the baseline of a time series, reusing \
+                       the one of an earlier version of it.
 
 Notes to others:
     Feel free to write code here either to improve current or to add \
@@ -13,14 +17,14 @@ Notes to others:
     presets.
 """
 
-from utils import hard_cast_to_float
-
 import plotly.graph_objs as go
 import pandas as pd
 import numpy as np
 import peakutils
+import hashlib
+from functools import lru_cache
 from scipy import sparse
-from scipy.sparse.linalg import spsolve
+from scipy.linalg import solveh_banded
 
 ########## Helper functions ##########
 
@@ -63,17 +67,56 @@ def _ema_baseline(values, func, ema_window=7, roll_window=7):
     return roll
 
 
+@lru_cache(maxsize=16)
+def _als_penalty(L):
+    """
+    The second-difference penalty `D D^T` of the ALS baseline, in the \
+    banded (upper) form expected by `scipy.linalg.solveh_banded`. It only \
+    depends on the length of the series, so compute it once per length.
+    """
+
+    D = sparse.diags([1, -2, 1], [0, -1, -2], shape=(L, L-2), dtype=float)
+    DDT = D.dot(D.transpose()).tocsr()
+
+    # The system is pentadiagonal: the main and two upper diagonals
+    bands = np.zeros((3, L))
+    bands[0, 2:] = DDT.diagonal(2)
+    bands[1, 1:] = DDT.diagonal(1)
+    bands[2] = DDT.diagonal(0)
+
+    # Shared between calls, so make sure nobody modifies it
+    bands.setflags(write=False)
+
+    return bands
+
+
 # https://stackoverflow.com/a/50160920/6655150
 def _als_baseline(values, lam=10, p=0.002, niter=10):
-    L = len(values)
-    D = sparse.diags([1, -2, 1], [0, -1, -2], shape=(L, L-2))
-    w = np.ones(L)
+    """
+    Asymmetric least squares baseline. `values` may be a 2D array with \
+    one series per column, in which case all of them share the penalty.
+    """
+
+    Y = np.asarray(values, dtype=float)
+    single = Y.ndim == 1
+    Y = Y.reshape(len(Y), -1)
+
+    penalty = lam * _als_penalty(len(Y))
+
+    W = np.ones_like(Y)
+    Z = np.empty_like(Y)
     for i in range(niter):
-        W = sparse.spdiags(w, 0, L, L)
-        Z = W + lam * D.dot(D.transpose())
-        z = spsolve(Z, w*values)
-        w = p * (values > z) + (1-p) * (values < z)
-    return z
+        for j in range(Y.shape[1]):
+            # W + lam * D * D^T is symmetric positive definite and
+            # banded, so use a banded Cholesky solver
+            system = penalty.copy()
+            system[2] += W[:, j]
+            Z[:, j] = solveh_banded(system, W[:, j] * Y[:, j],
+                                    overwrite_ab=True, check_finite=False)
+
+        W = p * (Y > Z) + (1-p) * (Y < Z)
+
+    return Z[:, 0] if single else Z
 
 
 def baseline(values, min_max="min", deg=7, ema_window=7, roll_window=7,
@@ -95,6 +138,25 @@ def baseline(values, min_max="min", deg=7, ema_window=7, roll_window=7,
         np.array: the baseline.
     """
 
+    values = np.asarray(values, dtype=float)
+
+    return baselines(values[:, None], min_max, deg, ema_window,
+                     roll_window, max_it, tol)[:, 0]
+
+
+def baselines(values, min_max="min", deg=7, ema_window=7, roll_window=7,
+              max_it=200, tol=1e-4):
+    """
+    Calculate the baselines for many time series at once. See `baseline` \
+    for the arguments.
+
+    Args:
+        values (2D array or `pd.DataFrame`): One series per column.
+
+    Returns:
+        np.array: the baselines, one per column.
+    """
+
     if min_max == "min":
         bound = np.min
     elif min_max == "max":
@@ -102,22 +164,108 @@ def baseline(values, min_max="min", deg=7, ema_window=7, roll_window=7,
     else:
         raise NotImplementedError
 
-    ema_baseline = _ema_baseline(values, bound, ema_window, roll_window)
-    peakutils_baseline = peakutils.baseline(values, deg=deg,
-                                            max_it=max_it,
-                                            tol=tol)
+    values = np.asarray(values, dtype=float)
+
+    ema_baselines = np.column_stack([
+        _ema_baseline(series, bound, ema_window, roll_window)
+        for series in values.T])
+    peakutils_baselines = np.column_stack([
+        peakutils.baseline(series, deg=deg, max_it=max_it, tol=tol)
+        for series in values.T])
 
     # Give double the weight to peakutil's values
-    return (2/3 * np.mean([peakutils_baseline * 4/3,
-                           ema_baseline * 2/3], 0)
+    return (2/3 * np.mean([peakutils_baselines * 4/3,
+                           ema_baselines * 2/3], 0)
             + 1/3 * _als_baseline(values))
 
 
+def as_numbers(data):
+    """
+    Convert a column or columns to numbers for plotting. Anything that \
+    isn't a number counts as 0.
+
+    Args:
+        data (`pd.Series` or `pd.DataFrame`): The data.
+
+    Returns:
+        The converted data, of the same type.
+    """
+
+    if isinstance(data, pd.DataFrame):
+        return data.apply(pd.to_numeric, errors="coerce").fillna(0.)
+
+    return pd.to_numeric(data, errors="coerce").fillna(0.)
+
+
+def _digest(values):
+    return hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest()
+
+
+def update_baseline(values, record=None, window=200, **params):
+    """
+    Calculate the baseline of a time series, reusing the one of an \
+    earlier version of it. If the series starts with the values that \
+    `record` was computed for (e.g. new rows were appended by an API \
+    pull) only a trailing window is recomputed, and blended with the \
+    previous baseline where the two overlap.
+
+    Args:
+        values (iterable(float)): The time series.
+        record (dict): What a previous call returned, or None.
+        window (int): Minimum number of trailing points to recompute. \
+                      It is extended to at least twice the new points.
+        **params: Passed on to `baseline`.
+
+    Returns:
+        dict: A record with the baseline under "baseline"; store it and \
+              pass it to the next call.
+
+    Notes on implementation:
+        The baseline is a global fit, so the incremental result is an \
+        approximation that only differs from a full recomputation away \
+        from the end of the series. A full recomputation is done \
+        whenever the window would cover most of the series anyway.
+    """
+
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+
+    reusable = (record is not None and record["params"] == params
+                and record["n"] <= n
+                and _digest(values[:record["n"]]) == record["digest"])
+
+    if reusable and record["n"] == n:
+        return record
+
+    if reusable:
+        old_n = record["n"]
+        start = n - max(window, 2 * (n - old_n))
+
+    if not reusable or start < n // 2:
+        result = baseline(values, **params)
+
+    else:
+        tail = baseline(values[start:], **params)
+
+        # Fade from the old baseline to the new one over the overlap
+        overlap = old_n - start
+        fade = np.linspace(0, 1, overlap + 2)[1:-1]
+
+        result = np.concatenate([record["baseline"][:start],
+                                 (1-fade) * record["baseline"][start:]
+                                 + fade * tail[:overlap],
+                                 tail[overlap:]])
+
+    return {"n": n, "digest": _digest(values), "params": params,
+            "baseline": result}
+
+
 ########## Graph functions ##########
 # Functions below here implement the various graphs
 # These should return plotly traces (i.e. lists of `go` objects)
 
-def baseline_graph(df, xvars, yvars, secondary_yvars):
+def baseline_graph(df, xvars, yvars, secondary_yvars,
+                   series_baselines=None):
     """
     Create a baseline graph: a lineplot for the timeseries and \
     its baseline, and a barchart.
@@ -127,15 +275,25 @@ def baseline_graph(df, xvars, yvars, secondary_yvars):
         xvars (str): Column of `df`; `x-axis`.
         yvars (str or list(str)): Column(s) of `df`; lineplot(s).
         secondary_yvars (str):  Column of `df`; bar-chart.
+        series_baselines (2D array): Precomputed baselines, one column \
+                                     per y variable. If None, they are \
+                                     calculated here.
 
     Returns:
         list: Plotly traces.
     """
 
+    values = as_numbers(df[yvars])
+    bars = as_numbers(df[secondary_yvars])
+
+    if series_baselines is None:
+        # One batched call for all the series
+        series_baselines = baselines(values)
+
     return [
         go.Scatter(
             x=df[xvars],
-            y=baseline(df[yvar].apply(hard_cast_to_float)),
+            y=series_baselines[:, i],
             mode='lines',
             opacity=0.7,
             marker={
@@ -143,10 +301,10 @@ def baseline_graph(df, xvars, yvars, secondary_yvars):
                 'line': {'width': 0.5, 'color': (0,100,255)}
             },
             name=f"Baseline for {' '.join(yvar.split()[:2])}",
-        ) for yvar in yvars] + [
+        ) for i, yvar in enumerate(yvars)] + [
         # one scatter for each y variable
         go.Scatter(x=df[xvars],
-                   y=df[yvar].apply(hard_cast_to_float),
+                   y=values[yvar],
                    mode='lines+markers',
                    marker={
                        'size': 8,
@@ -161,7 +319,7 @@ def baseline_graph(df, xvars, yvars, secondary_yvars):
         # Bar plot for the second variable
         go.Bar(
             x=df[xvars],
-            y=df[secondary_yvars].apply(hard_cast_to_float),
+            y=bars,
             name="Bars"
         )
     ]
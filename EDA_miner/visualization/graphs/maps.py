@@ -0,0 +1,249 @@
+"""
+This module collects functions and utilities for map visualizations.
+
+Functions:
+    - country2code: It takes a string and tries to convert it to a country \
+                    code by trying out various encodings.
+    - resolve_countries: Convert a column to country codes, resolving \
+                         every distinct value only once.
+    - maplines: Create the traces for lines from origins to destinations.
+    - bin_size_for_view: Choose the size of the bins for a zoom level.
+    - bin_points: Aggregate points into a latitude / longitude grid.
+    - binned_geoscatter: Create a trace of binned points.
+
+Notes to others:
+    pycountry lookups are slow, so never call `country2code` per row. \
+    Use `resolve_countries`, and pass it a `resolve_many` that remembers \
+    values resolved earlier (see `visualization.maps`).
+"""
+
+import plotly.graph_objs as go
+import pandas as pd
+import numpy as np
+import pycountry
+
+
+# TODO: This probably needs to interface with the schema
+def country2code(value):
+    """
+    Country(alpha_2='DE', alpha_3='DEU', name='Germany', numeric='276',
+            official_name='Federal Republic of Germany')
+    """
+
+    for key in ["alpha_2", "alpha_3", "name", "numeric", "official_name"]:
+        matched_country = pycountry.countries.get(**{key: value})
+
+        if matched_country is not None:
+            # Usually the 3-letter code
+            return matched_country.alpha_3
+
+
+def resolve_countries(series, resolve_many=None):
+    """
+    Convert a column to country codes, resolving every distinct value \
+    only once.
+
+    Args:
+        series (`pd.Series`): Accepted values include 3-letter country \
+                              codes and full names or anything else \
+                              pycountry can decode.
+        resolve_many (callable): Takes a list of distinct values (as \
+                                 strings) and returns a list of codes, \
+                                 None where unresolved. Defaults to \
+                                 calling `country2code` on each.
+
+    Returns:
+        `pd.Series`: Categorical country codes aligned with `series`, \
+                     NaN where they couldn't be resolved.
+    """
+
+    labels, uniques = pd.factorize(series)
+    uniques = [str(value) for value in uniques]
+
+    if resolve_many is None:
+        codes = [country2code(value) for value in uniques]
+    else:
+        codes = list(resolve_many(uniques))
+
+    # Missing values are labelled -1, i.e. the trailing None
+    codes = np.array(codes + [None], dtype=object)
+
+    return pd.Series(codes[labels], index=series.index, dtype="category")
+
+
+def _interleave(origins, destinations):
+    """
+    [o1, o2, ...], [d1, d2, ...] -> [o1, d1, nan, o2, d2, nan, ...], \
+    i.e. line segments that plotly draws as a single trace.
+    """
+
+    gaps = np.full(len(origins), np.nan)
+
+    return np.column_stack([origins, destinations, gaps]).ravel()
+
+
+def maplines(origin_lat, origin_lon, dest_lat, dest_lon, n_widths=4,
+             max_width=6):
+    """
+    Create the traces for lines from origins to destinations. Duplicate \
+    origin-destination pairs are drawn once, with the width of the line \
+    showing how many there were.
+
+    Args:
+        origin_lat (`pd.Series`): Latitudes of the origins.
+        origin_lon (`pd.Series`): Longitudes of the origins.
+        dest_lat (`pd.Series`): Latitudes of the destinations.
+        dest_lon (`pd.Series`): Longitudes of the destinations.
+        n_widths (int): Number of distinct line widths, i.e. traces.
+        max_width (int): Width of the lines of the most frequent pairs.
+
+    Returns:
+        list: Plotly traces, at most `n_widths`.
+    """
+
+    lines = pd.DataFrame({
+        "origin_lat": pd.to_numeric(origin_lat, errors="coerce").values,
+        "origin_lon": pd.to_numeric(origin_lon, errors="coerce").values,
+        "dest_lat": pd.to_numeric(dest_lat, errors="coerce").values,
+        "dest_lon": pd.to_numeric(dest_lon, errors="coerce").values,
+    }).dropna()
+
+    counts = lines.groupby(list(lines.columns)).size()
+    if counts.empty:
+        return []
+
+    lines = counts.index.to_frame(index=False)
+    counts = counts.values
+
+    # Bucket the pairs by (log) frequency, one trace per bucket
+    log_counts = np.log(counts)
+    if log_counts.max() > 0:
+        edges = np.linspace(0, log_counts.max(), n_widths + 1)[1:-1]
+        buckets = np.digitize(log_counts, edges)
+    else:
+        buckets = np.zeros(len(counts), dtype=int)
+
+    traces = []
+    for bucket in np.unique(buckets):
+        subset = lines[buckets == bucket]
+        width = 1 + (max_width - 1) * bucket / max(n_widths - 1, 1)
+        n_pairs = counts[buckets == bucket]
+
+        traces.append(go.Scattergeo(
+            lat=_interleave(subset["origin_lat"], subset["dest_lat"]),
+            lon=_interleave(subset["origin_lon"], subset["dest_lon"]),
+            mode="lines",
+            line={"width": width},
+            opacity=0.6,
+            hoverinfo="skip",
+            name=f"{n_pairs.min()}-{n_pairs.max()} per route",
+        ))
+
+    return traces
+
+
+def bin_size_for_view(scale, base_size=4.):
+    """
+    Choose the size of the bins for a zoom level. The size is halved \
+    every time the scale doubles, so small zoom changes don't change \
+    the bins.
+
+    Args:
+        scale (float): The `geo.projection.scale` of the map, 1 being \
+                       the whole map.
+        base_size (float): Size of the bins when zoomed out, in degrees.
+
+    Returns:
+        float: Size of the bins, in degrees.
+    """
+
+    level = max(int(np.floor(np.log2(max(scale, 1)))), 0)
+
+    return base_size / 2**level
+
+
+def bin_points(lat, lon, z=None, how="count", bin_size=4., view=None):
+    """
+    Aggregate points into a latitude / longitude grid.
+
+    Args:
+        lat (`pd.Series`): Latitudes.
+        lon (`pd.Series`): Longitudes.
+        z (`pd.Series`): Values to aggregate. If None, points are counted.
+        how (str): One of: count, sum, mean, max, min.
+        bin_size (float): Size of the bins, in degrees.
+        view (tuple(float)): Optionally, keep only the points within \
+                             (center lat, center lon, half height, \
+                             half width), in degrees.
+
+    Returns:
+        `pd.DataFrame`: One row per non-empty bin with the coordinates \
+                        of its center, the number of points and the \
+                        aggregated value.
+    """
+
+    points = pd.DataFrame({
+        "lat": pd.to_numeric(lat, errors="coerce").values,
+        "lon": pd.to_numeric(lon, errors="coerce").values,
+        "z": (np.ones(len(lat)) if z is None
+              else pd.to_numeric(z, errors="coerce").values),
+    }).dropna(subset=["lat", "lon"])
+
+    if view is not None:
+        center_lat, center_lon, half_height, half_width = view
+
+        # Longitudes wrap around, so compare the (signed) distance
+        lon_distance = (points["lon"] - center_lon + 180) % 360 - 180
+        points = points[(lon_distance.abs() <= half_width)
+                        & ((points["lat"] - center_lat).abs()
+                           <= half_height)]
+
+    rows = np.floor(points["lat"].values / bin_size).astype(int)
+    cols = np.floor(points["lon"].values / bin_size).astype(int)
+
+    grouped = points["z"].groupby([rows, cols])
+    bins = pd.DataFrame({
+        "count": grouped.size(),
+        "value": grouped.size() if how == "count" else grouped.agg(how),
+    })
+
+    rows = bins.index.get_level_values(0).values
+    cols = bins.index.get_level_values(1).values
+    bins["lat"] = (rows + 0.5) * bin_size
+    bins["lon"] = (cols + 0.5) * bin_size
+
+    return bins.reset_index(drop=True)
+
+
+def binned_geoscatter(bins, colorscale="Jet", max_size=30):
+    """
+    Create a trace of binned points: the size of the markers shows the \
+    number of points and their color the aggregated value.
+
+    Args:
+        bins (`pd.DataFrame`): As returned by `bin_points`.
+        colorscale (str): Colorscale as defined in plotly.
+        max_size (int): Size of the marker of the fullest bin.
+
+    Returns:
+        `go.Scattergeo`: The trace.
+    """
+
+    sizes = 4 + (max_size - 4) * np.sqrt(bins["count"]
+                                         / max(bins["count"].max(), 1))
+
+    return go.Scattergeo(
+        lat=bins["lat"],
+        lon=bins["lon"],
+        mode="markers",
+        marker={
+            "size": sizes,
+            "color": bins["value"],
+            "colorscale": colorscale,
+            "showscale": True,
+            "line": {"width": 0},
+        },
+        text=(bins["count"].astype(str) + " points<br>value: "
+              + bins["value"].round(3).astype(str)),
+        hoverinfo="text",
+    )
@@ -0,0 +1,286 @@
+"""
+This module collects functions and utilities for network visualizations.
+
+Functions:
+    - edge_list: Create the weighted list of distinct edges.
+    - node_list: Create the list of nodes with their degrees.
+    - coarsen: Merge the nodes of a large network into communities.
+    - prepare_network: Create a bounded set of nodes and edges that \
+                       shows the structure of the whole network.
+    - compute_layout: Compute the positions of the nodes with networkx.
+    - cytoscape_elements: Convert nodes and edges to Cytoscape elements.
+
+Notes to others:
+    Cytoscape can't handle more than a few hundred elements (see \
+    https://github.com/cytoscape/cytoscape.js/issues/858), so rather \
+    than sampling rows, large networks are coarsened into super-nodes \
+    (communities) that keep the overall structure, next to the hubs.
+"""
+
+from networkx.algorithms.community import label_propagation_communities
+from networkx.algorithms.community import greedy_modularity_communities
+import networkx as nx
+import pandas as pd
+import numpy as np
+
+
+def edge_list(df, in_node, out_node):
+    """
+    Create the weighted list of distinct edges.
+
+    Args:
+        df (`pd.DataFrame`): The data, one row per link.
+        in_node (str): Column name of the nodes where links start.
+        out_node (str): Column name of the nodes where links end.
+
+    Returns:
+        `pd.DataFrame`: With columns source, target (as strings) and \
+                        weight (the number of rows of the link).
+    """
+
+    links = df[[in_node, out_node]].dropna().astype(str)
+    links.columns = ["source", "target"]
+
+    return links.groupby(["source", "target"]).size() \
+        .rename("weight").reset_index()
+
+
+def node_list(edges):
+    """
+    Create the list of nodes with their degrees.
+
+    Args:
+        edges (`pd.DataFrame`): As returned by `edge_list`.
+
+    Returns:
+        `pd.DataFrame`: With columns id, degree (number of distinct \
+                        neighbours) and weight (sum of edge weights), \
+                        sorted by weight.
+    """
+
+    ends = pd.concat([edges[["source", "weight"]].rename(
+                          columns={"source": "id"}),
+                      edges[["target", "weight"]].rename(
+                          columns={"target": "id"})])
+
+    grouped = ends.groupby("id")["weight"]
+    nodes = pd.DataFrame({"degree": grouped.size(),
+                          "weight": grouped.sum()})
+
+    return nodes.sort_values("weight", ascending=False) \
+        .rename_axis("id").reset_index()
+
+
+def coarsen(edges, max_groups=50, max_exact=2000):
+    """
+    Merge the nodes of a large network into communities. If there are \
+    too many, the smallest communities are merged together into \
+    "community_other".
+
+    Args:
+        edges (`pd.DataFrame`): As returned by `edge_list`.
+        max_groups (int): Maximum number of communities.
+        max_exact (int): Networks with up to this many nodes are split \
+                         by (greedy) modularity, larger ones with the \
+                         faster but coarser label propagation.
+
+    Returns:
+        `pd.Series`: The community of every node, indexed by node id.
+    """
+
+    graph = nx.Graph()
+    graph.add_weighted_edges_from(edges[["source", "target", "weight"]]
+                                  .itertuples(index=False))
+
+    if len(graph) <= max_exact:
+        communities = greedy_modularity_communities(graph, weight="weight")
+    else:
+        communities = label_propagation_communities(graph)
+    communities = sorted(communities, key=len, reverse=True)
+
+    names = [f"community_{i}" for i in range(len(communities))]
+    if len(communities) > max_groups:
+        names[max_groups-1:] = ["community_other"] * \
+            (len(names) - max_groups + 1)
+
+    return pd.Series(
+        np.repeat(names, [len(community) for community in communities]),
+        index=[node for community in communities for node in community])
+
+
+def prepare_network(df, in_node, out_node, max_nodes=100, max_edges=300):
+    """
+    Create a bounded set of nodes and edges that shows the structure of \
+    the whole network. Networks with more than `max_nodes` nodes are \
+    coarsened: the heaviest nodes (hubs) are kept as they are, and the \
+    rest are merged into their communities (see `coarsen`).
+
+    Args:
+        df (`pd.DataFrame`): The data, one row per link.
+        in_node (str): Column name of the nodes where links start.
+        out_node (str): Column name of the nodes where links end.
+        max_nodes (int): Maximum number of nodes to return.
+        max_edges (int): Maximum number of edges to return; the ones \
+                         with the largest weights are kept.
+
+    Returns:
+        tuple(`pd.DataFrame`): The nodes (id, label, size, degree, \
+                               weight) and edges (source, target, weight).
+    """
+
+    edges = edge_list(df, in_node, out_node)
+    nodes = node_list(edges)
+    nodes["label"] = nodes["id"]
+    nodes["size"] = 1
+
+    if len(nodes) > max_nodes:
+        groups = coarsen(edges, max_groups=max_nodes // 2)
+
+        # Use the rest of the budget for the hubs (nodes are sorted)
+        n_hubs = max_nodes - groups.nunique()
+        nodes["group"] = groups.loc[nodes["id"]].values
+        nodes.loc[:n_hubs-1, "group"] = nodes.loc[:n_hubs-1, "id"]
+
+        # Name each super-node after its heaviest member
+        grouped = nodes.groupby("group", sort=False)
+        heaviest = grouped["id"].first()
+        sizes = grouped.size()
+        labels = heaviest.where(
+            sizes == 1, heaviest + " (+" + (sizes-1).astype(str) + ")")
+        if "community_other" in labels.index:
+            labels["community_other"] = \
+                f"Other ({sizes['community_other']} nodes)"
+
+        super_nodes = pd.DataFrame({"label": labels, "size": sizes,
+                                    "weight": grouped["weight"].sum()})
+
+        # Edges between super-nodes; links within them are dropped
+        mapping = nodes.set_index("id")["group"]
+        edges = edges.assign(source=mapping.loc[edges["source"]].values,
+                             target=mapping.loc[edges["target"]].values)
+        edges = edges[edges["source"] != edges["target"]]
+        edges = edges.groupby(["source", "target"])["weight"].sum() \
+            .reset_index()
+
+        super_nodes["degree"] = node_list(edges).set_index("id")["degree"]
+        nodes = super_nodes.fillna({"degree": 0}) \
+            .rename_axis("id").reset_index() \
+            .sort_values("weight", ascending=False)
+
+    edges = edges.nlargest(max_edges, "weight")
+
+    return (nodes[["id", "label", "size", "degree", "weight"]]
+            .reset_index(drop=True), edges.reset_index(drop=True))
+
+
+# Layouts computed on the server, instead of by Cytoscape in the browser
+server_layouts = {
+    "spring": lambda graph: nx.spring_layout(graph, weight="weight", seed=0),
+    "kamada_kawai": lambda graph: nx.kamada_kawai_layout(graph, weight=None),
+    "spectral": lambda graph: nx.spectral_layout(graph, weight="weight"),
+}
+
+
+def compute_layout(nodes, edges, layout="spring", width=1000, height=700):
+    """
+    Compute the positions of the nodes with networkx.
+
+    Args:
+        nodes (`pd.DataFrame`): As returned by `prepare_network`.
+        edges (`pd.DataFrame`): As returned by `prepare_network`.
+        layout (str): One of `server_layouts`.
+        width (int): Width of the drawing, in pixels.
+        height (int): Height of the drawing, in pixels.
+
+    Returns:
+        dict: The position of every node id as a dict with x and y, \
+              to be passed to `cytoscape_elements`.
+    """
+
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes["id"])
+    graph.add_weighted_edges_from(edges[["source", "target", "weight"]]
+                                  .itertuples(index=False))
+
+    # e.g. every row of the chosen columns is missing
+    if len(graph) == 0:
+        return {}
+
+    # Lay out every connected component on its own (otherwise e.g.
+    # spectral layouts collapse) and place them on shelves, in a box
+    # proportional to their size
+    components = sorted(nx.connected_components(graph), key=len,
+                        reverse=True)
+    row_width = np.sqrt(len(graph)) * 1.2
+
+    ids, coords = [], []
+    x = y = row_height = 0
+    for component in components:
+        subgraph = graph.subgraph(component)
+        side = np.sqrt(len(component))
+
+        if len(component) < 3:
+            # Spectral and Kamada-Kawai layouts need a few nodes
+            positions = nx.circular_layout(subgraph)
+        else:
+            positions = server_layouts[layout](subgraph)
+
+        if x > 0 and x + side > row_width:
+            x, y, row_height = 0, y + row_height, 0
+
+        local = np.array(list(positions.values()), dtype=float)
+        low, high = local.min(0), local.max(0)
+        local = (local - low) / np.where(high > low, high - low, 1)
+
+        ids.extend(positions)
+        coords.append([x, y] + 0.8 * side * local)
+
+        x += side
+        row_height = max(row_height, side)
+
+    coords = np.concatenate(coords)
+
+    # Rescale to the size of the drawing
+    low, high = coords.min(0), coords.max(0)
+    coords = (coords - low) / np.where(high > low, high - low, 1)
+    coords *= [width, height]
+
+    return {node: {"x": float(x), "y": float(y)}
+            for node, (x, y) in zip(ids, coords)}
+
+
+def cytoscape_elements(nodes, edges, positions=None, max_node_size=60):
+    """
+    Convert nodes and edges to Cytoscape elements.
+
+    Args:
+        nodes (`pd.DataFrame`): As returned by `prepare_network`.
+        edges (`pd.DataFrame`): As returned by `prepare_network`.
+        positions (dict): Optionally, the position of every node id as \
+                          a dict with x and y.
+        max_node_size (int): Size of the largest node, in pixels.
+
+    Returns:
+        list(dict): Elements for `cyto.Cytoscape`.
+    """
+
+    node_sizes = 15 + (max_node_size - 15) * np.sqrt(
+        nodes["size"] / nodes["size"].max())
+    edge_widths = 1 + 5 * edges["weight"] / edges["weight"].max()
+
+    elements = []
+    for node, size in zip(nodes.to_dict("records"), node_sizes):
+        element = {"data": {"id": node["id"], "label": node["label"],
+                            "size": float(size),
+                            "degree": int(node["degree"])}}
+        if positions is not None:
+            element["position"] = positions[node["id"]]
+        elements.append(element)
+
+    for edge, width in zip(edges.to_dict("records"), edge_widths):
+        elements.append({"data": {"source": edge["source"],
+                                  "target": edge["target"],
+                                  "weight": int(edge["weight"]),
+                                  "width": float(width)}})
+
+    return elements
@@ -2,7 +2,10 @@
 This module collects functions and utilities for text visualizations.
 
 Functions:
-    - create_wordcloud: Generate a wordcloud and save it to a file.
+    - create_wordcloud: Generate a wordcloud as an image that can be \
+                        used as the `src` of `html.Img`.
+    - count_words: Count the words of a text column, chunk by chunk.
+    - wordcloud_from_frequencies: Generate a wordcloud from word counts.
 
 Notes to others:
     Feel free to write code here either to improve current or to add \
@@ -10,36 +13,115 @@ Notes to others:
     of development as it will simply increase (re)load times for the app.
 """
 
-from wordcloud import WordCloud
+from wordcloud import WordCloud, STOPWORDS
 
+from collections import Counter
+import base64
+import io
 
-def create_wordcloud(text, user_id, *, background_color="white",
-                     additional_stopwords=[], max_words=2000,
-                     save=False, ret=True, **kwargs):
+
+# Words of at least two letters (possessives are dropped, i.e.
+# "data's" counts as "data"), similar to what `WordCloud` does
+word_pattern = r"[^\W\d_]{2,}"
+
+
+def _to_data_uri(wc):
+    buffer = io.BytesIO()
+    wc.to_image().save(buffer, format="PNG")
+
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+
+    return f"data:image/png;base64,{encoded}"
+
+
+def create_wordcloud(text, *, background_color="white",
+                     additional_stopwords=[], max_words=2000, **kwargs):
     """
-    Generate a wordcloud and save it to a file.
+    Generate a wordcloud as an image that can be used as the `src` \
+    of `html.Img`. Nothing is written to disk, so the result can be \
+    cached and shared between users.
 
     Args:
         text (str): Raw text for the word cloud.
-        user_id (str): Session/user id. Needed to save the image.
         background_color (str):  Color as accepted by wordcloud / matplotlib.
         additional_stopwords (list(str)): Stopwords to remove along \
                                           with the predefined ones.
         max_words (int): Max number of words to include in the wordcloud.
-        save (bool): Whether to save the figure. Currently unimportant.
-        ret (bool): Whether to return a value. Currently unimportant.
         **kwargs: Anything that `wordcloud.WordCloud` accepts.
 
     Returns:
-        None
+        str: The PNG image as a base64 data URI.
     """
 
     wc = WordCloud(width=700,
                    height=500,
                    background_color=background_color,
                    max_words=max_words,
+                   stopwords=STOPWORDS | set(additional_stopwords),
                    font_step=2,
                    **kwargs)
     wc.generate(text)
 
-    wc.to_file(f"static/images/{user_id}_wordcloud.png")
+    return _to_data_uri(wc)
+
+
+def count_words(series, chunk_size=10000, additional_stopwords=[],
+                max_words=10000):
+    """
+    Count the words of a text column, chunk by chunk, so that large \
+    corpora never need to be joined into one giant string.
+
+    Args:
+        series (`pd.Series`): The text column.
+        chunk_size (int): Number of rows to tokenize at once.
+        additional_stopwords (list(str)): Stopwords to remove along \
+                                          with the predefined ones.
+        max_words (int): Keep only this many of the most common words.
+
+    Returns:
+        `collections.Counter`: Word frequencies, in lower case.
+    """
+
+    stopwords = STOPWORDS | set(additional_stopwords)
+    counts = Counter()
+
+    for start in range(0, len(series), chunk_size):
+        chunk = series.iloc[start:start+chunk_size].dropna().astype(str)
+        words = chunk.str.lower().str.findall(word_pattern).explode()
+
+        counts.update(words.value_counts().to_dict())
+
+    for stopword in stopwords & set(counts):
+        del counts[stopword]
+
+    return Counter(dict(counts.most_common(max_words)))
+
+
+def wordcloud_from_frequencies(frequencies, *, background_color="white",
+                               max_words=2000, **kwargs):
+    """
+    Generate a wordcloud from word counts (e.g. from `count_words`).
+
+    Args:
+        frequencies (dict): Word counts.
+        background_color (str):  Color as accepted by wordcloud / matplotlib.
+        max_words (int): Max number of words to include in the wordcloud.
+        **kwargs: Anything that `wordcloud.WordCloud` accepts.
+
+    Returns:
+        str: The PNG image as a base64 data URI, or None if there are \
+             no words (e.g. a numeric column).
+    """
+
+    if not frequencies:
+        return None
+
+    wc = WordCloud(width=700,
+                   height=500,
+                   background_color=background_color,
+                   max_words=max_words,
+                   font_step=2,
+                   **kwargs)
+    wc.generate_from_frequencies(frequencies)
+
+    return _to_data_uri(wc)
@@ -7,6 +7,10 @@ Global Variables:
 
 Functions:
     - KPI_Options: Generate the layout of the dashboard.
+    - iter_baselines: Get the baselines of the chosen series, \
+                      recomputing only what changed, as they become \
+                      available.
+    - cached_baselines: Get the baselines of the chosen series.
 
 Dash callbacks:
     - render_variable_choices_kpi: Create a menu of dcc components for \
@@ -27,16 +31,23 @@ from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
 
-from .server import app, redis_conn
+from .server import app, redis_conn, kpi_cache
 import layouts
 from utils import create_dropdown, get_variable_options
+from utils import get_dataset_version, get_process_pool
+from caching import make_key
 from .graphs import kpis
 
+from concurrent.futures import as_completed
+import numpy as np
 import dill
 
 
 Sidebar = []
 
+# Parameters of `kpis.baseline`, part of the cache keys
+baseline_params = {"min_max": "min"}
+
 
 def KPI_Options(options):
     """
@@ -80,6 +91,82 @@ def KPI_Options(options):
     ]
 
 
+def iter_baselines(df, dataset_choice, yvars):
+    """
+    Get the baselines of the chosen series, recomputing only what \
+    changed, as they become available. Baselines are stored per dataset, \
+    column and parameters, along with the dataset version they were \
+    computed for. If the dataset changed only by new rows being appended, \
+    only a trailing window is recomputed (see `kpis.update_baseline`).
+
+    Args:
+        df (`pd.DataFrame`): The data.
+        dataset_choice (str): Name of the dataset.
+        yvars (list(str)): Columns of `df`.
+
+    Yields:
+        tuple(str, np.array): A y variable and its baseline; cached ones \
+                              first, then the rest in order of completion.
+
+    Notes on implementation:
+        Series that need to be (re)computed are fanned out to the process \
+        pool of the worker, so many series take about as long as the \
+        slowest one. Every result is cached as soon as it is ready.
+    """
+
+    version = get_dataset_version(dataset_choice, redis_conn)
+    values = kpis.as_numbers(df[yvars])
+
+    keys = {}
+    pending = {}
+    for yvar in yvars:
+        keys[yvar] = make_key("kpi_baseline", dataset_choice, yvar,
+                              baseline_params)
+        record = kpi_cache.get(keys[yvar])
+
+        if record is not None and record["version"] == version:
+            yield yvar, record["baseline"]
+        else:
+            pending[yvar] = record
+
+    if not pending:
+        return
+
+    if len(pending) == 1:
+        # Not worth the round-trip to another process
+        yvar, record = pending.popitem()
+        results = [(yvar, kpis.update_baseline(values[yvar].values, record,
+                                               **baseline_params))]
+    else:
+        pool = get_process_pool()
+        futures = {
+            pool.submit(kpis.update_baseline, values[yvar].values, record,
+                        **baseline_params): yvar
+            for yvar, record in pending.items()
+        }
+        results = ((futures[future], future.result())
+                   for future in as_completed(futures))
+
+    for yvar, record in results:
+        record["version"] = version
+        kpi_cache.set(keys[yvar], record)
+
+        yield yvar, record["baseline"]
+
+
+def cached_baselines(df, dataset_choice, yvars):
+    """
+    Get the baselines of the chosen series. See `iter_baselines`.
+
+    Returns:
+        np.array: the baselines, one column per y variable.
+    """
+
+    results = dict(iter_baselines(df, dataset_choice, yvars))
+
+    return np.column_stack([results[yvar] for yvar in yvars])
+
+
 @app.callback([Output("xvars_kpi", "options"),
                Output("yvars_kpi", "options"),
                Output("secondary_yvars_kpi", "options")],
@@ -138,7 +225,9 @@ def plot_graph_kpi(xvars, yvars, secondary_yvars, dataset_choice):
     df = dill.loads(redis_conn.get(dataset_choice))
 
     # baseline graph
-    traces = kpis.baseline_graph(df, xvars, yvars, secondary_yvars)
+    series_baselines = cached_baselines(df, dataset_choice, yvars)
+    traces = kpis.baseline_graph(df, xvars, yvars, secondary_yvars,
+                                 series_baselines)
 
     return {
         'data': traces,
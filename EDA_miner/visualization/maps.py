@@ -1,20 +1,25 @@
 """
-This module handles map plotting. Currently only 3 types of map types are \
-supported (aggregated choropleth, geo-scatterplot, and lines on map).
+This module handles map plotting. Currently only 4 types of map types are \
+supported (aggregated choropleth, geo-scatterplot, binned geo-scatterplot, \
+and lines on map).
 
 Global Variables:
     - Sidebar: To be used for creating side-menus.
+    - country_codes_key: The Redis hash of country values resolved so far.
 
 Functions:
     - Map_Options: Generate the layout of the dashboard.
-    - country2code: It takes a string and tries to convert it to a country \
-                    code by trying out various encodings.
+    - get_country_codes: Get the country codes of a column, resolving \
+                         them only if the dataset changed.
+    - aggregate_by_country: Aggregate a variable per country, reusing \
+                            earlier aggregations of the same dataset.
 
 Dash callbacks:
     - render_variable_choices_maps: Create a menu of dcc components for \
                                     the user to choose plotting options.
     - show_hide_aggregator_dropdown: Disable some dropdowns. Some maps do \
                                      not handle all the fields.
+    - store_map_view: Keep track of the zoom level and center of the map.
     - plot_map: Plot the map according to user choices.
 
 TODO:
@@ -27,12 +32,16 @@ from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.exceptions import PreventUpdate
+import dash
 
-from .server import app, redis_conn
+from .server import app, redis_conn, trace_cache
 from utils import create_dropdown, get_variable_options
+from utils import get_dataset_version
+from caching import make_key
+from .graphs.aggregation import category_aggregate
+from .graphs import maps
 
 import plotly.graph_objs as go
-import pycountry
 import dill
 
 
@@ -42,6 +51,9 @@ colorscale_list = ("Greys, YlGnBu, Greens, YlOrRd, Bluered, RdBu, Reds, "
 
 Sidebar = []
 
+# Country values are the same for everyone, so share them
+country_codes_key = "country_codes"
+
 
 def Map_Options(options):
     """
@@ -57,7 +69,12 @@ def Map_Options(options):
     return [
 
         # The main content
-        html.Div(dcc.Graph(id="map_graph"), className="main-content-graph"),
+        html.Div([
+            dcc.Graph(id="map_graph"),
+
+            # Zoom level and center, for maps that depend on them
+            dcc.Store(id="map_view", data={}),
+        ], className="main-content-graph"),
 
         html.Div([
             # Choose a dataset
@@ -68,6 +85,7 @@ def Map_Options(options):
             html.Div(create_dropdown("Map type", [
                 {"label": "Choropleth", "value": "agg_choropleth"},
                 {"label": "Simple geoscatter", "value": "geoscatter"},
+                {"label": "Binned geoscatter", "value": "binned_geoscatter"},
                 {"label": "Lines on map", "value": "maplines"},
             ], multi=False, id="map_type_choice")),
 
@@ -91,7 +109,7 @@ def Map_Options(options):
             html.Div(create_dropdown("Z variable", options=[],
                                      multi=False, id="z_var")),
 
-            # Relevant for `agg_choropleth`
+            # Relevant for `agg_choropleth` and `binned_geoscatter`
             html.Div(create_dropdown("Choose aggregation type", options=[
                 {"label": "Sum", "value": "sum"},
                 {"label": "Average", "value": "mean"},
@@ -145,19 +163,96 @@ def render_variable_choices_maps(dataset_choice):
     return [options] * 6
 
 
-# TODO: This probably needs to interface with the schema
-def country2code(value):
+def _remembered_country2code(values):
+    """
+    Resolve country values, looking up and storing the results in \
+    a Redis hash shared by all workers. Unresolved values are stored \
+    as empty strings so they aren't retried either.
     """
-    Country(alpha_2='DE', alpha_3='DEU', name='Germany', numeric='276',
-            official_name='Federal Republic of Germany')
+
+    if not values:
+        return []
+
+    codes = []
+    resolved = {}
+    for value, code in zip(values, redis_conn.hmget(country_codes_key,
+                                                     values)):
+        if code is None:
+            code = maps.country2code(value) or ""
+            resolved[value] = code
+        else:
+            code = code.decode()
+
+        codes.append(code or None)
+
+    if resolved:
+        redis_conn.hset(country_codes_key, mapping=resolved)
+
+    return codes
+
+
+def get_country_codes(df, country, dataset_choice):
+    """
+    Get the country codes of a column, resolving them only if the \
+    dataset changed. They are stored next to the dataset, along with \
+    the dataset version they were resolved for.
+
+    Args:
+        df (`pd.DataFrame`): The data.
+        country (str): Column name for the country.
+        dataset_choice (str): Name of the dataset.
+
+    Returns:
+        `pd.Series`: Country codes aligned with `df`.
     """
 
-    for key in ["alpha_2", "alpha_3", "name", "numeric", "official_name"]:
-        matched_country = pycountry.countries.get(**{key: value})
+    version = get_dataset_version(dataset_choice, redis_conn)
+    codes_key = (dataset_choice.replace("_data_", "_countrycodes_")
+                 + f"_{country}")
+
+    stored = redis_conn.get(codes_key)
+    if stored is not None:
+        stored = dill.loads(stored)
+
+        if stored["version"] == version:
+            return stored["codes"]
+
+    codes = maps.resolve_countries(df[country], _remembered_country2code)
+    redis_conn.set(codes_key, dill.dumps({"version": version,
+                                          "codes": codes}))
 
-        if matched_country is not None:
-            # Usually the 3-letter code
-            return matched_country.alpha_3
+    return codes
+
+
+def aggregate_by_country(df, country, z_var, aggregator_type, dataset_choice):
+    """
+    Aggregate a variable per country, reusing earlier aggregations of \
+    the same dataset version, so that e.g. changing the colorscale or \
+    the projection doesn't aggregate again.
+
+    Args:
+        df (`pd.DataFrame`): The data.
+        country (str): Column name for the country.
+        z_var (str): Column name of the variable to aggregate.
+        aggregator_type (str): Type of aggregation (e.g. mean, max).
+        dataset_choice (str): Name of the dataset.
+
+    Returns:
+        `pd.Series`: The aggregates indexed by country code.
+    """
+
+    version = get_dataset_version(dataset_choice, redis_conn)
+    key = make_key("choropleth", version, country, z_var, aggregator_type)
+
+    def aggregate():
+        # Attempt conversion of the country column to country codes
+        codes = get_country_codes(df, country, dataset_choice)
+
+        # Only the z_var is aggregated, indexed by country code
+        return category_aggregate(codes, df[z_var],
+                                  how=aggregator_type).dropna()
+
+    return trace_cache.get_or_compute(key, aggregate)
 
 
 @app.callback([Output("aggregator_field", "disabled"),
@@ -176,7 +271,7 @@ def show_hide_aggregator_dropdown(map_type):
         list(bool): What fields are to be disabled.
     """
 
-    if map_type == "agg_choropleth":
+    if map_type in ["agg_choropleth", "binned_geoscatter"]:
         return False, False, True, True
     elif map_type == "maplines":
         return True, True, False, False
@@ -184,6 +279,35 @@ def show_hide_aggregator_dropdown(map_type):
         return True, True, True, True
 
 
+@app.callback(Output("map_view", "data"),
+              [Input("map_graph", "relayoutData")],
+              [State("map_view", "data")])
+def store_map_view(relayout_data, view):
+    """
+    Keep track of the zoom level and center of the map. Plotly only \
+    reports what changed with every interaction (e.g. only the center \
+    when panning), so merge it with what is known so far.
+
+    Args:
+        relayout_data (dict): The last change of the graph layout.
+        view (dict): The zoom level and center known so far.
+
+    Returns:
+        dict: The `geo.*` keys of the layout that are known so far.
+    """
+
+    if relayout_data is None:
+        raise PreventUpdate()
+
+    changes = {key: value for key, value in relayout_data.items()
+               if key.startswith("geo.")}
+
+    if not changes:
+        raise PreventUpdate()
+
+    return {**(view or {}), **changes}
+
+
 @app.callback(Output("map_graph", "figure"),
               [Input("lat_var", "value"),
                Input("lon_var", "value"),
@@ -194,10 +318,11 @@ def show_hide_aggregator_dropdown(map_type):
                Input("dest_lat", "value"),
                Input("dest_long", "value"),
                Input("colorscale", "value"),
-               Input("projection_type", "value")],
+               Input("projection_type", "value"),
+               Input("map_view", "data")],
               [State("dataset_choice_maps", "value")])
 def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
-             dest_lat, dest_long, colorscale, projection_type,
+             dest_lat, dest_long, colorscale, projection_type, view,
              dataset_choice_maps):
     """
     Plot the map according to user choices.
@@ -209,8 +334,9 @@ def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
                        include 3-letter country codes and full names \
                        or anything else pycountry can decode.
         z_var (str): Column name for choropleth colors.
-        map_type (str): Type of math, one of three choices: Simple or \
-                        Aggregated Choropleth, or Lines on map.
+        map_type (str): Type of math, one of four choices: Aggregated \
+                        Choropleth, Simple or Binned geoscatter, or \
+                        Lines on map.
         aggregator_type (str): Type of aggregation to perform on the \
                                data (e.g. mean, max).
         dest_lat (str): Column name for destination latitude, if drawing \
@@ -221,6 +347,8 @@ def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
                           as defined in plotly.
         projection_type (str): Projection type, one of several as \
                                defined by plotly.
+        view (dict): Zoom level and center of the map, for the maps \
+                     that adapt to them.
         dataset_choice_maps (str): Name of dataset.
 
     Returns:
@@ -232,32 +360,45 @@ def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
                   dataset_choice_maps, projection_type]
 
     if map_type == "maplines":
-        conditions.extend([dest_long, dest_long])
+        conditions.extend([dest_lat, dest_long])
 
     if any(var is None for var in conditions):
         return {}
 
+    # Only binned maps depend on the zoom level
+    triggered = [t["prop_id"] for t in dash.callback_context.triggered]
+    if (triggered == ["map_view.data"]
+            and map_type != "binned_geoscatter"):
+        raise PreventUpdate()
+
     # Set default values
     colorscale = colorscale or "Jet"
     aggregator_type = aggregator_type or "count"
 
     df = dill.loads(redis_conn.get(dataset_choice_maps))
 
-    # Attempt conversion of the country column to country codes
-    df["codes"] = df[country].apply(lambda x: country2code(x))
-    countries = df["codes"].dropna().unique()
-
     if map_type == "maplines":
+        traces = maps.maplines(df[lat_var], df[lon_var],
+                               df[dest_lat], df[dest_long])
 
-        # make visualizations lighter by using half of the data
-        df = df[:len(df)//2]
+    elif map_type == "binned_geoscatter":
+        view = view or {}
+        scale = view.get("geo.projection.scale", 1)
 
-        traces = [go.Scattergeo(
-            locationmode='country names',
-            lat=[df[lat_var][i], df[dest_lat][i]],
-            lon=[df[lon_var][i], df[dest_long][i]],
-            mode='lines',
-        ) for i in range(len(df))]
+        # When zoomed in, only bin what's (roughly) visible
+        visible = None
+        if scale > 1 and "geo.center.lon" in view:
+            visible = (view.get("geo.center.lat", 0),
+                       view["geo.center.lon"],
+                       1.5 * 90 / scale, 1.5 * 180 / scale)
+
+        bins = maps.bin_points(df[lat_var], df[lon_var],
+                               df[z_var] if z_var is not None else None,
+                               how=aggregator_type,
+                               bin_size=maps.bin_size_for_view(scale),
+                               view=visible)
+
+        traces = [maps.binned_geoscatter(bins, colorscale)]
 
     else:
         traces = [go.Scattergeo(
@@ -270,9 +411,8 @@ def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
     if "choropleth" in map_type:
 
         try:
-            # .loc is needed to correctly order the countries
-            z = (df.groupby("codes").agg(aggregator_type)
-                   .loc[countries, z_var].dropna().values)
+            z = aggregate_by_country(df, country, z_var, aggregator_type,
+                                     dataset_choice_maps)
 
         except KeyError as e:
             print("Error! Probably bad z_var; usually due to "
@@ -280,7 +420,7 @@ def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
 
             raise PreventUpdate()
 
-        traces.append(go.Choropleth(locations=countries, z=z,
+        traces.append(go.Choropleth(locations=z.index, z=z.values,
                                     colorscale=colorscale))
 
     return {
@@ -295,5 +435,7 @@ def plot_map(lat_var, lon_var, country, z_var, map_type, aggregator_type,
                     "type": projection_type
                 },
             },
+            # Keep the zoom level when redrawing
+            "uirevision": dataset_choice_maps,
         }
     }
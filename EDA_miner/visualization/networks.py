@@ -6,6 +6,8 @@ Global Variables:
 
 Functions:
     - Network_Options: Generate the layout of the dashboard.
+    - network_elements: Get the (coarsened) network and, for server-side \
+                        layouts, its positions, reusing earlier results.
 
 Dash callbacks:
     - render_variable_choices_network: Create a menu of dcc components \
@@ -29,10 +31,12 @@ from dash.exceptions import PreventUpdate
 
 import dash_cytoscape as cyto
 
-from .server import app, redis_conn
+from .server import app, redis_conn, trace_cache
 from utils import create_dropdown, get_variable_options
+from utils import get_dataset_version
+from caching import make_key
+from .graphs import networks
 
-from itertools import chain
 import dill
 
 
@@ -58,6 +62,16 @@ def Network_Options(options):
                 id='cytoscape_network_graph',
                 layout={'name': 'preset'},
                 style={'width': '100%', 'height': '700px'},
+                stylesheet=[
+                    {'selector': 'node',
+                     'style': {'label': 'data(label)',
+                               'width': 'data(size)',
+                               'height': 'data(size)'}},
+                    {'selector': 'edge',
+                     'style': {'width': 'data(width)',
+                               'curve-style': 'bezier',
+                               'target-arrow-shape': 'triangle'}},
+                ],
                 elements=[
                     {'data': {'id': 'one', 'label': 'Example Node 1'},
                      'position': {'x': 75, 'y': 75}},
@@ -92,6 +106,12 @@ def Network_Options(options):
                                          for name in ['grid', 'random',
                                                       'circle', 'concentric',
                                                       'cose']
+                                     ] + [
+                                         # Computed on the server
+                                         {'label': name.replace("_", "-")
+                                                       .title(),
+                                          'value': name}
+                                         for name in networks.server_layouts
                                      ]))
         ], id="network_menu"),
     ]
@@ -121,6 +141,43 @@ def render_variable_choices_network(dataset_choice):
     return [options] * 2
 
 
+def network_elements(in_node, out_node, layout_choice, dataset_choice):
+    """
+    Get the (coarsened) network and, for server-side layouts, its \
+    positions, reusing earlier results for the same dataset version. \
+    The data are only loaded if something needs to be computed.
+
+    Args:
+        in_node (str): Column name of the nodes where links start.
+        out_node (str): Column name of the nodes where links end.
+        layout_choice (str): A Cytoscape or server-side layout.
+        dataset_choice (str): Name of dataset.
+
+    Returns:
+        list(dict): Elements for `cyto.Cytoscape`.
+    """
+
+    version = get_dataset_version(dataset_choice, redis_conn)
+
+    def prepare():
+        df = dill.loads(redis_conn.get(dataset_choice))
+
+        # Cytoscape can't handle large networks, so coarsen them
+        return networks.prepare_network(df, in_node, out_node)
+
+    nodes, edges = trace_cache.get_or_compute(
+        make_key("network", version, in_node, out_node), prepare)
+
+    positions = None
+    if layout_choice in networks.server_layouts:
+        positions = trace_cache.get_or_compute(
+            make_key("network_layout", version, in_node, out_node,
+                     layout_choice),
+            networks.compute_layout, nodes, edges, layout_choice)
+
+    return networks.cytoscape_elements(nodes, edges, positions)
+
+
 @app.callback([Output("cytoscape_network_graph", "elements"),
                Output('cytoscape_network_graph', 'layout')],
               [Input("in_node", "value"),
@@ -136,7 +193,7 @@ def plot_network(in_node, out_node, layout_choice, dataset_choice):
                       nodes from where links start.
         out_node (str): Column name for nodes where links end.
         layout_choice (str): One of the layouts available in \
-                             Cytoscape.
+                             Cytoscape, or computed on the server.
         dataset_choice (str): Name of dataset.
 
     Returns:
@@ -149,22 +206,12 @@ def plot_network(in_node, out_node, layout_choice, dataset_choice):
     if any(var is None for var in conditions):
         raise PreventUpdate()
 
-    # This doesn't seem to be able to handle more than 100
-    # https://github.com/cytoscape/cytoscape.js/issues/858
-    # TODO: Consider adding clustering
-    df = dill.loads(redis_conn.get(dataset_choice)).sample(n=100)
-
-    node_list = []
-    for node in chain(df[in_node].values, df[out_node].values):
-        node_list.append({"data": {
-            "id": node, "label": node,
-        }})
+    elements = network_elements(in_node, out_node, layout_choice,
+                                dataset_choice)
 
-    edge_list = []
-    for i, row in df[[in_node, out_node]].iterrows():
-        edge_list.append({"data": {
-            "source": row[in_node], "target": row[out_node],
-        }})
+    # Server-side layouts come with the positions of the nodes
+    if layout_choice in networks.server_layouts:
+        layout_choice = "preset"
 
     # TODO: consider coloring nodes based on in/out-nodes
-    return [node_list + edge_list, {'name': layout_choice}]
+    return [elements, {'name': layout_choice}]
@@ -6,14 +6,30 @@ Global Variables:
     - app: The Dash server, imported everywhere that a dash callback \
            needs to be defined.
     - redis_conn: The connection to Redis.
+    - trace_cache: Size-bounded cache for plotly traces, shared across \
+                   callbacks, users, and workers.
+    - kpi_cache: Size-bounded cache for KPI baselines.
+    - wordcloud_cache: Size-bounded cache for rendered wordclouds.
 """
 
 from dash import Dash
 from redis import Redis
 
+from caching import RedisLRUCache
+
 
 redis_conn = Redis()
 
+# Traces are keyed by dataset version so they never go stale, but
+# evict the least recently used ones so big datasets don't fill Redis
+trace_cache = RedisLRUCache(redis_conn, "traces", max_bytes=256*2**20)
+
+# Baselines are keyed by dataset and column, not version, so that
+# appending to a time series only recomputes the new part
+kpi_cache = RedisLRUCache(redis_conn, "kpi_baselines", max_bytes=64*2**20)
+
+wordcloud_cache = RedisLRUCache(redis_conn, "wordclouds", max_bytes=64*2**20)
+
 app = Dash(__name__, requests_pathname_prefix="/visualization/",
            assets_external_path="http://127.0.0.1:8000/static/")
 
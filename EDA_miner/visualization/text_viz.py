@@ -3,13 +3,19 @@ This module is about visualizing text data.
 
 Global Variables:
     - Sidebar: To be used for creating side-menus.
+    - text_types: Schema types of the columns offered for wordclouds.
+    - placeholder_image: Shown when there is no wordcloud to show.
 
 Functions:
     - TextViz_Options: Generate the layout of the dashboard.
+    - column_wordcloud: Create the wordcloud of a text column.
 
 Dash callbacks:
+    - render_variable_choices_textviz: Create a menu of dcc components \
+                                       for the user to choose plotting \
+                                       options.
     - plot_graph_text: Currently only word cloud visualizations are \
-                       supported, from given text.
+                       supported, from given text or a text column.
 
 Notes to others:
     Contributions are encouraged here. Main functionality is still \
@@ -26,21 +32,30 @@ from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
 
-from .server import app
+import dash
+
+from .server import app, redis_conn, wordcloud_cache
+from utils import create_dropdown, get_data_schema
+from utils import get_dataset_version
+from caching import make_key
 from .graphs import textviz
 
-from flask_login import current_user
+import dill
 
 
 Sidebar = []
 
+text_types = ["string", "categorical"]
+
+placeholder_image = "/static/images/default_wordcloud.png"
+
 
-def TextViz_Options():
+def TextViz_Options(options):
     """
     Generate the layout of the dashboard.
 
-    Optional Args:
-        options (list(dict)): Not relevant; here only for API compatibility.
+    Args:
+        options (list(dict)): Available datasets as options for `dcc.Dropdown`.
 
     Returns:
         A Dash element or list of elements.
@@ -57,40 +72,117 @@ def TextViz_Options():
 
             html.Div([
                 # The graph itself
-                html.Img(id='wordcloud_img',
-                         src="/static/images/default_wordcloud.png"),
+                html.Img(id='wordcloud_img', src=placeholder_image),
             ], className="col-sm-8")
         ], className="row"),
 
         # The tab menu
-        html.H4("No menu yet", id="textviz_menu")
+        html.Div([
+            # Choose a dataset and a text column
+            html.Div(create_dropdown("Available datasets", options,
+                                     multi=False,
+                                     id="dataset_choice_textviz")),
+
+            html.Div(create_dropdown("Text column", options=[],
+                                     multi=False, id="text_column")),
+
+            html.Button("Wordcloud from column", id="make_column_wordcloud"),
+        ], id="textviz_menu"),
     ]
 
 
+@app.callback(Output("text_column", "options"),
+              [Input("dataset_choice_textviz", "value")])
+def render_variable_choices_textviz(dataset_choice):
+    """
+    Create a menu of dcc components for the user to choose \
+    plotting options. Only text columns (see `text_types`) are offered.
+
+    Args:
+        dataset_choice (str): Name of the dataset.
+
+    Returns:
+        list(dict): Key-value pairs to be input as `dcc.Dropdown` options.
+    """
+
+    if dataset_choice is None:
+        return []
+
+    df_schema = get_data_schema(dataset_choice, redis_conn)["types"]
+    if df_schema is None:
+        return []
+
+    return [{'label': col[:35], 'value': col}
+            for col, type_ in df_schema.items() if type_ in text_types]
+
+
+def column_wordcloud(dataset_choice, column):
+    """
+    Create the wordcloud of a text column. Both the word counts and \
+    the image are cached per dataset version.
+
+    Args:
+        dataset_choice (str): Name of the dataset.
+        column (str): The text column.
+
+    Returns:
+        str: The image as a base64 data URI, or `placeholder_image` if \
+             the column has no words.
+    """
+
+    version = get_dataset_version(dataset_choice, redis_conn)
+
+    def count_words():
+        df = dill.loads(redis_conn.get(dataset_choice))
+
+        return textviz.count_words(df[column])
+
+    def render():
+        frequencies = wordcloud_cache.get_or_compute(
+            make_key("word_counts", version, column), count_words)
+
+        return (textviz.wordcloud_from_frequencies(frequencies)
+                or placeholder_image)
+
+    return wordcloud_cache.get_or_compute(
+        make_key("column_wordcloud", version, column), render)
+
+
 @app.callback(
     Output("wordcloud_img", "src"),
-    [Input("make_wordcloud", "n_clicks")],
-    [State("text_area", "value")])
-def plot_graph_text(n_clicks, text):
+    [Input("make_wordcloud", "n_clicks"),
+     Input("make_column_wordcloud", "n_clicks")],
+    [State("text_area", "value"),
+     State("dataset_choice_textviz", "value"),
+     State("text_column", "value")])
+def plot_graph_text(n_clicks, n_clicks_column, text, dataset_choice,
+                    column):
     """
     Currently only word cloud visualizations are supported,
-    from given text.
+    from given text or a text column.
 
     Args:
-        n_clicks (int): Number of button clicks.
+        n_clicks (int): Number of button clicks (text).
+        n_clicks_column (int): Number of button clicks (column).
         text (str): User-provided text used to create a word cloud.
+        dataset_choice (str): Name of the dataset.
+        column (str): Text column used to create a word cloud.
 
     Returns:
         str: the image encoded appropriately to be set as the 'src' \
              value of the `img` element
     """
 
-    user_id = current_user.username
+    triggered = [t["prop_id"] for t in dash.callback_context.triggered]
+
+    if "make_column_wordcloud.n_clicks" in triggered:
+        if dataset_choice is not None and column is not None:
+            return column_wordcloud(dataset_choice, column)
 
-    if text is not None and len(text.split()) > 1:
-        textviz.create_wordcloud(text, user_id)
-        return f"static/images/{user_id}_wordcloud.png"
+    elif text is not None and len(text.split()) > 1:
+        # The same text always gives the same image, for any user
+        return wordcloud_cache.get_or_compute(make_key("wordcloud", text),
+                                              textviz.create_wordcloud, text)
 
-    else:
-        # invalid arguments or Dash's first pass
-        return "/static/images/default_wordcloud.png"
+    # invalid arguments or Dash's first pass
+    return placeholder_image
@@ -16,6 +16,7 @@ from visualization_server import app as visualization_app
 from model_server import app as model_app
 from docs_server import app as docs_app
 from presentation_server import app as presentation_app
+from serving_server import app as serving_app
 
 from app_extensions import mail, login_manager, db
 
@@ -47,6 +48,7 @@ data_app.server.config.update(config)
 visualization_app.server.config.update(config)
 model_app.server.config.update(config)
 presentation_app.server.config.update(config)
+serving_app.config.update(config)
 
 # STEP 2
 # Initialize extensions for the apps to use
@@ -67,6 +69,7 @@ db.init_app(data_app.server)
 db.init_app(visualization_app.server)
 db.init_app(model_app.server)
 db.init_app(presentation_app.server)
+db.init_app(serving_app)
 
 # STEP 2.3
 # Initialize the mail extension for the apps that use it
@@ -93,5 +96,6 @@ application = DispatcherMiddleware(flask_app, {
     "/modeling": model_app.server,
     "/docs": docs_app.server,
     "/graphs": presentation_app.server,
+    "/serve": serving_app,
     # "/metrics": make_wsgi_app()
 })
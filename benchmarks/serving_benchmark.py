@@ -0,0 +1,158 @@
+"""
+Benchmark of serving predictions, with a local load generator: every \
+client is a thread that sends single requests back to back, and the \
+throughput and latency percentiles of all requests are reported.
+
+By default the model is served in-process, with and without micro-batching \
+(see `serving.batching`), so the difference is only that of batching. With \
+`--url` the requests are sent to a running server instead, e.g.:
+
+    python serving_benchmark.py --url http://127.0.0.1:8000/serve \
+        --token <api_token> --model <name> --columns a b c
+
+Run it from this directory.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import time
+import sys
+import os
+
+from sklearn.datasets import make_classification
+from sklearn.decomposition import PCA
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+
+from serving.batching import MicroBatcher
+
+
+def make_model(n_features=20):
+    """
+    Fit a small pipeline, like the ones trained in the app, on \
+    synthetic data.
+
+    Returns:
+        tuple: The fitted pipeline, and the data as a `pd.DataFrame`.
+    """
+
+    X, y = make_classification(n_samples=5000, n_features=n_features,
+                               random_state=0)
+    X = pd.DataFrame(X, columns=[f"x{i}" for i in range(n_features)])
+
+    model = Pipeline([("scaler", StandardScaler()),
+                      ("pca", PCA(n_components=10)),
+                      ("model", LogisticRegression(solver="lbfgs"))])
+
+    return model.fit(X, y), X
+
+
+def run_load(send, rows, n_clients, n_requests):
+    """
+    Send requests from concurrent clients and time every one of them.
+
+    Args:
+        send (callable): Sends one request with the given rows.
+        rows (list(`pd.DataFrame`)): The rows of the requests, cycled.
+        n_clients (int): Number of concurrent clients (threads).
+        n_requests (int): Number of requests per client.
+
+    Returns:
+        dict: Throughput (requests/s) and latency percentiles (ms).
+    """
+
+    def client(offset):
+        latencies = []
+        for i in range(n_requests):
+            start = time.perf_counter()
+            send(rows[(offset + i) % len(rows)])
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_clients) as clients:
+        latencies = np.concatenate(list(clients.map(client,
+                                                    range(n_clients))))
+    elapsed = time.perf_counter() - start
+
+    return {"requests": len(latencies),
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": 1000 * np.percentile(latencies, 50),
+            "p99_ms": 1000 * np.percentile(latencies, 99)}
+
+
+def http_sender(url, token, model_name):
+    """
+    Create a function that sends rows to a running server as JSON.
+    """
+
+    import requests
+
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    endpoint = f"{url.rstrip('/')}/models/{model_name}/predict/"
+
+    def send(rows):
+        response = session.post(endpoint, data=rows.to_json(orient="records"),
+                                headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+        return response.json()["predictions"]
+
+    return send
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per client.")
+    parser.add_argument("--rows", type=int, default=1,
+                        help="Rows per request.")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, default=0.005,
+                        help="Seconds.")
+    parser.add_argument("--url", help="Base URL of the /serve app.")
+    parser.add_argument("--token", help="API token, with --url.")
+    parser.add_argument("--model", help="Name of the model, with --url.")
+    parser.add_argument("--columns", nargs="+",
+                        help="Columns the model expects, with --url. "
+                             "They are filled with synthetic data.")
+    args = parser.parse_args()
+
+    model, X = make_model()
+    if args.columns:
+        X = pd.DataFrame(X.values[:, :len(args.columns)],
+                         columns=args.columns)
+
+    rows = [X.iloc[start:start + args.rows]
+            for start in range(0, 1000 * args.rows, args.rows)]
+
+    if args.url:
+        scenarios = {"http": http_sender(args.url, args.token, args.model)}
+
+    else:
+        batcher = MicroBatcher(max_batch_size=args.max_batch_size,
+                               max_wait=args.max_wait)
+        scenarios = {
+            "direct": model.predict,
+            "batched": lambda rows: batcher.predict("model", model, rows),
+        }
+
+    print(f"{args.clients} clients x {args.requests} requests "
+          f"of {args.rows} row(s)")
+
+    results = {}
+    for name, send in scenarios.items():
+        send(rows[0])  # warm up
+        results[name] = run_load(send, rows, args.clients, args.requests)
+
+    print(pd.DataFrame(results).T.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
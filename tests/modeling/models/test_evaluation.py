@@ -0,0 +1,201 @@
+import sys
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.datasets import make_classification, make_regression
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models.evaluation import estimator_digest, make_splits
+from modeling.models.evaluation import cross_validate, summarize
+from modeling.models.evaluation import encode_target
+from caching import make_key
+
+
+def classification_data(n_samples=200):
+    X, y = make_classification(n_samples=n_samples, n_features=5,
+                               random_state=0)
+    return pd.DataFrame(X, columns=list("abcde")), pd.Series(y)
+
+
+def regression_data(n_samples=200):
+    X, y = make_regression(n_samples=n_samples, n_features=5, noise=1,
+                           random_state=0)
+    return pd.DataFrame(X, columns=list("abcde")), pd.Series(y)
+
+
+class TestEstimatorDigest:
+
+    def test_equal_estimators(self):
+        assert estimator_digest(LogisticRegression(C=2)) == \
+            estimator_digest(LogisticRegression(C=2))
+
+    def test_different_parameters(self):
+        assert estimator_digest(LogisticRegression(C=1)) != \
+            estimator_digest(LogisticRegression(C=2))
+
+    def test_nested_parameters(self):
+        def pipeline(C):
+            return Pipeline([("scaler", StandardScaler()),
+                             ("model", LogisticRegression(C=C))])
+
+        assert estimator_digest(pipeline(1)) == estimator_digest(pipeline(1))
+        assert estimator_digest(pipeline(1)) != estimator_digest(pipeline(2))
+
+    def test_cache_key(self):
+        # As keyed in the modeling tabs: the estimator and the data version
+        digest = estimator_digest(LogisticRegression())
+
+        assert make_key(digest, "v1") == make_key(digest, "v1")
+        assert make_key(digest, "v1") != make_key(digest, "v2")
+
+
+class TestMakeSplits:
+
+    y = np.array([0] * 60 + [1] * 40)
+
+    def test_kfold_partitions_the_samples(self):
+        splits = make_splits(self.y, "kfold", n_splits=5)
+
+        assert len(splits) == 5
+        tests = np.concatenate([test for _, test in splits])
+        assert sorted(tests) == list(range(len(self.y)))
+
+        for train, test in splits:
+            assert not set(train) & set(test)
+            assert len(train) + len(test) == len(self.y)
+
+    def test_holdout(self):
+        splits = make_splits(self.y, "holdout", test_size=0.25)
+
+        assert len(splits) == 1
+        train, test = splits[0]
+        assert len(test) == 25
+        assert not set(train) & set(test)
+
+    def test_stratified(self):
+        for train, test in make_splits(self.y, "kfold", stratify=True):
+            assert self.y[test].mean() == self.y.mean()
+
+    def test_rare_class_is_not_stratified(self):
+        y = np.array([0] * 98 + [1] * 2)
+
+        assert len(make_splits(y, "kfold", n_splits=5, stratify=True)) == 5
+
+    def test_deterministic(self):
+        first = make_splits(self.y, "kfold")
+        second = make_splits(self.y, "kfold")
+
+        for (train1, test1), (train2, test2) in zip(first, second):
+            assert np.array_equal(train1, train2)
+            assert np.array_equal(test1, test2)
+
+    def test_unknown_method(self):
+        try:
+            make_splits(self.y, "bootstrap")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected a ValueError")
+
+
+class TestCrossValidate:
+
+    def test_classification(self):
+        X, y = classification_data()
+        results = cross_validate(LogisticRegression(solver="lbfgs"), X, y,
+                                 "classification", n_splits=4)
+
+        folds = results["folds"]
+        assert len(folds) == 4
+        assert {"n_train", "n_test", "fit_time", "score_time",
+                "Accuracy", "F1 (macro)"} <= set(folds.columns)
+        assert folds["n_test"].sum() == len(y)
+        assert (folds["Accuracy"] > 0.7).all()
+        assert results["estimator"] is None
+
+    def test_out_of_fold_predictions(self):
+        X, y = regression_data()
+        results = cross_validate(LinearRegression(), X, y, "regression",
+                                 n_splits=4)
+
+        predictions = results["predictions"]
+        assert predictions.shape == (len(y),)
+        assert not np.isnan(predictions).any()
+
+        # Every sample is predicted by the model of the fold it's tested in
+        for train, test in make_splits(y, "kfold", 4):
+            model = LinearRegression().fit(X.iloc[train], y.iloc[train])
+            assert np.allclose(predictions[test], model.predict(X.iloc[test]))
+
+    def test_holdout_predictions(self):
+        X, y = regression_data()
+        results = cross_validate(LinearRegression(), X, y, "regression",
+                                 method="holdout")
+
+        assert len(results["folds"]) == 1
+        n_tested = (~np.isnan(results["predictions"])).sum()
+        assert n_tested == results["folds"]["n_test"][0]
+
+    def test_refit(self):
+        X, y = regression_data()
+        estimator = LinearRegression()
+        results = cross_validate(estimator, X, y, "regression", refit=True)
+
+        refitted = results["estimator"]
+        assert refitted is not estimator
+        assert np.allclose(refitted.coef_,
+                           LinearRegression().fit(X, y).coef_)
+        assert not hasattr(estimator, "coef_")
+
+    def test_pool_matches_serial(self):
+        X, y = classification_data()
+        estimator = LogisticRegression(solver="lbfgs")
+
+        serial = cross_validate(estimator, X, y, "classification",
+                                refit=True)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pooled = cross_validate(estimator, X, y, "classification",
+                                    pool=pool, refit=True)
+
+        metrics = ["n_train", "n_test", "Accuracy", "F1 (macro)"]
+        assert serial["folds"][metrics].equals(pooled["folds"][metrics])
+        assert np.array_equal(serial["predictions"], pooled["predictions"])
+        assert np.allclose(serial["estimator"].coef_,
+                           pooled["estimator"].coef_)
+
+
+class TestEncodeTarget:
+
+    def test_missing_targets_are_dropped(self):
+        X = pd.DataFrame({"a": [1, 2, 3, 4]}, index=[10, 11, 12, 13])
+        y = pd.Series([np.nan, "no", "yes", "no"], index=X.index)
+
+        X_known, codes, classes = encode_target(X, y)
+
+        assert list(X_known.index) == [11, 12, 13]
+        assert classes == ["no", "yes"]
+        assert list(np.asarray(classes)[codes]) == ["no", "yes", "no"]
+
+
+class TestSummarize:
+
+    def test_mean_and_std_of_metrics(self):
+        folds = pd.DataFrame({"n_train": [8, 8], "n_test": [2, 2],
+                              "fit_time": [0.1, 0.2],
+                              "score_time": [0.01, 0.02],
+                              "R2": [0.5, 0.7], "MSE": [2.0, 4.0]})
+
+        summary = summarize(folds)
+
+        assert list(summary.columns) == ["mean", "std"]
+        assert sorted(summary.index) == ["MSE", "R2"]
+        assert np.isclose(summary.loc["R2", "mean"], 0.6)
+        assert np.isclose(summary.loc["R2", "std"], 0.1)
+        assert np.isclose(summary.loc["MSE", "std"], 1.0)
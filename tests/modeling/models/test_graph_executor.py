@@ -0,0 +1,117 @@
+import sys
+import os
+import copy
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.datasets import make_regression
+import networkx as nx
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models.graph_executor import topological_levels, execute_graph
+from modeling.models.graph_structures import Graph, Node, Edge
+from modeling.models.pipeline_creator import create_pipelines
+from modeling.models.evaluation import cross_validate
+
+
+def regression_data(n_samples=200):
+    X, y = make_regression(n_samples=n_samples, n_features=4, noise=1,
+                           random_state=0)
+    return pd.DataFrame(X, columns=list("abcd")), pd.Series(y)
+
+
+def prebuilt(name):
+    # The nodes of prebuilt graphs are shared, so tweak a copy
+    return copy.deepcopy(Graph(prebuilt=name))
+
+
+class TestTopologicalLevels:
+
+    def test_nodes_come_after_their_ancestors(self):
+        dag = nx.DiGraph([("a", "b"), ("b", "c"), ("a", "c"), ("d", "c")])
+
+        levels = topological_levels(dag)
+
+        assert [sorted(level) for level in levels] == \
+            [["a", "d"], ["b"], ["c"]]
+
+    def test_empty(self):
+        assert topological_levels(nx.DiGraph()) == []
+
+
+class TestExecuteGraph:
+
+    X, y = regression_data()
+    metrics = ["n_train", "n_test", "R2", "MSE", "MAE"]
+
+    def expected(self, graph, node_id, problem_type):
+        pipelines, terminal_nodes = create_pipelines(graph.graph, n_jobs=1)
+        pipeline = pipelines[terminal_nodes.index(node_id)]
+
+        return cross_validate(pipeline, self.X, self.y, problem_type,
+                              n_splits=3)
+
+    def test_matches_the_pipeline(self):
+        graph = prebuilt("default")
+
+        result = execute_graph(graph, self.X, self.y, n_splits=3)
+        assert list(result) == ["linr_001"]
+        result = result["linr_001"]
+
+        expected = self.expected(graph, "linr_001", "regression")
+        assert result["error"] is None
+        assert result["problem_type"] == "regression"
+        assert np.allclose(result["predictions"], expected["predictions"])
+        assert np.allclose(result["folds"][self.metrics],
+                           expected["folds"][self.metrics])
+
+    def test_clustering_matches_the_pipeline(self):
+        graph = prebuilt("scale_reduce_kmeans")
+        graph.graph.node_collection["kmc_001"].params.update(
+            n_clusters=3, random_state=0)
+
+        result = execute_graph(graph, self.X, self.y, n_splits=3)["kmc_001"]
+
+        expected = self.expected(graph, "kmc_001", "clustering")
+        assert result["error"] is None
+        assert result["problem_type"] == "clustering"
+        assert np.array_equal(result["predictions"], expected["predictions"])
+
+    def test_pool_matches_serial(self):
+        graph = prebuilt("default")
+
+        serial = execute_graph(graph, self.X, self.y, n_splits=3)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pooled = execute_graph(graph, self.X, self.y, n_splits=3,
+                                   pool=pool)
+
+        assert np.allclose(serial["linr_001"]["predictions"],
+                           pooled["linr_001"]["predictions"])
+
+    def test_failing_node_fails_its_descendants(self):
+        graph = prebuilt("default")
+        nodes = graph.graph.node_collection
+
+        # More components than features
+        nodes["pca_001"].params["n_components"] = 50
+
+        # A model that doesn't depend on the PCA
+        linr = Node("linr", "linr_002")
+        nodes.add_node(linr)
+        graph.graph.edge_collection.add_edges([Edge(nodes["stdsc_001"],
+                                                    linr)])
+
+        progress = []
+        results = execute_graph(graph, self.X, self.y, n_splits=3,
+                                progress=progress.append)
+
+        assert results["linr_001"]["error"].startswith("pca_001: ")
+        assert np.isnan(results["linr_001"]["predictions"]).all()
+        assert results["linr_001"]["folds"].empty
+
+        assert results["linr_002"]["error"] is None
+        assert not np.isnan(results["linr_002"]["predictions"]).any()
+        assert progress[-1] == 1
@@ -0,0 +1,108 @@
+import sys
+import os
+import warnings
+from redis import Redis
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models import pipeline_classes
+from modeling.models.pipeline_classes import SentimentAnalyzer
+from modeling.models.graph_structures import Graph, Node, Edge
+from modeling.models.graph_executor import execute_graph
+
+
+def sentiment_graph():
+    graph = Graph()
+    nodes = [Node("input_file", "input_file_001"),
+             Node("data_cleaner", "data_cleaner_001"),
+             Node("sentiment", "sentiment_001")]
+    for node in nodes:
+        graph.graph.node_collection.add_node(node)
+
+    graph.graph.edge_collection.add_edges([Edge(nodes[0], nodes[1]),
+                                           Edge(nodes[1], nodes[2])])
+
+    return graph
+
+
+class TestSentimentAnalyzer:
+
+    polarities_key = "test_sentiment_polarities"
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+
+    def setup_method(self):
+        self.scored = []
+
+        def polarities(texts):
+            self.scored.extend(texts)
+            return [len(text) / 10 for text in texts]
+
+        self.original = (pipeline_classes.polarities_key,
+                         pipeline_classes._polarities)
+        pipeline_classes.polarities_key = self.polarities_key
+        pipeline_classes._polarities = polarities
+
+    def teardown_method(self):
+        (pipeline_classes.polarities_key,
+         pipeline_classes._polarities) = self.original
+        self.redis_conn.delete(self.polarities_key)
+
+    def test_distinct_texts_are_scored_once(self):
+        texts = ["good", "bad", "good", "good", "bad"]
+
+        polarities = SentimentAnalyzer().fit(texts).predict(texts)
+
+        assert sorted(self.scored) == ["bad", "good"]
+        assert np.allclose(polarities, [0.4, 0.3, 0.4, 0.4, 0.3])
+
+    def test_cached_texts_are_not_scored_again(self):
+        model = SentimentAnalyzer()
+        model.predict(np.array([["good"], ["bad"]], dtype=object))
+        self.scored.clear()
+
+        polarities = model.predict(["bad", "great", "good"])
+
+        assert self.scored == ["great"]
+        assert np.allclose(polarities, [0.3, 0.5, 0.4])
+
+    def test_cache_expires(self):
+        SentimentAnalyzer().predict(["good"])
+
+        assert 0 < self.redis_conn.ttl(self.polarities_key) <= \
+            pipeline_classes.polarities_expiry
+
+    def test_full_cache_is_started_over(self):
+        max_polarities = pipeline_classes.max_polarities
+        pipeline_classes.max_polarities = 2
+        try:
+            SentimentAnalyzer().predict(["a", "b", "c"])
+            SentimentAnalyzer().predict(["d"])
+        finally:
+            pipeline_classes.max_polarities = max_polarities
+
+        assert self.redis_conn.hlen(self.polarities_key) == 1
+
+    def test_dataframes(self):
+        X = pd.DataFrame({"text": ["good", "bad"], "other": [1, 2]})
+
+        polarities = SentimentAnalyzer().predict(X)
+
+        assert self.scored == ["good", "bad"]
+        assert np.allclose(polarities, [0.4, 0.3])
+
+    def test_in_a_graph(self):
+        graph = sentiment_graph()
+        X = pd.DataFrame({"text": ["good", "bad", "great", "fine"] * 5})
+        y = pd.Series(np.arange(20) / 20)
+
+        # The input node passes the data on as it is, i.e. a DataFrame
+        result = execute_graph(graph, X, y, n_splits=2)["sentiment_001"]
+
+        assert result["error"] is None
+        assert np.allclose(result["predictions"], X["text"].str.len() / 10)
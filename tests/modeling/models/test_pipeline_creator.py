@@ -0,0 +1,132 @@
+import sys
+import os
+import warnings
+from sklearn.decomposition import PCA
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline, FeatureUnion
+import networkx as nx
+import dill
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models.pipeline_creator import _traverse_graph
+from modeling.models.pipeline_creator import create_pipelines, set_n_jobs
+from modeling.models.graph_structures import Graph, Node, Edge
+
+
+def make_graph(node_types, edges):
+    """
+    Create a ModelBuilder graph with nodes "<node_type>_001" and edges \
+    between pairs of node types.
+    """
+
+    graph = Graph()
+    nodes = {node_type: Node(node_type, f"{node_type}_001")
+             for node_type in node_types}
+    for node in nodes.values():
+        graph.graph.node_collection.add_node(node)
+
+    graph.graph.edge_collection.add_edges([Edge(nodes[src], nodes[dest])
+                                           for src, dest in edges])
+
+    return graph.graph
+
+
+def unions(pipeline):
+    return [value for value in pipeline.get_params(deep=True).values()
+            if isinstance(value, FeatureUnion)]
+
+
+class TestCreatePipelines:
+
+    def test_chains_are_flat(self):
+        graph = Graph(prebuilt="default").graph
+
+        pipelines, terminal_nodes = create_pipelines(graph, n_jobs=4)
+
+        assert terminal_nodes == ["linr_001"]
+        pipeline = pipelines[0]
+        assert [name for name, _ in pipeline.steps] == [
+            "input_file_001", "data_cleaner_001", "stdsc_001", "pca_001",
+            "linr_001"]
+        assert not any(isinstance(step, (Pipeline, FeatureUnion))
+                       for _, step in pipeline.steps)
+
+    def test_multiple_parents_make_a_union(self):
+        graph = make_graph(["input_file", "stdsc", "pca", "linr"],
+                           [("input_file", "stdsc"), ("input_file", "pca"),
+                            ("stdsc", "linr"), ("pca", "linr")])
+
+        pipeline = create_pipelines(graph, n_jobs=4)[0][0]
+
+        assert [name for name, _ in pipeline.steps] == ["union", "linr_001"]
+        union = pipeline.named_steps["union"]
+        assert [name for name, _ in union.transformer_list] == \
+            ["stdsc_001", "pca_001"]
+        assert union.n_jobs == 2
+
+        # Each branch is a flat chain from the input
+        stdsc = union.transformer_list[0][1]
+        assert [name for name, _ in stdsc.steps] == \
+            ["input_file_001", "stdsc_001"]
+
+    def test_union_n_jobs_budget(self):
+        graph = make_graph(
+            ["input_file", "stdsc", "minmax_scale", "pca", "tsvd", "linr"],
+            [("input_file", "stdsc"), ("input_file", "minmax_scale"),
+             ("stdsc", "pca"), ("minmax_scale", "pca"),
+             ("input_file", "tsvd"), ("pca", "linr"), ("tsvd", "linr")])
+
+        pipeline = create_pipelines(graph, n_jobs=4)[0][0]
+
+        outer, inner = unions(pipeline)
+        assert outer.n_jobs == 2
+        # The branch of the PCA gets half of the budget
+        assert inner.n_jobs == 2
+
+        pipeline = create_pipelines(graph, n_jobs=1)[0][0]
+        assert all(union.n_jobs == 1 for union in unions(pipeline))
+
+    def test_parents_outside_the_mapper_are_ignored(self):
+        graph = make_graph(["input_file", "stdsc", "linr"],
+                           [("input_file", "stdsc"), ("stdsc", "linr")])
+        G = nx.DiGraph([("input_file_001", "stdsc_001"),
+                        ("stdsc_001", "linr_001")])
+        mapper = {node.id: node.model_class(**node.params)
+                  for node in graph.node_collection.nodes
+                  if node.id != "input_file_001"}
+
+        pipeline = _traverse_graph("linr_001", G, mapper, n_jobs=2)
+
+        assert [name for name, _ in pipeline.steps] == \
+            ["stdsc_001", "linr_001"]
+
+
+class TestSetNJobs:
+
+    def test_resets_nested_n_jobs(self):
+        pipeline = Pipeline([
+            ("union", FeatureUnion([("pca", PCA(n_components=1))],
+                                   n_jobs=4)),
+            ("model", RandomForestRegressor(n_jobs=4)),
+        ])
+
+        assert set_n_jobs(pipeline) is pipeline
+        assert pipeline.named_steps["union"].n_jobs == 1
+        assert pipeline.named_steps["model"].n_jobs == 1
+
+    def test_estimators_without_n_jobs(self):
+        pca = PCA()
+
+        assert set_n_jobs(pca).get_params() == PCA().get_params()
+
+    def test_stored_pipelines(self):
+        graph = make_graph(["input_file", "stdsc", "pca", "linr"],
+                           [("input_file", "stdsc"), ("input_file", "pca"),
+                            ("stdsc", "linr"), ("pca", "linr")])
+        pipeline = create_pipelines(graph, n_jobs=8)[0][0]
+
+        stored = dill.loads(dill.dumps(set_n_jobs(pipeline)))
+
+        assert all(union.n_jobs == 1 for union in unions(stored))
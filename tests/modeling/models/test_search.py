@@ -0,0 +1,138 @@
+import sys
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.datasets import make_regression
+from sklearn.decomposition import PCA
+from sklearn.linear_model import Ridge, HuberRegressor
+from sklearn.pipeline import Pipeline, FeatureUnion
+from sklearn.preprocessing import StandardScaler, RobustScaler
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models.search import param_grid, sample_candidates
+from modeling.models.search import successive_halving
+
+
+class Scaler(StandardScaler):
+    modifiable_params = {"with_mean": [True, False], "with_std": [True],
+                         "not_a_parameter": [1, 2]}
+
+
+class Reducer(PCA):
+    modifiable_params = {"n_components": [2, 3, 50]}
+
+
+class Model(Ridge):
+    modifiable_params = {"alpha": [0.01, 1.0, 1e4]}
+
+
+def regression_data(n_samples=300):
+    X, y = make_regression(n_samples=n_samples, n_features=5, noise=5,
+                           random_state=0)
+    return pd.DataFrame(X, columns=list("abcde")), pd.Series(y)
+
+
+class TestParamGrid:
+
+    def test_single_estimator(self):
+        assert param_grid(Model()) == {"alpha": [0.01, 1.0, 1e4]}
+
+    def test_nested_names(self):
+        pipeline = Pipeline([
+            ("union", FeatureUnion([("scaler_001", Scaler()),
+                                    ("pca_001", Reducer())])),
+            ("model", Model()),
+        ])
+
+        assert param_grid(pipeline) == {
+            "union__scaler_001__with_mean": [True, False],
+            "union__pca_001__n_components": [2, 3, 50],
+            "model__alpha": [0.01, 1.0, 1e4],
+        }
+
+    def test_estimators_without_choices(self):
+        assert param_grid(Pipeline([("scaler", RobustScaler()),
+                                    ("model", HuberRegressor())])) == {}
+
+
+class TestSampleCandidates:
+
+    grid = {"a": [1, 2, 3], "b": ["x", "y"]}
+
+    def test_enumerates_small_grids(self):
+        candidates = sample_candidates(self.grid, n_candidates=10)
+
+        assert len(candidates) == 6
+        assert {"a": 3, "b": "y"} in candidates
+        assert sample_candidates(self.grid) == candidates
+
+    def test_samples_large_grids(self):
+        candidates = sample_candidates(self.grid, n_candidates=4)
+
+        assert len(candidates) == 4
+        assert len({tuple(sorted(c.items())) for c in candidates}) == 4
+        assert candidates == sample_candidates(self.grid, n_candidates=4)
+
+
+class TestSuccessiveHalving:
+
+    pipeline = Pipeline([("pca", Reducer()), ("model", Model())])
+    candidates = sample_candidates(param_grid(pipeline))
+
+    def test_keeps_the_best_candidate(self):
+        X, y = regression_data()
+
+        leaderboard = successive_halving(self.pipeline, X, y,
+                                         self.candidates, "regression")
+
+        assert len(leaderboard) == len(self.candidates)
+
+        best = leaderboard.iloc[0]
+        assert best["params"] == {"pca__n_components": 3,
+                                  "model__alpha": 0.01}
+        assert best["round"] == leaderboard["round"].max()
+        assert best["n_samples"] == len(X)
+
+        # Fewer candidates reach every next round
+        reached = leaderboard["round"].value_counts().sort_index()
+        assert (np.diff(reached.values[::-1].cumsum()[::-1]) < 0).all()
+
+    def test_failed_candidates_go_last(self):
+        X, y = regression_data()
+
+        leaderboard = successive_halving(self.pipeline, X, y,
+                                         self.candidates, "regression")
+
+        failed = leaderboard["score"].isna()
+        assert failed.sum() == 3
+        assert failed.iloc[-3:].all()
+        assert all(leaderboard.loc[failed, "error"].str.len() > 0)
+        assert (leaderboard.loc[failed, "round"] == 1).all()
+
+    def test_pool_matches_serial(self):
+        X, y = regression_data()
+
+        serial = successive_halving(self.pipeline, X, y, self.candidates,
+                                    "regression")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pooled = successive_halving(self.pipeline, X, y,
+                                        self.candidates, "regression",
+                                        pool=pool)
+
+        columns = ["round", "n_samples", "score", "score_std"]
+        assert serial[columns].equals(pooled[columns])
+
+    def test_progress(self):
+        X, y = regression_data()
+        reported = []
+
+        successive_halving(self.pipeline, X, y, self.candidates,
+                           "regression", progress=reported.append)
+
+        # Failed candidates drop out early, so it may end short of 1
+        assert reported == sorted(reported)
+        assert 0 < reported[0] and reported[-1] <= 1
@@ -0,0 +1,120 @@
+import sys
+import os
+import warnings
+from redis import Redis
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline, FeatureUnion
+from sklearn.preprocessing import StandardScaler
+import pandas as pd
+import numpy as np
+import dill
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models.step_cache import StepCache, data_digest, set_step_cache
+from caching import RedisLRUCache
+
+
+class CountingScaler(StandardScaler):
+    fits = 0
+
+    def fit(self, X, y=None, **kwargs):
+        CountingScaler.fits += 1
+        return super().fit(X, y, **kwargs)
+
+
+def make_pipeline(with_mean=True):
+    return Pipeline([("scaler", CountingScaler(with_mean=with_mean)),
+                     ("model", LinearRegression())])
+
+
+class TestDataDigest:
+
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+
+    def test_equal_data(self):
+        assert data_digest(self.df) == data_digest(self.df.copy())
+        assert data_digest(self.df.values) == data_digest(self.df.values)
+        assert data_digest(None) == data_digest(None)
+
+    def test_different_data(self):
+        assert data_digest(self.df) != data_digest(self.df.iloc[:2])
+        assert data_digest(self.df) != \
+            data_digest(self.df.rename(columns={"a": "c"}))
+        assert data_digest(np.arange(3)) != data_digest(np.arange(3.))
+
+
+class TestStepCache:
+
+    namespace = "test_step_cache"
+
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.rand(50, 3), columns=list("abc"))
+    y = X.sum(axis=1)
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+
+    def setup_method(self):
+        CountingScaler.fits = 0
+        self.step_cache = StepCache(RedisLRUCache(self.redis_conn,
+                                                  self.namespace))
+
+    def teardown_method(self):
+        for key in self.redis_conn.keys(f"cache_{self.namespace}_*"):
+            self.redis_conn.delete(key)
+
+    def fit(self, pipeline, X=None):
+        X = self.X if X is None else X
+        return set_step_cache(pipeline, self.step_cache).fit(X, self.y)
+
+    def test_same_data_and_parameters_hit(self):
+        first = self.fit(make_pipeline())
+        second = self.fit(make_pipeline())
+
+        assert CountingScaler.fits == 1
+        assert np.allclose(first.predict(self.X), second.predict(self.X))
+        assert np.allclose(second.named_steps["scaler"].mean_,
+                           self.X.mean())
+
+    def test_different_data_miss(self):
+        self.fit(make_pipeline())
+        self.fit(make_pipeline(), self.X * 2)
+
+        assert CountingScaler.fits == 2
+
+    def test_different_parameters_miss(self):
+        self.fit(make_pipeline(with_mean=True))
+        self.fit(make_pipeline(with_mean=False))
+
+        assert CountingScaler.fits == 2
+
+    def test_pickles_without_the_connection(self):
+        pipeline = set_step_cache(make_pipeline(), self.step_cache)
+
+        copy = dill.loads(dill.dumps(pipeline))
+
+        assert repr(copy.memory) == repr(self.step_cache)
+        copy.fit(self.X, self.y)
+        self.fit(make_pipeline())
+        assert CountingScaler.fits == 1
+
+    def test_removed_before_storing(self):
+        pipeline = Pipeline([
+            ("union", FeatureUnion([
+                ("first", Pipeline([("scaler", CountingScaler())])),
+                ("second", Pipeline([("scaler", StandardScaler())])),
+            ])),
+            ("model", LinearRegression()),
+        ])
+        self.fit(pipeline)
+
+        set_step_cache(pipeline, None)
+
+        nested = [value for value in pipeline.get_params(deep=True).values()
+                  if isinstance(value, Pipeline)]
+        assert len(nested) == 2
+        assert all(p.memory is None for p in [pipeline] + nested)
+        assert b"StepCache" not in dill.dumps(pipeline)
@@ -0,0 +1,173 @@
+import sys
+import os
+import warnings
+from sklearn.cluster import MiniBatchKMeans, KMeans
+from sklearn.datasets import make_classification, make_regression
+from sklearn.linear_model import SGDRegressor, SGDClassifier
+from sklearn.naive_bayes import GaussianNB, MultinomialNB
+from sklearn.preprocessing import StandardScaler
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling.models.streaming import ClippedMinMaxScaler
+from modeling.models.streaming import supports_partial_fit
+from modeling.models.streaming import incremental_preprocessing
+from modeling.models.streaming import holdout_mask, stream_fit
+
+
+def chunk_reader(df, chunk_size=500):
+    """
+    Create a `read_chunks` for `stream_fit`, like `iter_dataset_chunks`.
+    """
+
+    def read_chunks(random_state):
+        order = np.arange(0, len(df), chunk_size)
+        if random_state is not None:
+            order = np.random.RandomState(random_state).permutation(order)
+
+        for start in order:
+            yield df.iloc[start:start + chunk_size]
+
+    return read_chunks
+
+
+def classification_data(n_samples=3000):
+    X, y = make_classification(n_samples=n_samples, n_features=4,
+                               n_informative=3, n_redundant=0,
+                               n_clusters_per_class=1, class_sep=2,
+                               random_state=0)
+    df = pd.DataFrame(X, columns=list("abcd"))
+    df["y"] = np.array(["no", "yes"])[y]
+    return df
+
+
+def regression_data(n_samples=3000):
+    X, y = make_regression(n_samples=n_samples, n_features=4, noise=1,
+                           random_state=0)
+    df = pd.DataFrame(X, columns=list("abcd"))
+    df["y"] = y
+    return df
+
+
+class TestPreprocessing:
+
+    def test_supports_partial_fit(self):
+        assert supports_partial_fit(SGDRegressor())
+        assert supports_partial_fit(MultinomialNB)
+        assert not supports_partial_fit(KMeans())
+
+    def test_scalers(self):
+        assert isinstance(incremental_preprocessing(SGDClassifier()),
+                          StandardScaler)
+        assert isinstance(incremental_preprocessing(MultinomialNB()),
+                          ClippedMinMaxScaler)
+        assert incremental_preprocessing(GaussianNB()) is None
+
+    def test_clipped_scaler_is_non_negative(self):
+        scaler = ClippedMinMaxScaler()
+        scaler.partial_fit(np.array([[-2.], [0.]]))
+        scaler.partial_fit(np.array([[-1.], [2.]]))
+
+        scaled = scaler.transform(np.array([[-5.], [-2.], [0.], [2.], [9.]]))
+
+        assert np.allclose(scaled.ravel(), [0, 0, 0.5, 1, 1])
+
+
+class TestHoldoutMask:
+
+    df = pd.DataFrame({"a": np.arange(10000)})
+
+    def test_fraction(self):
+        assert abs(holdout_mask(self.df, 0.2).mean() - 0.2) < 0.02
+
+    def test_same_rows_in_any_order(self):
+        mask = pd.Series(holdout_mask(self.df), index=self.df.index)
+        shuffled = self.df.sample(frac=1, random_state=0)
+
+        assert np.array_equal(holdout_mask(shuffled),
+                              mask[shuffled.index].values)
+
+
+class TestStreamFit:
+
+    def test_regression(self):
+        df = regression_data()
+        progress = []
+
+        results = stream_fit(SGDRegressor(random_state=0),
+                             chunk_reader(df), list("abcd"), "y",
+                             "regression", n_epochs=3,
+                             progress=progress.append)
+
+        folds = results["folds"]
+        assert len(folds) == 1
+        assert folds["R2"][0] > 0.99
+        assert folds["n_train"][0] + folds["n_test"][0] == len(df)
+        assert len(results["predictions"]) == len(results["y_true"])
+        assert np.allclose(progress, [0.2, 0.4, 0.6, 0.8, 1])
+
+        # The held out rows are those of `holdout_mask`
+        assert np.allclose(results["y_true"], df["y"][holdout_mask(df)])
+
+    def test_classification(self):
+        df = classification_data()
+
+        results = stream_fit(SGDClassifier(random_state=0),
+                             chunk_reader(df), list("abcd"), "y",
+                             "classification", n_epochs=2)
+
+        assert list(results["classes"]) == ["no", "yes"]
+        assert results["folds"]["Accuracy"][0] > 0.9
+        assert set(results["predictions"]) <= {"no", "yes"}
+
+    def test_multinomial_nb_with_negative_values(self):
+        df = classification_data()
+        assert (df[list("abcd")] < 0).any().all()
+
+        results = stream_fit(MultinomialNB(), chunk_reader(df),
+                             list("abcd"), "y", "classification")
+
+        assert results["folds"]["Accuracy"][0] > 0.6
+
+        # The exported pipeline predicts unseen extremes too
+        model = results["estimator"]
+        assert len(model.predict(df[list("abcd")].values * 10)) == len(df)
+
+    def test_clustering(self):
+        df = regression_data()
+
+        results = stream_fit(MiniBatchKMeans(n_clusters=3, random_state=0),
+                             chunk_reader(df), list("abcd"), None,
+                             "clustering")
+
+        assert results["y_true"] is None
+        assert results["classes"] is None
+        assert set(results["predictions"]) <= {0, 1, 2}
+
+    def test_missing_values_are_dropped(self):
+        df = regression_data()
+        df.loc[::10, "a"] = np.nan
+
+        results = stream_fit(SGDRegressor(random_state=0),
+                             chunk_reader(df), list("abcd"), "y",
+                             "regression")
+
+        folds = results["folds"]
+        assert folds["n_train"][0] + folds["n_test"][0] == \
+            df["a"].notna().sum()
+
+    def test_empty_holdout(self):
+        df = regression_data()
+
+        results = stream_fit(SGDRegressor(random_state=0),
+                             chunk_reader(df), list("abcd"), "y",
+                             "regression", test_size=0)
+
+        folds = results["folds"]
+        assert folds["n_train"][0] == len(df)
+        assert folds["n_test"][0] == 0
+        assert folds[["R2", "MSE", "MAE"]].isna().values.all()
+        assert len(results["predictions"]) == len(results["y_true"]) == 0
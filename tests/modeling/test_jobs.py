@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+import warnings
+from redis import Redis
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from modeling import jobs
+
+
+class TestPopJob:
+
+    queue_key = "test_jobs_queue"
+    running_key = "test_jobs_running"
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+
+    def setup_method(self):
+        self.original = (jobs.queue_key, jobs.running_key)
+        jobs.queue_key, jobs.running_key = self.queue_key, self.running_key
+        self.redis_conn.rpush(self.queue_key, "a", "b", "c")
+
+    def teardown_method(self):
+        jobs.queue_key, jobs.running_key = self.original
+        self.redis_conn.delete(self.queue_key, self.running_key)
+
+    def test_limit(self):
+        assert jobs._pop_job(limit=2) == ("a", 1)
+        assert jobs._pop_job(limit=2) == ("b", 2)
+        assert jobs._pop_job(limit=2) is None
+
+        # Finished jobs free their slot
+        self.redis_conn.zrem(self.running_key, "a")
+        assert jobs._pop_job(limit=2) == ("c", 2)
+
+    def test_empty_queue(self):
+        self.redis_conn.delete(self.queue_key)
+
+        assert jobs._pop_job(limit=2) is None
+        assert self.redis_conn.zcard(self.running_key) == 0
+
+    def test_expired_leases_free_their_slot(self):
+        assert jobs._pop_job(limit=1) == ("a", 1)
+
+        # e.g. the worker running "a" died
+        self.redis_conn.zadd(self.running_key, {"a": time.time() - 1})
+
+        assert jobs._pop_job(limit=1) == ("b", 1)
+        assert self.redis_conn.zrange(self.running_key, 0, -1) == [b"b"]
@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from serving.batching import MicroBatcher
+
+
+class Model:
+    """
+    Predicts twice the "a" column, and fails on negative values.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, rows):
+        self.calls.append(rows)
+        if (rows["a"] < 0).any():
+            raise ValueError("Negative values")
+        return rows["a"].values * 2
+
+
+def predict_concurrently(batcher, model, parts):
+    """
+    Send every part as a request of its own, all at the same time.
+
+    Returns:
+        list: The predictions, or the exception, of every request.
+    """
+
+    def request(rows):
+        try:
+            return batcher.predict("model", model, rows)
+        except Exception as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=len(parts)) as clients:
+        return list(clients.map(request, parts))
+
+
+def rows(*values):
+    return pd.DataFrame({"a": values, "b": ["x"] * len(values)})
+
+
+class TestMicroBatcher:
+
+    def test_single_request(self):
+        model = Model()
+        batcher = MicroBatcher(max_wait=0.001)
+
+        predictions = batcher.predict("model", model, rows(1, 2))
+
+        assert list(predictions) == [2, 4]
+        assert len(model.calls) == 1
+
+    def test_results_are_sliced_per_request(self):
+        model = Model()
+        parts = [rows(1), rows(2, 3), rows(4, 5, 6)]
+        # The batch closes as soon as all the requests joined it
+        batcher = MicroBatcher(max_batch_size=6, max_wait=5)
+
+        results = predict_concurrently(batcher, model, parts)
+
+        assert [list(result) for result in results] == \
+            [[2], [4, 6], [8, 10, 12]]
+        assert len(model.calls) == 1
+        assert sorted(model.calls[0]["a"]) == [1, 2, 3, 4, 5, 6]
+
+    def test_full_batch_does_not_wait(self):
+        model = Model()
+        batcher = MicroBatcher(max_batch_size=4, max_wait=30)
+
+        start = time.time()
+        results = predict_concurrently(batcher, model,
+                                       [rows(i) for i in range(4)])
+
+        assert time.time() - start < 5
+        assert [list(result) for result in results] == [[0], [2], [4], [6]]
+        assert len(model.calls) == 1
+
+    def test_bad_rows_only_fail_their_request(self):
+        model = Model()
+        parts = [rows(1), rows(-1), rows(2, 3)]
+        batcher = MicroBatcher(max_batch_size=4, max_wait=5)
+
+        results = predict_concurrently(batcher, model, parts)
+
+        assert isinstance(results[1], ValueError)
+        assert list(results[0]) == [2]
+        assert list(results[2]) == [4, 6]
+        # The batch, then every request on its own
+        assert len(model.calls) == 1 + len(parts)
+
+    def test_different_dtypes_are_not_batched_together(self):
+        model = Model()
+        parts = [rows(1), rows(2.5), rows(3), rows(4.5)]
+        batcher = MicroBatcher(max_batch_size=4, max_wait=5)
+
+        results = predict_concurrently(batcher, model, parts)
+
+        assert [list(result) for result in results] == [[2], [5], [6], [9]]
+        assert len(model.calls) == 2
+        assert sorted(str(call["a"].dtype) for call in model.calls) == \
+            ["float64", "int64"]
+
+    def test_keys_are_batched_separately(self):
+        model = Model()
+        batcher = MicroBatcher(max_batch_size=2, max_wait=0.05)
+
+        with ThreadPoolExecutor(max_workers=2) as clients:
+            first = clients.submit(batcher.predict, "first", model, rows(1))
+            second = clients.submit(batcher.predict, "second", model,
+                                    rows(2))
+
+        assert list(first.result()) == [2]
+        assert list(second.result()) == [4]
+        assert len(model.calls) == 2
+
+    def test_errors_of_single_requests_are_raised(self):
+        batcher = MicroBatcher(max_wait=0.001)
+
+        with pytest.raises(ValueError):
+            batcher.predict("model", Model(), rows(-1))
+
+        assert batcher._open == {}
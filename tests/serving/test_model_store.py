@@ -0,0 +1,125 @@
+import sys
+import os
+import warnings
+from redis import Redis
+from sklearn.linear_model import LinearRegression
+import numpy as np
+import dill
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from serving.model_store import ModelStore, get_model_version
+
+
+def store_model(redis_conn, user_id, name, model, params=None,
+                version=True, ex=None):
+    data = dill.dumps(model)
+    redis_conn.set(f"{user_id}_trainedModel_{name}", data, ex=ex)
+    redis_conn.set(f"{user_id}_trainedModelParams_{name}",
+                   dill.dumps(params or {}), ex=ex)
+    if version:
+        redis_conn.set(f"{user_id}_trainedModelVersion_{name}",
+                       str(hash(data)), ex=ex)
+
+    return len(data)
+
+
+class TestModelStore:
+
+    user_id = "test_model_store"
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+
+    def teardown_method(self):
+        for key in self.redis_conn.keys(f"{self.user_id}_*"):
+            self.redis_conn.delete(key)
+
+    def model(self, intercept):
+        return LinearRegression().fit(np.zeros((2, 1)), [intercept] * 2)
+
+    def test_version(self):
+        assert get_model_version(self.user_id, "m", self.redis_conn) is None
+
+        store_model(self.redis_conn, self.user_id, "m", self.model(1))
+        version = get_model_version(self.user_id, "m", self.redis_conn)
+        assert version == self.redis_conn.get(
+            f"{self.user_id}_trainedModelVersion_m").decode()
+
+    def test_version_of_models_without_one(self):
+        store_model(self.redis_conn, self.user_id, "m", self.model(1),
+                    version=False, ex=100)
+
+        version = get_model_version(self.user_id, "m", self.redis_conn)
+
+        # Stored, and expiring along with the model
+        version_key = f"{self.user_id}_trainedModelVersion_m"
+        assert self.redis_conn.get(version_key).decode() == version
+        assert 0 < self.redis_conn.ttl(version_key) <= 100
+        assert get_model_version(self.user_id, "m", self.redis_conn) == \
+            version
+
+    def test_get(self):
+        store = ModelStore(self.redis_conn)
+        assert store.get(self.user_id, "m") is None
+
+        store_model(self.redis_conn, self.user_id, "m", self.model(1),
+                    params={"columns": ["a"]})
+        model, params = store.get(self.user_id, "m")
+
+        assert params == {"columns": ["a"]}
+        assert model.predict([[0]])[0] == 1
+
+        # The same object until the model changes
+        assert store.get(self.user_id, "m")[0] is model
+
+    def test_reloads_retrained_models(self):
+        store = ModelStore(self.redis_conn)
+        store_model(self.redis_conn, self.user_id, "m", self.model(1))
+        first, _ = store.get(self.user_id, "m")
+
+        store_model(self.redis_conn, self.user_id, "m", self.model(2))
+        second, _ = store.get(self.user_id, "m")
+
+        assert second is not first
+        assert second.predict([[0]])[0] == 2
+        assert len(store) == 1
+
+    def test_drops_deleted_models(self):
+        store = ModelStore(self.redis_conn)
+        store_model(self.redis_conn, self.user_id, "m", self.model(1))
+        store.get(self.user_id, "m")
+
+        for kind in ["trainedModel", "trainedModelVersion"]:
+            self.redis_conn.delete(f"{self.user_id}_{kind}_m")
+
+        assert store.get(self.user_id, "m") is None
+        assert len(store) == 0
+        assert store._total == 0
+
+    def test_evicts_least_recently_used(self):
+        size = store_model(self.redis_conn, self.user_id, "a", self.model(1))
+        store_model(self.redis_conn, self.user_id, "b", self.model(2))
+        store_model(self.redis_conn, self.user_id, "c", self.model(3))
+        store = ModelStore(self.redis_conn, max_bytes=int(2.5 * size))
+
+        store.get(self.user_id, "a")
+        store.get(self.user_id, "b")
+        # Using "a" makes "b" the least recently used
+        first_a, _ = store.get(self.user_id, "a")
+        store.get(self.user_id, "c")
+
+        assert len(store) == 2
+        assert store._total <= store.max_bytes
+        assert set(store._models) == {(self.user_id, "a"),
+                                      (self.user_id, "c")}
+        assert store.get(self.user_id, "a")[0] is first_a
+
+    def test_keeps_models_larger_than_budget(self):
+        store_model(self.redis_conn, self.user_id, "a", self.model(1))
+        store = ModelStore(self.redis_conn, max_bytes=1)
+
+        assert store.get(self.user_id, "a") is not None
+        assert len(store) == 1
@@ -0,0 +1,249 @@
+import sys
+import os
+import json
+import warnings
+from redis import Redis
+from sklearn.linear_model import LogisticRegression
+import pandas as pd
+import numpy as np
+import pytest
+import dill
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from serving import routes
+from serving.routes import parse_batch
+from serving.app import app
+from modeling.models.evaluation import encode_target
+
+
+class User:
+    """
+    Stands in for `models.User`, so that no user database is needed.
+    """
+
+    tokens = {}
+
+    def __init__(self, username, api_token, verified_email=True):
+        self.username = username
+        self.api_token = api_token
+        self.verified_email = verified_email
+        User.tokens[api_token] = self
+
+    class query:
+
+        @staticmethod
+        def filter_by(api_token):
+            user = User.tokens.get(api_token)
+            return type("Result", (), {"first": lambda self: user})()
+
+
+class Ratio:
+    """
+    A regressor that predicts a / b, i.e. NaN or infinity where b is 0.
+    """
+
+    def predict(self, rows):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return rows["a"].values / rows["b"].values
+
+
+class TestParseBatch:
+
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+
+    def test_json_records(self):
+        body = self.df.to_json(orient="records").encode()
+
+        pd.testing.assert_frame_equal(parse_batch("application/json", body),
+                                      self.df)
+
+    def test_json_columns(self):
+        body = json.dumps({"a": [1, 2], "b": ["x", "y"]}).encode()
+
+        pd.testing.assert_frame_equal(parse_batch("application/json", body),
+                                      self.df)
+
+    def test_json_single_record(self):
+        body = json.dumps({"a": 1, "b": "x"}).encode()
+
+        pd.testing.assert_frame_equal(parse_batch("application/json", body),
+                                      self.df.iloc[:1])
+
+    def test_csv(self):
+        body = self.df.to_csv(index=False).encode()
+
+        pd.testing.assert_frame_equal(parse_batch("text/csv", body), self.df)
+
+    def test_arrow(self):
+        pa = pytest.importorskip("pyarrow")
+
+        table = pa.Table.from_pandas(self.df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        writer = pa.ipc.new_stream(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+
+        for content_type in ["application/vnd.apache.arrow.stream",
+                             "application/octet-stream"]:
+            parsed = parse_batch(content_type, sink.getvalue().to_pybytes())
+            pd.testing.assert_frame_equal(parsed, self.df)
+
+    def test_arrow_without_pyarrow(self):
+        pyarrow = sys.modules.get("pyarrow")
+        sys.modules["pyarrow"] = None  # makes importing it fail
+        try:
+            with pytest.raises(ValueError, match="^Unsupported"):
+                parse_batch("application/vnd.apache.arrow.stream", b"")
+        finally:
+            if pyarrow is None:
+                del sys.modules["pyarrow"]
+            else:
+                sys.modules["pyarrow"] = pyarrow
+
+    def test_unsupported_content_type(self):
+        with pytest.raises(ValueError, match="^Unsupported"):
+            parse_batch("application/xml", b"<rows/>")
+
+
+class TestEndpoints:
+
+    user_id = "test_serving_user"
+    token = "test-serving-token"
+
+    X = pd.DataFrame({"a": np.arange(20.), "b": np.arange(20.) % 3})
+    y = np.array(["low"] * 10 + ["high"] * 10)
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+        cls.client = app.test_client()
+
+        cls.user = routes.User
+        routes.User = User
+        User(cls.user_id, cls.token)
+        User("unverified", "unverified-token", verified_email=False)
+
+        classes, codes = ["low", "high"], (cls.y == "high").astype(int)
+        model = LogisticRegression(solver="lbfgs").fit(cls.X, codes)
+        cls.redis_conn.set(f"{cls.user_id}_trainedModel_clf",
+                           dill.dumps(model))
+        cls.redis_conn.set(f"{cls.user_id}_trainedModelParams_clf",
+                           dill.dumps({"xvars": ["a", "b"], "yvars": "y",
+                                       "columns": ["a", "b"],
+                                       "classes": classes}),
+                           ex=3600)
+
+        cls.redis_conn.set(f"{cls.user_id}_trainedModel_ratio",
+                           dill.dumps(Ratio()))
+        cls.redis_conn.set(f"{cls.user_id}_trainedModelParams_ratio",
+                           dill.dumps({"xvars": ["a", "b"], "yvars": "y",
+                                       "columns": ["a", "b"],
+                                       "classes": None}),
+                           ex=3600)
+
+        # Trained like `train_pipeline`, with some targets missing
+        y = pd.Series(cls.y).where(np.arange(20) % 4 != 0)
+        X, codes, classes = encode_target(cls.X, y)
+        model = LogisticRegression(solver="lbfgs").fit(X, codes)
+        cls.redis_conn.set(f"{cls.user_id}_trainedModel_missing_y",
+                           dill.dumps(model))
+        cls.redis_conn.set(f"{cls.user_id}_trainedModelParams_missing_y",
+                           dill.dumps({"xvars": ["a", "b"], "yvars": "y",
+                                       "columns": ["a", "b"],
+                                       "classes": classes}),
+                           ex=3600)
+
+    @classmethod
+    def teardown_class(cls):
+        routes.User = cls.user
+        for key in cls.redis_conn.keys(f"{cls.user_id}_*"):
+            cls.redis_conn.delete(key)
+
+    def headers(self, token=None):
+        return {"Authorization": f"Bearer {token or self.token}"}
+
+    def predict(self, body, content_type="application/json", name="clf"):
+        return self.client.post(f"/models/{name}/predict/", data=body,
+                                headers=self.headers(),
+                                content_type=content_type)
+
+    def test_missing_token(self):
+        response = self.client.get("/models/")
+
+        assert response.status_code == 401
+        assert response.get_json() == {"error": "Missing API token."}
+
+    def test_invalid_tokens(self):
+        for token in ["not-a-token", "unverified-token"]:
+            response = self.client.get("/models/",
+                                       headers=self.headers(token))
+
+            assert response.status_code == 401
+            assert response.get_json() == {"error": "Invalid API token."}
+
+    def test_token_as_query_parameter(self):
+        response = self.client.get(f"/models/?api_token={self.token}")
+
+        assert response.status_code == 200
+
+    def test_list_models(self):
+        response = self.client.get("/models/", headers=self.headers())
+
+        models = sorted(response.get_json(), key=lambda m: m["name"])
+        assert models == [{"name": name,
+                           "columns": ["a", "b"],
+                           "target": "y",
+                           "persistent": True}
+                          for name in ["clf", "missing_y", "ratio"]]
+
+    def test_predict(self):
+        rows = self.X.iloc[[0, 19]].assign(extra=1)
+
+        response = self.predict(rows.to_json(orient="records"))
+
+        assert response.status_code == 200
+        assert response.get_json() == {"model": "clf",
+                                       "predictions": ["low", "high"]}
+
+    def test_predict_with_missing_training_targets(self):
+        rows = self.X.iloc[[1, 18]]
+
+        response = self.predict(rows.to_json(orient="records"),
+                                name="missing_y")
+
+        assert response.get_json()["predictions"] == ["low", "high"]
+
+    def test_predict_non_finite_values(self):
+        rows = pd.DataFrame({"a": [1., 0., 1.], "b": [2., 0., 0.]})
+
+        response = self.predict(rows.to_json(orient="records"), name="ratio")
+
+        assert response.status_code == 200
+        # Parsed strictly, i.e. without NaN or Infinity
+        assert json.loads(response.get_data(as_text=True),
+                          parse_constant=lambda c: pytest.fail(c)) == \
+            {"model": "ratio", "predictions": [0.5, None, None]}
+
+    def test_predict_csv_in_other_order(self):
+        rows = self.X.iloc[[19, 0]][["b", "a"]]
+
+        response = self.predict(rows.to_csv(index=False), "text/csv")
+
+        assert response.get_json()["predictions"] == ["high", "low"]
+
+    def test_unknown_model(self):
+        assert self.predict("[]", name="missing").status_code == 404
+
+    def test_unsupported_content_type(self):
+        assert self.predict("<rows/>", "application/xml").status_code == 415
+
+    def test_unreadable_body(self):
+        assert self.predict("{not json").status_code == 400
+
+    def test_missing_columns(self):
+        response = self.predict(json.dumps([{"a": 1}]))
+
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Missing columns: ['b']"}
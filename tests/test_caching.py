@@ -0,0 +1,111 @@
+import sys
+import os
+import time
+import warnings
+from redis import Redis
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from caching import RedisLRUCache, make_key
+
+
+class TestMakeKey:
+
+    def test_stable_and_order_independent(self):
+        assert make_key("a", {"x": 1, "y": 2}) == \
+            make_key("a", {"y": 2, "x": 1})
+
+    def test_different_parts(self):
+        assert make_key("a", [1, 2]) != make_key("a", [2, 1])
+        assert make_key("a", 1) != make_key("b", 1)
+
+    def test_non_json_parts(self):
+        assert make_key(object) == make_key(object)
+
+
+class TestRedisLRUCache:
+
+    namespace = "test_caching"
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+
+    def teardown_method(self):
+        for key in self.redis_conn.keys(f"cache_{self.namespace}_*"):
+            self.redis_conn.delete(key)
+
+    def make_cache(self, **kwargs):
+        return RedisLRUCache(self.redis_conn, self.namespace, **kwargs)
+
+    def test_get_and_set(self):
+        cache = self.make_cache()
+
+        assert cache.get("missing") is None
+        assert cache.get("missing", 5) == 5
+
+        assert cache.set("key", {"a": [1, 2]})
+        assert cache.get("key") == {"a": [1, 2]}
+
+    def test_cached_none_is_a_hit(self):
+        cache = self.make_cache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return None
+
+        assert cache.get_or_compute("key", compute) is None
+        assert cache.get_or_compute("key", compute) is None
+        assert len(calls) == 1
+
+    def test_get_or_compute_passes_arguments(self):
+        cache = self.make_cache()
+
+        assert cache.get_or_compute("key", pow, 2, 10) == 1024
+        assert cache.get_or_compute("key", pow, 3, 10) == 1024
+
+    def test_evicts_least_recently_used(self):
+        value = "x" * 1000
+        cache = self.make_cache(max_bytes=2500)
+
+        cache.set("a", value)
+        time.sleep(0.01)
+        cache.set("b", value)
+        time.sleep(0.01)
+
+        # Using "a" makes "b" the least recently used
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", value)
+
+        assert cache.get("a") == value
+        assert cache.get("b") is None
+        assert cache.get("c") == value
+        assert int(self.redis_conn.get(cache._total_key)) <= 2500
+
+    def test_values_larger_than_budget_are_not_cached(self):
+        cache = self.make_cache(max_bytes=100)
+
+        assert not cache.set("key", "x" * 1000)
+        assert cache.get("key") is None
+
+    def test_overwriting_counts_size_once(self):
+        cache = self.make_cache()
+
+        cache.set("key", "x" * 1000)
+        total = int(self.redis_conn.get(cache._total_key))
+        cache.set("key", "x" * 1000)
+
+        assert int(self.redis_conn.get(cache._total_key)) == total
+
+    def test_expired_entries_leave_the_index(self):
+        cache = self.make_cache()
+
+        cache.set("key", "value")
+        self.redis_conn.delete(cache._entry_key("key"))
+
+        assert cache.get("key") is None
+        assert self.redis_conn.zcard(cache._index_key) == 0
+        assert int(self.redis_conn.get(cache._total_key)) == 0
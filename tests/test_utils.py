@@ -6,12 +6,14 @@ import warnings
 import numpy as np
 import pandas as pd
 import dill
-from redis import Redis
 
 sys.path.insert(0, os.path.abspath("../EDA_miner"))
 warnings.filterwarnings("ignore")
 
+import utils
 from utils import cleanup, hard_cast_to_float
+from utils import save_dataset, iter_dataset_chunks
+from caching import RedisLRUCache
 
 
 class TestCleanup(RedisTest):
@@ -25,6 +27,25 @@ class TestCleanup(RedisTest):
         # Correctly saves data to a pickle
         assert os.path.exists("redisData.pkl")
 
+    def test_cleanup_other_types(self):
+        cache = RedisLRUCache(self.redis_conn, "test_cleanup", ex=3600)
+        cache.set("key", [1, 2, 3])
+        self.redis_conn.rpush("mylist", "a", "b")
+        cleanup(self.redis_conn)
+
+        assert self.redis_conn.keys("*") == []
+
+        # Everything can be restored as it was
+        with open("redisData.pkl", "rb") as f:
+            redis_data = dill.load(f)
+        for k, (dumped, ttl) in redis_data.items():
+            self.redis_conn.restore(k, ttl, dumped)
+
+        assert cache.get("key") == [1, 2, 3]
+        assert 0 < self.redis_conn.ttl(cache._entry_key("key")) <= 3600
+        assert self.redis_conn.zcard("cache_test_cleanup_index") == 1
+        assert self.redis_conn.lrange("mylist", 0, -1) == [b"a", b"b"]
+
 
 # TODO: properly do set up / tear down & split function & rename
 class TestGetData(RedisTest):
@@ -58,3 +79,85 @@ class TestHardCast:
         assert isinstance(hard_cast_to_float(3.31).item(), float)
         assert isinstance(hard_cast_to_float("3").item(), float)
         assert isinstance(hard_cast_to_float("x"), float)
+
+
+class TestDatasetChunks(RedisTest):
+
+    key = "userid_data_userdata_chunked"
+    df = pd.DataFrame({"a": np.arange(95), "b": np.arange(95) * 2.},
+                      index=np.arange(95) + 1000)
+
+    def setup_method(self):
+        # Small chunks, so that small data are chunked
+        self.chunk_rows = utils.chunk_rows
+        utils.chunk_rows = 10
+
+    def teardown_method(self):
+        utils.chunk_rows = self.chunk_rows
+        for kind in ["data", "version", "chunks"]:
+            self.redis_conn.delete(self.key.replace("_data_", f"_{kind}_"))
+
+    def test_save_dataset(self):
+        assert save_dataset(self.key, self.df, self.redis_conn,
+                            redis_kwargs={"ex": 100})
+
+        chunks_key = self.key.replace("_data_", "_chunks_")
+        assert self.redis_conn.llen(chunks_key) == 10
+        for kind in ["data", "version", "chunks"]:
+            ttl = self.redis_conn.ttl(self.key.replace("_data_", f"_{kind}_"))
+            assert 0 < ttl <= 100
+
+        pd.testing.assert_frame_equal(
+            dill.loads(self.redis_conn.get(self.key)), self.df)
+
+    def test_small_data_are_not_chunked(self):
+        save_dataset(self.key, self.df, self.redis_conn)
+        utils.chunk_rows = 100
+        save_dataset(self.key, self.df, self.redis_conn)
+
+        chunks_key = self.key.replace("_data_", "_chunks_")
+        assert self.redis_conn.llen(chunks_key) == 0
+
+    def test_stored_order(self):
+        save_dataset(self.key, self.df, self.redis_conn)
+
+        chunks = list(iter_dataset_chunks(self.key, self.redis_conn))
+
+        assert [len(chunk) for chunk in chunks] == [10] * 9 + [5]
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.df)
+
+    def test_columns(self):
+        save_dataset(self.key, self.df, self.redis_conn)
+
+        chunks = iter_dataset_chunks(self.key, self.redis_conn,
+                                     columns=["b"])
+
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.df[["b"]])
+
+    def test_shuffled(self):
+        save_dataset(self.key, self.df, self.redis_conn)
+
+        first = pd.concat(iter_dataset_chunks(self.key, self.redis_conn,
+                                              random_state=0))
+        second = pd.concat(iter_dataset_chunks(self.key, self.redis_conn,
+                                               random_state=0))
+        other = pd.concat(iter_dataset_chunks(self.key, self.redis_conn,
+                                              random_state=1))
+
+        # Every row once, with its index, in a reproducible order
+        pd.testing.assert_frame_equal(first.sort_index(), self.df)
+        pd.testing.assert_frame_equal(first, second)
+        assert not first.index.equals(self.df.index)
+        assert not first.index.equals(other.index)
+
+    def test_without_chunks(self):
+        # e.g. datasets stored before chunking
+        self.redis_conn.set(self.key, dill.dumps(self.df))
+
+        chunks = list(iter_dataset_chunks(self.key, self.redis_conn))
+        assert len(chunks) == 10
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.df)
+
+        shuffled = pd.concat(iter_dataset_chunks(self.key, self.redis_conn,
+                                                 random_state=0))
+        pd.testing.assert_frame_equal(shuffled.sort_index(), self.df)
@@ -0,0 +1,64 @@
+import sys
+import os
+import warnings
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from visualization.graphs.aggregation import category_counts
+from visualization.graphs.aggregation import category_aggregate
+
+data_folder = os.path.abspath("../example_data")
+
+
+class TestCategoryCounts:
+
+    def test_counts_align_with_labels(self):
+        series = pd.Series(["b", "a", "b", "c", "b", "a"])
+
+        counts = category_counts(series)
+
+        assert counts["b"] == 3
+        assert counts["a"] == 2
+        assert counts["c"] == 1
+        assert list(counts.index) == ["b", "a", "c"]
+
+    def test_top_k_with_other(self):
+        df = pd.read_csv(os.path.join(data_folder, "gtd_11to14_0615dist.csv"))
+
+        counts = category_counts(df["country_txt"], k=10)
+
+        assert len(counts) == 11
+        assert counts.index[-1] == "Other"
+        assert counts.sum() == df["country_txt"].notna().sum()
+
+    def test_other_label_does_not_clash(self):
+        series = pd.Series(["Other"] * 3 + ["a"] * 2 + ["b"])
+
+        counts = category_counts(series, k=1)
+
+        assert counts["Other"] == 3
+        assert counts["Other (rest)"] == 3
+
+
+class TestCategoryAggregate:
+
+    def test_mean_with_other(self):
+        keys = pd.Series(["a", "a", "b", "c", "c", "c"])
+        values = pd.Series([1, 3, 10, 2, 2, 2])
+
+        means = category_aggregate(keys, values, how="mean", k=2)
+
+        assert means["c"] == 2
+        assert means["a"] == 2
+        assert means["Other"] == 10
+
+    def test_non_numeric_values_are_ignored(self):
+        keys = pd.Series(["a", "a", "b"])
+        values = pd.Series(["1", "x", "5"])
+
+        sums = category_aggregate(keys, values, how="sum")
+
+        assert sums["a"] == 1
+        assert sums["b"] == 5
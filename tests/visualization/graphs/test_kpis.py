@@ -0,0 +1,79 @@
+import sys
+import os
+import warnings
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from visualization.graphs.kpis import _als_baseline
+from visualization.graphs.kpis import baseline, baselines, update_baseline
+
+
+def reference_als(y, lam=10, p=0.002, niter=10):
+    L = len(y)
+    D = sparse.diags([1, -2, 1], [0, -1, -2], shape=(L, L-2))
+    w = np.ones(L)
+    for i in range(niter):
+        W = sparse.spdiags(w, 0, L, L)
+        Z = W + lam * D.dot(D.transpose())
+        z = spsolve(Z, w*y)
+        w = p * (y > z) + (1-p) * (y < z)
+    return z
+
+
+class TestALSBaseline:
+
+    rng = np.random.RandomState(0)
+    values = rng.rand(200, 3).cumsum(0) + 5 * rng.rand(200, 3)
+
+    def test_matches_sparse_solver(self):
+        y = self.values[:, 0]
+
+        assert np.allclose(_als_baseline(y), reference_als(y))
+
+    def test_batched_matches_single(self):
+        batched = _als_baseline(self.values)
+
+        for j in range(self.values.shape[1]):
+            assert np.allclose(batched[:, j],
+                               _als_baseline(self.values[:, j]))
+
+    def test_baselines_match_baseline(self):
+        batched = baselines(self.values)
+
+        assert batched.shape == self.values.shape
+        for j in range(self.values.shape[1]):
+            assert np.allclose(batched[:, j], baseline(self.values[:, j]))
+
+
+class TestUpdateBaseline:
+
+    rng = np.random.RandomState(1)
+    values = rng.rand(1000).cumsum() + 5 * rng.rand(1000)
+
+    def test_unchanged_series_is_reused(self):
+        record = update_baseline(self.values)
+
+        assert update_baseline(self.values, record) is record
+
+    def test_appended_rows_only_change_the_tail(self):
+        record = update_baseline(self.values[:950], window=100)
+        updated = update_baseline(self.values, record, window=100)
+
+        assert len(updated["baseline"]) == len(self.values)
+        assert np.array_equal(updated["baseline"][:900],
+                              record["baseline"][:900])
+        assert np.allclose(updated["baseline"][950:],
+                           baseline(self.values[900:])[50:])
+
+    def test_changed_history_is_recomputed(self):
+        record = update_baseline(self.values[:950])
+        changed = self.values.copy()
+        changed[0] += 1
+
+        updated = update_baseline(changed, record)
+
+        assert np.allclose(updated["baseline"], baseline(changed))
@@ -0,0 +1,122 @@
+import sys
+import os
+import warnings
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from visualization.graphs.maps import country2code, resolve_countries
+from visualization.graphs.maps import maplines
+from visualization.graphs.maps import bin_points, bin_size_for_view
+from visualization.graphs.aggregation import category_aggregate
+
+data_folder = os.path.abspath("../example_data")
+
+
+class TestResolveCountries:
+
+    def test_distinct_values_are_resolved_once(self):
+        series = pd.Series(["Germany", "DEU", "Germany", None, "Atlantis"])
+        calls = []
+
+        def resolve_many(values):
+            calls.append(values)
+            return [country2code(value) for value in values]
+
+        codes = resolve_countries(series, resolve_many)
+
+        assert calls == [["Germany", "DEU", "Atlantis"]]
+        assert list(codes[:3]) == ["DEU"] * 3
+        assert codes[3:].isna().all()
+
+    def test_matches_per_row_resolution(self):
+        df = pd.read_csv(os.path.join(data_folder, "gtd_11to14_0615dist.csv"))
+        df = df.sample(2000, random_state=0)
+
+        codes = resolve_countries(df["country_txt"])
+        expected = df["country_txt"].apply(country2code)
+
+        assert codes.isna().tolist() == expected.isna().tolist()
+        assert codes.dropna().tolist() == expected.dropna().tolist()
+
+    def test_aggregates_by_code(self):
+        series = pd.Series(["Germany", "DEU", "France"])
+        values = pd.Series([1, 2, 5])
+
+        sums = category_aggregate(resolve_countries(series), values)
+
+        assert sums["DEU"] == 3
+        assert sums["FRA"] == 5
+
+
+class TestMaplines:
+
+    def test_duplicate_routes_are_merged(self):
+        origin_lat = pd.Series([0, 0, 0, 10, None])
+        origin_lon = pd.Series([0, 0, 0, 10, 5])
+        dest_lat = pd.Series([1, 1, 1, 20, 5])
+        dest_lon = pd.Series([1, 1, 1, 20, 5])
+
+        traces = maplines(origin_lat, origin_lon, dest_lat, dest_lon)
+
+        assert len(traces) == 2
+        widths = sorted(trace.line.width for trace in traces)
+        assert widths[0] < widths[1]
+
+        # Each route is one segment: origin, destination, gap
+        assert sum(len(trace.lat) for trace in traces) == 2 * 3
+
+    def test_single_trace_for_unique_routes(self):
+        coords = pd.Series(range(1000)) / 20
+
+        traces = maplines(coords, coords, -coords, -coords)
+
+        assert len(traces) == 1
+        assert len(traces[0].lat) == 3 * 1000
+
+    def test_whole_dataset_is_drawn(self):
+        df = pd.read_csv(os.path.join(data_folder, "gtd_11to14_0615dist.csv"))
+        routes = df[["latitude", "longitude"]].dropna().drop_duplicates()
+
+        traces = maplines(df["latitude"], df["longitude"],
+                          df["latitude"] + 1, df["longitude"] + 1)
+
+        assert sum(len(trace.lat) for trace in traces) == 3 * len(routes)
+
+
+class TestBinPoints:
+
+    def test_counts_and_aggregates_per_bin(self):
+        lat = pd.Series([0.5, 1.5, 5, None])
+        lon = pd.Series([0.5, 1.5, 5, 0])
+        z = pd.Series([1, 3, 10, 100])
+
+        bins = bin_points(lat, lon, z, how="mean", bin_size=4)
+
+        assert sorted(bins["count"]) == [1, 2]
+        assert sorted(bins["value"]) == [2, 10]
+        assert sorted(bins["lat"]) == [2, 6]
+
+    def test_view_keeps_only_visible_points(self):
+        lat = pd.Series([0, 0, 0])
+        lon = pd.Series([179, -179, 90])
+
+        bins = bin_points(lat, lon, bin_size=1, view=(0, 180, 10, 10))
+
+        assert bins["count"].sum() == 2
+
+    def test_bins_shrink_when_zooming_in(self):
+        assert bin_size_for_view(1) == 4
+        assert bin_size_for_view(3) == 2
+        assert bin_size_for_view(8) == 0.5
+        assert bin_size_for_view(0.5) == 4
+
+    def test_bins_whole_dataset(self):
+        df = pd.read_csv(os.path.join(data_folder, "gtd_11to14_0615dist.csv"))
+
+        bins = bin_points(df["latitude"], df["longitude"])
+
+        assert bins["count"].sum() == df[["latitude", "longitude"]] \
+            .dropna().shape[0]
+        assert len(bins) < len(df) / 10
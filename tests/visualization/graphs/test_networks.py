@@ -0,0 +1,91 @@
+import sys
+import os
+import warnings
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from visualization.graphs.networks import edge_list, node_list
+from visualization.graphs.networks import prepare_network, cytoscape_elements
+from visualization.graphs.networks import compute_layout, server_layouts
+
+data_folder = os.path.abspath("../example_data")
+
+
+class TestEdgeList:
+
+    df = pd.DataFrame({"in": ["a", "a", "b", "c", None],
+                       "out": ["b", "b", "c", "a", "a"]})
+
+    def test_edges_are_deduplicated_and_weighted(self):
+        edges = edge_list(self.df, "in", "out")
+
+        assert len(edges) == 3
+        assert edges.set_index(["source", "target"])["weight"] \
+            .loc[("a", "b")] == 2
+
+    def test_degrees(self):
+        nodes = node_list(edge_list(self.df, "in", "out")).set_index("id")
+
+        assert nodes.loc["a", "degree"] == 2
+        assert nodes.loc["a", "weight"] == 3
+        assert nodes["weight"].sum() == 2 * 4
+
+
+class TestPrepareNetwork:
+
+    df = pd.read_csv(os.path.join(data_folder, "network.csv"))
+
+    def test_small_networks_are_kept(self):
+        nodes, edges = prepare_network(self.df.head(30),
+                                       "Incoming", "Outgoing")
+
+        assert (nodes["size"] == 1).all()
+        assert edges["weight"].sum() == 30
+
+    def test_large_networks_are_bounded(self):
+        n_nodes = len(node_list(edge_list(self.df, "Incoming", "Outgoing")))
+
+        nodes, edges = prepare_network(self.df, "Incoming", "Outgoing",
+                                       max_nodes=50, max_edges=100)
+
+        assert len(nodes) <= 50
+        assert len(edges) <= 100
+        assert nodes["size"].sum() == n_nodes
+        assert set(edges["source"]) | set(edges["target"]) <= \
+            set(nodes["id"])
+
+    def test_elements(self):
+        nodes, edges = prepare_network(self.df, "Incoming", "Outgoing")
+
+        elements = cytoscape_elements(nodes, edges)
+
+        assert len(elements) == len(nodes) + len(edges)
+        assert all("size" in element["data"]
+                   for element in elements[:len(nodes)])
+
+    def test_server_layouts(self):
+        nodes, edges = prepare_network(self.df, "Incoming", "Outgoing",
+                                       max_nodes=30)
+
+        for layout in server_layouts:
+            positions = compute_layout(nodes, edges, layout,
+                                       width=100, height=50)
+
+            assert set(positions) == set(nodes["id"])
+            assert all(0 <= position["x"] <= 100 and
+                       0 <= position["y"] <= 50
+                       for position in positions.values())
+
+            elements = cytoscape_elements(nodes, edges, positions)
+            assert "position" in elements[0]
+
+    def test_empty_network(self):
+        df = pd.DataFrame({"Incoming": [None, None],
+                           "Outgoing": [None, None]})
+        nodes, edges = prepare_network(df, "Incoming", "Outgoing")
+
+        assert len(nodes) == 0
+        assert compute_layout(nodes, edges, "spectral") == {}
+        assert cytoscape_elements(nodes, edges, {}) == []
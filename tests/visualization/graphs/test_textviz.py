@@ -0,0 +1,71 @@
+import sys
+import os
+import warnings
+import base64
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from visualization.graphs.textviz import create_wordcloud
+from visualization.graphs.textviz import count_words
+from visualization.graphs.textviz import wordcloud_from_frequencies
+
+data_folder = os.path.abspath("../example_data")
+
+
+class TestCreateWordcloud:
+
+    text = "data mining with dash and plotly, more data and more plots"
+
+    def test_returns_png_data_uri(self):
+        src = create_wordcloud(self.text)
+
+        header, encoded = src.split(",", 1)
+        assert header == "data:image/png;base64"
+        assert base64.b64decode(encoded).startswith(b"\x89PNG")
+
+    def test_nothing_is_written_to_disk(self, tmpdir):
+        with tmpdir.as_cwd():
+            create_wordcloud(self.text)
+
+            assert tmpdir.listdir() == []
+
+
+class TestCountWords:
+
+    def test_counts_words_across_chunks(self):
+        series = pd.Series(["Data mining, data!", None, "more DATA",
+                            "the data's plots", "x 42"])
+
+        counts = count_words(series, chunk_size=2)
+
+        assert counts["data"] == 4
+        assert counts["mining"] == 1
+        assert "s" not in counts
+        assert "the" not in counts
+        assert "x" not in counts and "42" not in counts
+
+    def test_additional_stopwords(self):
+        series = pd.Series(["data mining data"])
+
+        counts = count_words(series, additional_stopwords=["data"])
+
+        assert dict(counts) == {"mining": 1}
+
+    def test_wordcloud_from_column(self):
+        df = pd.read_csv(os.path.join(data_folder, "gutenberg_sentences.csv"))
+
+        counts = count_words(df["Text"], max_words=500)
+        src = wordcloud_from_frequencies(counts)
+
+        assert len(counts) == 500
+        assert counts.most_common(1)[0][0] == "mr"
+        assert src.startswith("data:image/png;base64,")
+
+    def test_no_words(self):
+        numbers = count_words(pd.Series([1, 2.5, None]))
+        stopwords = count_words(pd.Series(["the and of", "it is"]))
+
+        assert len(numbers) == 0 and len(stopwords) == 0
+        assert wordcloud_from_frequencies(numbers) is None
@@ -0,0 +1,61 @@
+import sys
+import os
+import warnings
+from redis import Redis
+import pandas as pd
+import dill
+
+sys.path.insert(0, os.path.abspath("../EDA_miner"))
+warnings.filterwarnings("ignore")
+
+from visualization import chart_maker
+from visualization.chart_maker import trace_spec, layout_traces
+from caching import RedisLRUCache, make_key
+
+
+class TestLayoutTraces:
+
+    dataset = "test_chart_maker_data"
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]})
+
+    @classmethod
+    def setup_class(cls):
+        cls.redis_conn = Redis(port=6379, db=0)
+
+    def setup_method(self):
+        self.trace_cache = chart_maker.trace_cache
+        chart_maker.trace_cache = RedisLRUCache(self.redis_conn,
+                                                "test_chart_maker")
+        self.redis_conn.set(self.dataset, dill.dumps(self.df))
+
+    def teardown_method(self):
+        chart_maker.trace_cache = self.trace_cache
+        for key in self.redis_conn.keys("cache_test_chart_maker_*"):
+            self.redis_conn.delete(key)
+        self.redis_conn.delete(self.dataset)
+
+    def layout(self, *specs):
+        # As made by `plot`, and stored as JSON in the page
+        return [[make_key("graph2d", "v1", *spec), list(spec)]
+                for spec in specs]
+
+    def test_traces_are_cached(self):
+        layout = self.layout(trace_spec("scatterplot", "a", "b"),
+                             trace_spec("histogram", "a", "b"))
+
+        traces = layout_traces(layout, self.dataset)
+
+        assert [trace["type"] for trace in traces] == \
+            ["scatter", "histogram"]
+        assert list(traces[0]["y"]) == [4, 5, 6]
+
+        # Rebuilt from the cache alone
+        self.redis_conn.delete(self.dataset)
+        cached = layout_traces(layout, self.dataset)
+        assert [trace["type"] for trace in cached] == \
+            ["scatter", "histogram"]
+        assert list(cached[0]["y"]) == [4, 5, 6]
+
+    def test_unused_variables_are_dropped(self):
+        assert trace_spec("histogram", "a", "b", "c") == \
+            ("histogram", "a", None, None)